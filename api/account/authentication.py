@@ -0,0 +1,134 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from rest_framework_simplejwt import authentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .tokens import ROLE_CLAIM, get_revoked_at
+
+
+class LocalCache:
+    """A thread-safe mapping of at most `maxsize` entries, which expire after `timeout` seconds.
+    The least recently used entry is evicted first."""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = (value, time.monotonic() + self.timeout)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+# Users are cached in two levels: in each worker, and in the shared cache. Invalidating a user
+# only reaches the copy of the current worker, so other workers may keep using theirs for up to
+# `AUTH_USER_CACHE_LOCAL_TIMEOUT` seconds.
+local_users = LocalCache(
+    maxsize=getattr(settings, "AUTH_USER_CACHE_SIZE", 1024),
+    timeout=getattr(settings, "AUTH_USER_CACHE_LOCAL_TIMEOUT", 10),
+)
+
+
+def get_user_key(user_id):
+    return f"account:user:{user_id}"
+
+
+def get_cached_user(user_id):
+    """Return the user with `user_id` and their profile, or `None` if there is no such user."""
+    user = local_users.get(user_id)
+    if user is None:
+        key = get_user_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user_model = get_user_model()
+            users = user_model.objects.select_related("profile")
+            user = users.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            if user is None:
+                return None
+            cache.set(key, user, timeout=getattr(settings, "AUTH_USER_CACHE_TIMEOUT", 60 * 5))
+        local_users.set(user_id, user)
+    # Requests get their own copy, so that changes made while handling one do not leak into
+    # the cached user.
+    return copy.copy(user)
+
+
+def invalidate_cached_user(user_id):
+    local_users.delete(user_id)
+    cache.delete(get_user_key(user_id))
+
+
+class JWTAuthentication(authentication.JWTAuthentication):
+    """Authenticate requests with an access token, unless the tokens of its user were revoked
+    after it was issued; see `account.tokens.revoke_tokens`.
+
+    Users are loaded with their profile and cached, see `get_cached_user`. When
+    `settings.JWT_STATELESS_USER` is set, the user is a `TokenUser` built from the claims of the
+    token instead, and tokens without a role are rejected.
+    """
+
+    def get_validated_token(self, raw_token):
+        token = super().get_validated_token(raw_token)
+        revoked_at = get_revoked_at(token.get(api_settings.USER_ID_CLAIM))
+        if revoked_at is not None and token.get("iat", 0) < revoked_at:
+            raise InvalidToken("Token has been revoked")
+        return token
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken("Token contained no recognizable user identification")
+
+        if getattr(settings, "JWT_STATELESS_USER", False):
+            # Permissions are checked against the role of the token, since the profile of a
+            # `TokenUser` is never loaded. Tokens issued before the claim was added lack it.
+            if ROLE_CLAIM not in validated_token:
+                raise InvalidToken("Token contained no role")
+            return api_settings.TOKEN_USER_CLASS(validated_token)
+
+        user = get_cached_user(validated_token[api_settings.USER_ID_CLAIM])
+        if user is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(
+                user.password
+            ):
+                raise AuthenticationFailed(
+                    "The user's password has been changed.", code="password_changed"
+                )
+
+        return user
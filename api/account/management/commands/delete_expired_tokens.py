@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+
+class Command(BaseCommand):
+    help = """Deletes expired outstanding tokens and their blacklist entries. Tokens are deleted
+    in small batches, each in its own transaction, so that no statement holds locks on the token
+    tables for long."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            "-b",
+            type=int,
+            default=1000,
+            dest="batch_size",
+            help="Number of tokens to delete per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        # Tokens that expire while the command runs are left for the next run.
+        now = timezone.now()
+        expired_tokens = OutstandingToken.objects.filter(expires_at__lte=now).order_by("pk")
+
+        num_tokens_deleted = 0
+        num_blacklisted_deleted = 0
+        last_pk = 0
+        while True:
+            pks = list(
+                expired_tokens.filter(pk__gt=last_pk).values_list("pk", flat=True)[:batch_size]
+            )
+            if not pks:
+                break
+            last_pk = pks[-1]
+
+            with transaction.atomic():
+                # Delete the blacklist entries first, so that deleting the tokens has nothing
+                # left to cascade to.
+                num_deleted, _ = BlacklistedToken.objects.filter(token_id__in=pks).delete()
+                num_blacklisted_deleted += num_deleted
+                num_deleted, _ = OutstandingToken.objects.filter(pk__in=pks).delete()
+                num_tokens_deleted += num_deleted
+
+        self.stdout.write(
+            f"Deleted {num_tokens_deleted} expired token(s), {num_blacklisted_deleted} of which "
+            "were blacklisted."
+        )
@@ -1,3 +1,5 @@
+import time
+
 from django.contrib.auth.models import User
 from django.core.management.base import BaseCommand
 from django.db import transaction
@@ -6,7 +8,8 @@ from rest_framework.authtoken.models import Token
 
 class Command(BaseCommand):
     help = """Generates tokens for users that are passed in as arguments. Generates
-    tokens for all existing users if no users are passed in."""
+    tokens for all existing users if no users are passed in. Users are streamed from the
+    database, and their tokens are created and committed in batches."""
 
     def add_arguments(self, parser):
         parser.add_argument(
@@ -17,23 +20,52 @@ class Command(BaseCommand):
             dest="usernames",
             help="Usernames to generate tokens for.",
         )
+        parser.add_argument(
+            "--batch-size",
+            "-b",
+            type=int,
+            default=1000,
+            dest="batch_size",
+            help="Number of tokens to create per transaction.",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            dest="dry_run",
+            help="Only report how many tokens would be created.",
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options):
         usernames = options["usernames"]
         if usernames:
             users = User.objects.filter(username__in=usernames)
-            if not users:
+            if not users.exists():
                 self.stderr.write("The user(s) passed do not exist.")
                 return
         else:
             users = User.objects.all()
 
+        # Anti-join on the tokens, so that only users without one are read.
+        users = users.filter(auth_token__isnull=True).order_by("pk")
+
+        if options["dry_run"]:
+            self.stdout.write(f"{users.count()} new token(s) would be created.")
+            return
+
+        batch_size = options["batch_size"]
+        user_ids = users.values_list("pk", flat=True).iterator(chunk_size=batch_size)
+        start = time.monotonic()
+
         num_tokens_created = 0
-        for user in users:
-            _, created = Token.objects.get_or_create(user=user)
-            if created:
-                num_tokens_created += 1
+        batch = []
+        for user_id in user_ids:
+            batch.append(Token(user_id=user_id, key=Token.generate_key()))
+            if len(batch) == batch_size:
+                num_tokens_created += self.create_tokens(batch)
+                self.report_progress(num_tokens_created, start)
+                batch = []
+        if batch:
+            num_tokens_created += self.create_tokens(batch)
 
         info_msg = ""
         if num_tokens_created == 0:
@@ -42,3 +74,15 @@ class Command(BaseCommand):
             info_msg = f"{num_tokens_created} new token(s) created."
 
         self.stdout.write(info_msg)
+
+    def create_tokens(self, tokens):
+        # Commit each batch on its own, so that locks are only held for the batch. Users that
+        # got a token since they were read are skipped, so the tokens that were created are
+        # counted by their keys.
+        with transaction.atomic():
+            Token.objects.bulk_create(tokens, ignore_conflicts=True)
+            return Token.objects.filter(key__in=[token.key for token in tokens]).count()
+
+    def report_progress(self, num_tokens_created, start):
+        rate = num_tokens_created / max(time.monotonic() - start, 1e-9)
+        self.stdout.write(f"{num_tokens_created} token(s) created ({rate:.0f} per second)...")
@@ -1,7 +1,11 @@
 from django.contrib.auth.models import User
 from django.db import models
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_init, post_save
 from django.dispatch import receiver
+from myproject import cache
+
+from .authentication import invalidate_cached_user
+from .tokens import revoke_tokens
 
 
 class Profile(models.Model):
@@ -22,6 +26,37 @@ class Profile(models.Model):
     def __str__(self):
         return self.user.username
 
+    # The fields rendered along with posts and by `UserView`.
+    RENDERED_FIELDS = ("role", "bio")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        profile = super().from_db(db, field_names, values)
+        # Remember the stored values, so that saving can tell whether they changed.
+        profile._stored_values = {name: profile.__dict__.get(name) for name in cls.RENDERED_FIELDS}
+        return profile
+
+    def get_stored_value(self, name):
+        """Return the value of a field when the profile was loaded or last saved, or `None` if
+        it is not known."""
+        return getattr(self, "_stored_values", {}).get(name)
+
+    def rendered_fields_changed(self):
+        return any(
+            getattr(self, name) != self.get_stored_value(name) for name in self.RENDERED_FIELDS
+        )
+
+
+def get_profile_tag(username):
+    """Return the cache tag of the responses of `UserView` for a user."""
+    return f"profile:{username}"
+
+
+@receiver(post_init, sender=User)
+def remember_username(sender, instance, **kwargs):
+    # The username is rendered along with posts, so saving must tell whether it changed.
+    instance._stored_username = instance.__dict__.get("username")
+
 
 @receiver(post_save, sender=User)
 def handle_user_profile(sender, instance, created, **kwargs):
@@ -30,3 +65,56 @@ def handle_user_profile(sender, instance, created, **kwargs):
         return
     if instance.profile:
         instance.profile.save()
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_cache(sender, instance, created, **kwargs):
+    # Profiles are nested in post responses as well as returned by `UserView`. New users have
+    # no posts and no cached profile yet, and other fields of the user are not rendered.
+    stored_username = instance._stored_username
+    if not created and instance.username != stored_username:
+        cache.invalidate(
+            "profiles", get_profile_tag(instance.username), get_profile_tag(stored_username)
+        )
+    instance._stored_username = instance.username
+
+
+@receiver(post_delete, sender=User)
+def invalidate_deleted_user_cache(sender, instance, **kwargs):
+    # The posts of the user are deleted along with them, and invalidate the posts themselves.
+    cache.invalidate(get_profile_tag(instance.username))
+
+
+@receiver(post_save, sender=Profile)
+def invalidate_profile_cache(sender, instance, created, **kwargs):
+    if not created and instance.rendered_fields_changed():
+        cache.invalidate("profiles", get_profile_tag(instance.user.username))
+
+
+@receiver(post_delete, sender=Profile)
+def invalidate_deleted_profile_cache(sender, instance, **kwargs):
+    # Profiles are deleted before their user, so the user can still be loaded.
+    cache.invalidate("profiles", get_profile_tag(instance.user.username))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+def invalidate_authenticated_user(sender, instance, **kwargs):
+    # Authenticated users are cached along with their profile.
+    invalidate_cached_user(instance.pk if sender is User else instance.user_id)
+
+
+@receiver(post_save, sender=Profile)
+def revoke_tokens_on_role_change(sender, instance, created, **kwargs):
+    # Tokens carry the role of their user, so they must not outlive it.
+    stored_role = instance.get_stored_value("role")
+    if not created and stored_role is not None and instance.role != stored_role:
+        revoke_tokens(instance.user_id)
+
+
+@receiver(post_save, sender=Profile)
+def remember_profile_values(sender, instance, **kwargs):
+    # Connected last, so that the receivers above still see the values from before the save.
+    instance._stored_values = {name: getattr(instance, name) for name in instance.RENDERED_FIELDS}
@@ -1,6 +1,21 @@
 from rest_framework.permissions import SAFE_METHODS, BasePermission
 
 from .models import Profile
+from .tokens import ROLE_CLAIM
+
+
+def get_role(request):
+    """Return the role of the user making the request, or `None` for anonymous users.
+
+    Access tokens carry the role of their user, so the profile is only loaded for tokens issued
+    without the claim. Such tokens are rejected when users are built from their token, see
+    `account.authentication.JWTAuthentication`.
+    """
+    if not request.user.is_authenticated:
+        return None
+    if request.auth is not None and ROLE_CLAIM in request.auth:
+        return request.auth[ROLE_CLAIM]
+    return request.user.profile.role
 
 
 class ReadOnly(BasePermission):
@@ -10,27 +25,27 @@ class ReadOnly(BasePermission):
 
 class IsReader(BasePermission):
     def has_permission(self, request, view):
-        return request.user.profile.role == Profile.READER
+        return get_role(request) == Profile.READER
 
 
 class IsAuthor(BasePermission):
     def has_permission(self, request, view):
-        return request.user.profile.role == Profile.AUTHOR
+        return get_role(request) == Profile.AUTHOR
 
     def has_object_permission(self, request, view, obj):
-        return obj.author == request.user
+        return obj.author_id == request.user.pk
 
 
 class IsAdmin(BasePermission):
     def has_permission(self, request, view):
-        return request.user.profile.role == Profile.ADMIN
+        return get_role(request) == Profile.ADMIN
 
 
 class IsUser(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj == request.user
+        return obj.pk == request.user.pk
 
 
 class IsOwnerOfObject(BasePermission):
     def has_object_permission(self, request, view, obj):
-        return obj.user == request.user
+        return obj.user_id == request.user.pk
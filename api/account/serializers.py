@@ -2,8 +2,14 @@ from django.contrib.auth.models import User
 from django.contrib.auth.password_validation import validate_password
 from django.contrib.auth.validators import UnicodeUsernameValidator
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import (
+    TokenBlacklistSerializer,
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
 
 from .models import Profile
+from .tokens import ROLE_CLAIM, USERNAME_CLAIM, RefreshToken
 
 
 class UserRegisterSerializer(serializers.ModelSerializer):
@@ -62,7 +68,7 @@ class UserRegisterSerializer(serializers.ModelSerializer):
 
 
 class ProfileSerializer(serializers.ModelSerializer):
-    username = serializers.SerializerMethodField()
+    username = serializers.CharField(source="user.username", read_only=True)
     role = serializers.CharField(max_length=10, read_only=True)
     bio = serializers.CharField(max_length=500, allow_blank=True)
 
@@ -74,9 +80,6 @@ class ProfileSerializer(serializers.ModelSerializer):
             "bio",
         ]
 
-    def get_username(self, obj):
-        return obj.user.username
-
 
 class UserSerializer(serializers.ModelSerializer):
     username = serializers.CharField(max_length=150)
@@ -150,3 +153,29 @@ class UserSerializer(serializers.ModelSerializer):
             profile.save()
 
         return instance
+
+
+class RoleTokenObtainPairSerializer(TokenObtainPairSerializer):
+    """Issue tokens that carry the role and username of their user, so that requests can be
+    authorized without loading the user or their profile."""
+
+    token_class = RefreshToken
+
+    @classmethod
+    def get_token(cls, user):
+        token = super().get_token(user)
+        token[ROLE_CLAIM] = user.profile.role
+        token[USERNAME_CLAIM] = user.username
+        return token
+
+
+class CachedBlacklistTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh tokens, checking the refresh token against the cached blacklist."""
+
+    token_class = RefreshToken
+
+
+class CachedBlacklistTokenBlacklistSerializer(TokenBlacklistSerializer):
+    """Blacklist a refresh token, checking it against the cached blacklist first."""
+
+    token_class = RefreshToken
@@ -1,8 +1,21 @@
 import json
+from datetime import timedelta
+from io import StringIO
+from uuid import uuid4
 
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
 from django.db import IntegrityError
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
+from django.utils import timezone
+from myproject.cache import get_stats
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from .authentication import local_users
+from .models import Profile
+from .tokens import get_revoked_at, revoke_tokens
 
 # Writing tests:
 # Create objects via database API (not endpoints) except when not directly testing that endpoint.
@@ -427,6 +440,303 @@ class LoginUserTest(TestCase):
         )
 
 
+class TokenRoleClaimTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username="admin", password="@123tza..")
+        self.user.profile.role = Profile.ADMIN
+        self.user.profile.save()
+        # Forget the revocation caused by the promotion.
+        cache.clear()
+
+    def obtain_tokens(self):
+        data = {"username": "admin", "password": "@123tza.."}
+        response = self.client.post("/api/token/", data=data, content_type="application/json")
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def create_category(self, access):
+        return self.client.post(
+            "/api/categories/",
+            data={"name": "Life"},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {access}",
+        )
+
+    def test_tokens_carry_role_and_username(self):
+        tokens = self.obtain_tokens()
+
+        access = AccessToken(tokens["access"])
+        self.assertEqual(access["role"], Profile.ADMIN)
+        self.assertEqual(access["username"], "admin")
+        self.assertEqual(RefreshToken(tokens["refresh"])["role"], Profile.ADMIN)
+
+    def test_permissions_trust_role_claim(self):
+        access = self.obtain_tokens()["access"]
+
+        # One query for the user and two to validate and create the category, none for the
+        # profile.
+        with self.assertNumQueries(3):
+            response = self.create_category(access)
+        self.assertEqual(response.status_code, 201)
+
+    def test_permissions_without_role_claim(self):
+        response = self.create_category(AccessToken.for_user(self.user))
+
+        self.assertEqual(response.status_code, 201)
+
+    @override_settings(JWT_STATELESS_USER=True)
+    def test_stateless_user(self):
+        access = self.obtain_tokens()["access"]
+
+        # Only the category is validated and created; the user is never loaded.
+        with self.assertNumQueries(2):
+            response = self.create_category(access)
+        self.assertEqual(response.status_code, 201)
+
+    @override_settings(JWT_STATELESS_USER=True)
+    def test_stateless_user_without_role_claim(self):
+        response = self.create_category(AccessToken.for_user(self.user))
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_role_change_revokes_tokens(self):
+        refresh = RefreshToken.for_user(self.user)
+        refresh.set_iat(at_time=timezone.now() - timedelta(minutes=1))
+        access = refresh.access_token
+
+        self.user.profile.role = Profile.READER
+        self.user.profile.save()
+
+        self.assertIsNotNone(get_revoked_at(self.user.pk))
+        self.assertEqual(self.create_category(access).status_code, 401)
+        response = self.client.post(
+            "/api/token/refresh/",
+            data={"refresh": str(refresh)},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 401)
+
+    def test_role_change_revokes_access_tokens_after_logout(self):
+        refresh = RefreshToken.for_user(self.user)
+        refresh.set_iat(at_time=timezone.now() - timedelta(minutes=1))
+        access = refresh.access_token
+        response = self.client.post(
+            "/api/token/blacklist/",
+            data={"refresh": str(refresh)},
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+
+        self.user.profile.role = Profile.READER
+        self.user.profile.save()
+
+        self.assertIsNotNone(get_revoked_at(self.user.pk))
+        self.assertEqual(self.create_category(access).status_code, 401)
+
+    def test_saving_without_role_change_keeps_tokens(self):
+        RefreshToken.for_user(self.user)
+
+        profile = Profile.objects.get(user=self.user)
+        profile.bio = "Bio"
+        profile.save()
+
+        self.assertIsNone(get_revoked_at(self.user.pk))
+
+
+class AuthenticatedUserCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        local_users.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username="admin", password="@123tza..")
+        self.user.profile.role = Profile.ADMIN
+        self.user.profile.save()
+        self.access = AccessToken.for_user(self.user)
+
+    def get_profile(self):
+        return self.client.get("/api/users/admin/", HTTP_AUTHORIZATION=f"Bearer {self.access}")
+
+    def test_user_is_cached(self):
+        # One query for the user with their profile, one for the requested user.
+        with self.assertNumQueries(2):
+            response = self.get_profile()
+        self.assertEqual(response.status_code, 200)
+
+        with self.assertNumQueries(1):
+            response = self.get_profile()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["profile"]["role"], Profile.ADMIN)
+
+    def test_user_is_shared_between_workers(self):
+        self.get_profile()
+        local_users.clear()
+
+        with self.assertNumQueries(1):
+            self.get_profile()
+
+    def test_user_change_invalidates_cache(self):
+        self.get_profile()
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.get_profile().status_code, 401)
+
+    def test_profile_change_invalidates_cache(self):
+        self.get_profile()
+
+        profile = Profile.objects.get(user=self.user)
+        profile.bio = "Bio"
+        profile.save()
+
+        with self.assertNumQueries(2):
+            self.get_profile()
+
+
+class ProfileResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username="author", password="@123tza..")
+
+    def get_invalidations(self):
+        return get_stats()["invalidations"]
+
+    def test_registering_does_not_invalidate(self):
+        invalidations = self.get_invalidations()
+
+        User.objects.create_user(username="reader", password="@123tza..")
+
+        self.assertEqual(self.get_invalidations(), invalidations)
+
+    def test_unrendered_changes_do_not_invalidate(self):
+        invalidations = self.get_invalidations()
+
+        self.user.email = "author@example.com"
+        self.user.last_login = timezone.now()
+        self.user.save()
+
+        self.assertEqual(self.get_invalidations(), invalidations)
+
+    def test_bio_change_invalidates_profile(self):
+        self.client.get("/api/users/author/")
+
+        profile = Profile.objects.get(user=self.user)
+        profile.bio = "Bio"
+        profile.save()
+
+        response = self.client.get("/api/users/author/")
+        self.assertEqual(json.loads(response.content)["bio"], "Bio")
+
+    def test_only_the_changed_profile_is_invalidated(self):
+        User.objects.create_user(username="other", password="@123tza..")
+        self.client.get("/api/users/other/")
+
+        self.user.profile.bio = "Bio"
+        self.user.profile.save()
+
+        with self.assertNumQueries(0):
+            self.client.get("/api/users/other/")
+
+    def test_username_change_invalidates_old_and_new_username(self):
+        self.assertEqual(self.client.get("/api/users/author/").status_code, 200)
+
+        self.user.username = "writer"
+        self.user.save()
+
+        self.assertEqual(self.client.get("/api/users/author/").status_code, 404)
+        self.assertEqual(self.client.get("/api/users/writer/").status_code, 200)
+
+
+class TokenBlacklistCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(username="reader", password="@123tza..")
+
+    def refresh(self, refresh):
+        return self.client.post(
+            "/api/token/refresh/", data={"refresh": str(refresh)}, content_type="application/json"
+        )
+
+    def test_rotated_token_is_rejected_from_cache(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.assertEqual(self.refresh(refresh).status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.refresh(refresh)
+        self.assertEqual(response.status_code, 401)
+
+    def test_unlisted_token_is_accepted_from_cache(self):
+        self.refresh(RefreshToken.for_user(self.user))
+        refresh = RefreshToken.for_user(self.user)
+
+        response = self.refresh(refresh)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(BlacklistedToken.objects.filter(token__jti=refresh["jti"]).exists())
+
+    def test_cold_cache_falls_back_to_database(self):
+        refresh = RefreshToken.for_user(self.user)
+        outstanding_token = OutstandingToken.objects.get(jti=refresh["jti"])
+        BlacklistedToken.objects.create(token=outstanding_token)
+
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_blacklisted_token_is_rejected(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.refresh(RefreshToken.for_user(self.user))
+
+        response = self.client.post(
+            "/api/token/blacklist/",
+            data={"refresh": str(refresh)},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+    def test_revoked_tokens_are_rejected(self):
+        refresh = RefreshToken.for_user(self.user)
+        self.refresh(RefreshToken.for_user(self.user))
+
+        revoke_tokens(self.user.pk)
+
+        self.assertEqual(self.refresh(refresh).status_code, 401)
+
+
+class DeleteExpiredTokensTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="@123tza..")
+
+    def create_token(self, expires_at, blacklisted=False):
+        token = OutstandingToken.objects.create(
+            user=self.user, jti=str(uuid4()), token="token", expires_at=expires_at
+        )
+        if blacklisted:
+            BlacklistedToken.objects.create(token=token)
+        return token
+
+    def test_delete_expired_tokens(self):
+        now = timezone.now()
+        for blacklisted in (False, True, True):
+            self.create_token(now - timedelta(days=1), blacklisted=blacklisted)
+        unexpired_tokens = [
+            self.create_token(now + timedelta(days=1)),
+            self.create_token(now + timedelta(days=1), blacklisted=True),
+        ]
+
+        out = StringIO()
+        call_command("delete_expired_tokens", batch_size=2, stdout=out)
+
+        self.assertIn("Deleted 3 expired token(s), 2 of which were blacklisted.", out.getvalue())
+        self.assertQuerySetEqual(
+            OutstandingToken.objects.order_by("pk"), unexpired_tokens, ordered=True
+        )
+        self.assertEqual(BlacklistedToken.objects.count(), 1)
+
+
 # class EmailVerificationTest(TestCase):
 #     pass
 
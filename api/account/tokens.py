@@ -0,0 +1,125 @@
+"""
+Claims carried by the JWTs issued to users, and revocation of those tokens.
+
+Tokens carry the user's role, so that permissions can be checked without loading the profile.
+A role that changes while tokens are outstanding would then be trusted until they expire, so
+changing a role revokes the user's tokens: refresh tokens are blacklisted, and access tokens
+issued before the revocation are rejected by `account.authentication.JWTAuthentication`.
+
+Blacklisted refresh tokens are mirrored in the cache, one key per JTI that expires with the
+token, so that checking the blacklist on every refresh does not query the ever-growing
+blacklist table. The mirror is only trusted while its marker key exists. The marker is set once
+the mirror has been rebuilt from the database, so a cold or cleared cache falls back to the
+database instead of letting blacklisted tokens through. This assumes the cache evicts keys
+only when they expire, which is the default policy of Redis. Tokens blacklisted without going
+through this module, e.g. in the admin, are only picked up by `rebuild_blacklist_mirror`.
+"""
+
+import time
+
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework_simplejwt import tokens
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+
+ROLE_CLAIM = "role"
+USERNAME_CLAIM = "username"
+
+BLACKLIST_KEY_PREFIX = "account:blacklisted"
+BLACKLIST_READY_KEY = f"{BLACKLIST_KEY_PREFIX}:ready"
+BLACKLIST_REBUILD_LOCK_KEY = f"{BLACKLIST_KEY_PREFIX}:rebuilding"
+BLACKLIST_REBUILD_BATCH_SIZE = 1000
+
+
+def get_revocation_key(user_id):
+    return f"account:tokens_revoked:{user_id}"
+
+
+def get_revoked_at(user_id):
+    """Return the time the tokens of the user were last revoked at, in seconds since the epoch,
+    or `None` if no access token issued before then can still be valid."""
+    return cache.get(get_revocation_key(user_id))
+
+
+def revoke_tokens(user_id):
+    """Revoke every token issued to the user so far.
+
+    Returns whether the user had any refresh tokens left to blacklist.
+    """
+    # Access tokens cannot be blacklisted, so remember when they were revoked until the last one
+    # issued before then has expired. They may outlive the refresh token they were created from,
+    # e.g. after logging out, so this is needed even if there is nothing left to blacklist.
+    timeout = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    cache.set(get_revocation_key(user_id), int(time.time()), timeout=timeout)
+
+    outstanding_tokens = OutstandingToken.objects.filter(
+        user_id=user_id, expires_at__gt=timezone.now(), blacklistedtoken__isnull=True
+    )
+    blacklisted_tokens = [BlacklistedToken(token=token) for token in outstanding_tokens]
+    if not blacklisted_tokens:
+        return False
+
+    BlacklistedToken.objects.bulk_create(blacklisted_tokens, ignore_conflicts=True)
+    mirror_blacklisted_jtis(token.token.jti for token in blacklisted_tokens)
+    return True
+
+
+def get_blacklisted_key(jti):
+    return f"{BLACKLIST_KEY_PREFIX}:{jti}"
+
+
+def mirror_blacklisted_jtis(jtis):
+    # No refresh token outlives its lifetime, so neither does its key.
+    timeout = api_settings.REFRESH_TOKEN_LIFETIME.total_seconds()
+    cache.set_many({get_blacklisted_key(jti): True for jti in jtis}, timeout=timeout)
+
+
+def rebuild_blacklist_mirror():
+    """Copy the JTIs of the unexpired blacklisted tokens into the cache, and mark the mirror as
+    complete."""
+    jtis = (
+        BlacklistedToken.objects.filter(token__expires_at__gt=timezone.now())
+        .values_list("token__jti", flat=True)
+        .iterator(chunk_size=BLACKLIST_REBUILD_BATCH_SIZE)
+    )
+    batch = []
+    for jti in jtis:
+        batch.append(jti)
+        if len(batch) == BLACKLIST_REBUILD_BATCH_SIZE:
+            mirror_blacklisted_jtis(batch)
+            batch = []
+    mirror_blacklisted_jtis(batch)
+    cache.set(BLACKLIST_READY_KEY, True, timeout=None)
+
+
+def is_blacklisted(jti):
+    key = get_blacklisted_key(jti)
+    values = cache.get_many([BLACKLIST_READY_KEY, key])
+    if key in values:
+        return True
+    if BLACKLIST_READY_KEY in values:
+        return False
+
+    # Only one worker rebuilds the mirror; the others check the database meanwhile.
+    if cache.add(BLACKLIST_REBUILD_LOCK_KEY, True, timeout=60):
+        try:
+            rebuild_blacklist_mirror()
+        finally:
+            cache.delete(BLACKLIST_REBUILD_LOCK_KEY)
+        return cache.get(key) is not None
+    return BlacklistedToken.objects.filter(token__jti=jti).exists()
+
+
+class RefreshToken(tokens.RefreshToken):
+    """A refresh token that is checked against the cached mirror of the blacklist."""
+
+    def check_blacklist(self):
+        if is_blacklisted(self.payload[api_settings.JTI_CLAIM]):
+            raise TokenError("Token is blacklisted")
+
+    def blacklist(self):
+        blacklisted_token = super().blacklist()
+        mirror_blacklisted_jtis([self.payload[api_settings.JTI_CLAIM]])
+        return blacklisted_token
@@ -1,15 +1,16 @@
 from django.contrib.auth.models import User
 from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from myproject.cache import cache_response
 from rest_framework import status
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
+from .authentication import JWTAuthentication
 from .models import Profile
-from .permissions import IsAdmin, IsUser, ReadOnly
+from .permissions import IsAdmin, IsUser, ReadOnly, get_role
 from .serializers import ProfileSerializer, UserRegisterSerializer, UserSerializer
 
 
@@ -64,16 +65,17 @@ class UserView(APIView):
             404: "User Not Found",
         },
     )
+    @cache_response("profile:{username}")
     def get(self, request, username, *args, **kwargs):
         """Get a user's data.
 
         Authenticated users will see more data, with the caveat that they need to be an
         admin or the owner of the account."""
-        user = get_object_or_404(User, username=username)
+        user = get_object_or_404(User.objects.select_related("profile"), username=username)
         profile = user.profile
 
         if request.user.is_authenticated:
-            if request.user == user or request.user.profile.role == Profile.ADMIN:
+            if request.user.pk == user.pk or get_role(request) == Profile.ADMIN:
                 serializer = UserSerializer(user)
             else:
                 # Use the public serializer for users that do not have the admin role.
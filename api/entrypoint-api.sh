@@ -4,4 +4,9 @@ python manage.py makemigrations --no-input
 python manage.py migrate --no-input
 # python manage.py collectstatic --no-input
 
-gunicorn myproject.wsgi:application --bind 0.0.0.0:8000
+# Set SERVER_MODE=asgi to serve with uvicorn workers, so that async views run on an event loop.
+if [ "$SERVER_MODE" = "asgi" ]; then
+    gunicorn myproject.asgi:application --bind 0.0.0.0:8000 --worker-class uvicorn.workers.UvicornWorker
+else
+    gunicorn myproject.wsgi:application --bind 0.0.0.0:8000
+fi
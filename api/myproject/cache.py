@@ -0,0 +1,162 @@
+"""
+Response cache for public read endpoints.
+
+Cached responses are keyed on the request path and the current version of every tag the
+response depends on. Invalidating a tag bumps its version, so every entry built from the old
+version stops being looked up and simply expires, without having to track or delete keys.
+Tags are invalidated from model signals; see the receivers in `post.models` and
+`account.models`.
+"""
+
+import hashlib
+import time
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+from .streaming import get_stream_format
+
+KEY_PREFIX = "response_cache"
+STATS = ("hits", "misses", "invalidations")
+
+
+def get_timeout():
+    return getattr(settings, "RESPONSE_CACHE_TIMEOUT", 60 * 5)
+
+
+def get_tag_key(tag):
+    return f"{KEY_PREFIX}:tag:{tag}"
+
+
+def get_stat_key(stat):
+    return f"{KEY_PREFIX}:stats:{stat}"
+
+
+def new_version():
+    # Versions start from the current time rather than 0, so that a tag whose version was
+    # evicted never comes back with a number that an older entry was stored under.
+    return time.time_ns()
+
+
+def get_tag_versions(tags):
+    keys = [get_tag_key(tag) for tag in tags]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), timeout=None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def incr(key, delta=1):
+    try:
+        return cache.incr(key, delta)
+    except ValueError:
+        # The key does not exist yet.
+        if not cache.add(key, delta, timeout=None):
+            return cache.incr(key, delta)
+        return delta
+
+
+def record(stat, count=1):
+    incr(get_stat_key(stat), count)
+
+
+def get_stats():
+    values = cache.get_many([get_stat_key(stat) for stat in STATS])
+    return {stat: values.get(get_stat_key(stat), 0) for stat in STATS}
+
+
+def invalidate(*tags):
+    """Drop every cached response that depends on any of `tags`."""
+    for tag in tags:
+        key = get_tag_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, new_version(), timeout=None)
+    record("invalidations", len(tags))
+
+
+def get_etag(tags, *values):
+    """Return a strong ETag that changes whenever any of `tags` is invalidated.
+
+    Extra `values` are mixed in for representations that differ between clients, such as the
+    id of the user making the request.
+    """
+    versions = get_tag_versions(tags)
+    fingerprint = "|".join([*(f"{t}={v}" for t, v in zip(tags, versions)), *map(str, values)])
+    return hashlib.sha256(fingerprint.encode()).hexdigest()
+
+
+def get_cache_key(request, tags):
+    # Responses may hold absolute links, such as pagination links, so the scheme and host that
+    # they were requested on are part of the key.
+    etag = get_etag(tags, request.scheme, request.get_host(), request.get_full_path())
+    return f"{KEY_PREFIX}:response:{etag}"
+
+
+def cache_response(*tags):
+    """Cache the data of successful anonymous GET responses of an `APIView` handler.
+
+    The entry is dropped as soon as any of `tags` is invalidated. Tags are formatted with the
+    URL keyword arguments of the view, e.g. `"post:{pk}"`. Only the serialized data is cached,
+    so content negotiation still happens on every request. Streamed responses, see
+    `myproject.streaming`, are not cached. Coroutine handlers are supported.
+    """
+
+    def is_cacheable(request):
+        return (
+            request.method == "GET"
+            and not request.user.is_authenticated
+            and get_stream_format(request) is None
+        )
+
+    def lookup(request, kwargs):
+        key = get_cache_key(request, [tag.format(**kwargs) for tag in tags])
+        data = cache.get(key)
+        record("misses" if data is None else "hits")
+        return key, data
+
+    def store(key, response):
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, timeout=get_timeout())
+
+    def decorator(method):
+        if iscoroutinefunction(method):
+            # Keep blocking cache calls off the event loop.
+            @wraps(method)
+            async def async_wrapper(view, request, *args, **kwargs):
+                if not is_cacheable(request):
+                    return await method(view, request, *args, **kwargs)
+
+                key, data = await sync_to_async(lookup)(request, kwargs)
+                if data is not None:
+                    return Response(data, status=status.HTTP_200_OK)
+
+                response = await method(view, request, *args, **kwargs)
+                await sync_to_async(store)(key, response)
+                return response
+
+            return async_wrapper
+
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            if not is_cacheable(request):
+                return method(view, request, *args, **kwargs)
+
+            key, data = lookup(request, kwargs)
+            if data is not None:
+                return Response(data, status=status.HTTP_200_OK)
+
+            response = method(view, request, *args, **kwargs)
+            store(key, response)
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,17 @@
+"""
+Celery application for the project.
+
+Tasks are discovered in the `tasks` module of every installed app. Start a worker with:
+
+    celery -A myproject worker --loglevel=info
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "myproject.settings")
+
+app = Celery("myproject")
+app.config_from_object("django.conf:settings", namespace="CELERY")
+app.autodiscover_tasks()
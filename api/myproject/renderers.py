@@ -0,0 +1,65 @@
+"""
+Faster renderers for API responses, configured in `settings.REST_FRAMEWORK`.
+
+`ORJSONRenderer` renders the same JSON as DRF's `JSONRenderer` with orjson. Values that JSON has
+no type for, such as dates and decimals, are encoded by DRF's encoder, so they are rendered as
+before. `MessagePackRenderer` renders the same values as MessagePack, for clients that negotiate
+`application/msgpack`. Run the `benchmark_renderers` command to compare them.
+"""
+
+import msgpack
+import orjson
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Dates and times are passed to DRF's encoder, which formats them slightly differently from
+# orjson, e.g. it renders UTC as "Z". Keys that are not strings are turned into strings, as
+# `json` does.
+ORJSON_OPTIONS = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+
+encode_default = JSONEncoder().default
+
+
+class ORJSONRenderer(JSONRenderer):
+    """Render JSON with orjson.
+
+    Indented JSON, e.g. for the browsable API, and JSON that orjson cannot render, such as
+    integers wider than 64 bits, are rendered by `JSONRenderer`. So is everything when the
+    `UNICODE_JSON` or `COMPACT_JSON` settings are turned off.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        if (
+            self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=encode_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Like `JSONRenderer`, escape the line and paragraph separators, so that the output is a
+        # strict subset of JavaScript.
+        if b"\xe2\x80\xa8" in ret or b"\xe2\x80\xa9" in ret:
+            ret = ret.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return ret
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Render MessagePack. Values are encoded as they are in JSON, e.g. datetimes as ISO 8601
+    strings and decimals as floats."""
+
+    media_type = "application/msgpack"
+    format = "msgpack"
+    charset = None
+    render_style = "binary"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return msgpack.packb(data, default=encode_default, datetime=False)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
 import os
+import sys
 from datetime import timedelta
 from pathlib import Path
 
@@ -62,8 +63,18 @@ INSTALLED_APPS = [
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    ]
+        "account.authentication.JWTAuthentication",
+    ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "myproject.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+        "myproject.renderers.MessagePackRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "myproject.parsers.ORJSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ],
 }
 
 MIDDLEWARE = [
@@ -183,10 +194,33 @@ SIMPLE_JWT = {
     "SLIDING_TOKEN_REFRESH_EXP_CLAIM": "refresh_exp",
     "SLIDING_TOKEN_LIFETIME": timedelta(minutes=5),
     "SLIDING_TOKEN_REFRESH_LIFETIME": timedelta(days=1),
+    "TOKEN_OBTAIN_SERIALIZER": "account.serializers.RoleTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "account.serializers.CachedBlacklistTokenRefreshSerializer",
+    "TOKEN_BLACKLIST_SERIALIZER": "account.serializers.CachedBlacklistTokenBlacklistSerializer",
 }
 
+# Authenticate requests as a `TokenUser` built from the access token instead of loading the user
+# from the database. Views then only have the user's id, username and role.
+JWT_STATELESS_USER = config("JWT_STATELESS_USER", default=False, cast=bool)
+
+# Authenticated users are cached for `AUTH_USER_CACHE_TIMEOUT` seconds in Redis, and for
+# `AUTH_USER_CACHE_LOCAL_TIMEOUT` seconds in each worker, which bounds how long other workers keep
+# using a user after it changes.
+AUTH_USER_CACHE_TIMEOUT = config("AUTH_USER_CACHE_TIMEOUT", default=60 * 5, cast=int)
+AUTH_USER_CACHE_LOCAL_TIMEOUT = config("AUTH_USER_CACHE_LOCAL_TIMEOUT", default=10, cast=int)
+AUTH_USER_CACHE_SIZE = config("AUTH_USER_CACHE_SIZE", default=1024, cast=int)
+
 # Add username and password to Redis instance before deploying to production.
 CELERY_BROKER_URL = "redis://redis:6379/0"
+# Tasks only have side effects, so their results are not stored.
+CELERY_TASK_IGNORE_RESULT = True
+# Periodic tasks, run by `celery beat`.
+CELERY_BEAT_SCHEDULE = {
+    "publish-scheduled-posts": {
+        "task": "post.tasks.publish_scheduled_posts",
+        "schedule": config("PUBLISH_SCHEDULE_INTERVAL", default=60, cast=int),
+    },
+}
 
 CACHES = {
     "default": {
@@ -198,4 +232,29 @@ CACHES = {
     }
 }
 
+# The test suite runs without Redis, and runs tasks when they are enqueued.
+if "test" in sys.argv:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+    CELERY_TASK_ALWAYS_EAGER = True
+    CELERY_TASK_EAGER_PROPAGATES = True
+
+# Seconds that anonymous responses of public read endpoints are cached for.
+RESPONSE_CACHE_TIMEOUT = config("RESPONSE_CACHE_TIMEOUT", default=60 * 5, cast=int)
+
+# Absolute URL of the site and title of the blog, as shown in feeds. Cached responses are also
+# warmed for `SITE_URL`, so its host must be in `ALLOWED_HOSTS`.
+SITE_URL = config("SITE_URL", default="http://localhost")
+FEED_TITLE = config("FEED_TITLE", default="Blog")
+
+# Record reactions in Redis and write them to the database in batches, see `post.reaction_buffer`.
+# The `flush_reactions` command must then be kept running.
+REACTION_BUFFER = config("REACTION_BUFFER", default=False, cast=bool)
+REACTION_BUFFER_URL = config("REACTION_BUFFER_URL", default="redis://redis:6379/2")
+# Seconds that the buffered state of a comment is kept after its last reaction.
+REACTION_BUFFER_TIMEOUT = config("REACTION_BUFFER_TIMEOUT", default=60 * 60, cast=int)
+
 SECURE_PROXY_SSL_HEADER = ("HTTP_X_FORWARDED_PROTO", "https")
@@ -0,0 +1,100 @@
+"""
+Streamed responses for whole collections.
+
+Listing endpoints return a page at a time, or build their whole response in memory. Clients that
+need a whole collection, such as exports, can have it streamed instead: `?stream=1` streams a
+JSON array, and `?stream=ndjson` or `Accept: application/x-ndjson` streams one JSON document per
+line. Rows are read from the database with a cursor and serialized `CHUNK_SIZE` at a time, so
+memory use does not grow with the size of the collection.
+"""
+
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from rest_framework.settings import api_settings
+
+from .renderers import ORJSONRenderer
+
+JSON = "json"
+NDJSON = "ndjson"
+STREAM_FORMATS = {"1": JSON, "true": JSON, JSON: JSON, NDJSON: NDJSON}
+CONTENT_TYPES = {JSON: "application/json", NDJSON: "application/x-ndjson"}
+
+# Number of rows fetched from the cursor, serialized and written out at a time.
+CHUNK_SIZE = 500
+
+
+class NDJSONRenderer(ORJSONRenderer):
+    """Render a list as one JSON document per item and line. Anything else, such as an error,
+    is rendered on a single line."""
+
+    media_type = "application/x-ndjson"
+    format = NDJSON
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        items = data if isinstance(data, list) else [data]
+        encode = super().render
+        return b"".join(encode(item) + b"\n" for item in items)
+
+
+# The renderers of views that can stream their collection.
+RENDERER_CLASSES = [*api_settings.DEFAULT_RENDERER_CLASSES, NDJSONRenderer]
+
+
+def get_stream_format(request):
+    """Return the format that the client asked the collection to be streamed in, `JSON` or
+    `NDJSON`, or `None` if it did not ask for a stream."""
+    stream_format = STREAM_FORMATS.get(request.query_params.get("stream", "").lower())
+    if stream_format is None and request.accepted_renderer.format == NDJSON:
+        return NDJSON
+    return stream_format
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def render(rows, serialize, stream_format):
+    """Yield the rows serialized by `serialize`, which turns a list of rows into a list of
+    representations, as the bytes of a JSON array or of NDJSON."""
+    encode = ORJSONRenderer().render
+    if stream_format == NDJSON:
+        for chunk in chunked(rows, CHUNK_SIZE):
+            yield b"".join(encode(item) + b"\n" for item in serialize(chunk))
+        return
+
+    separator = b"["
+    for chunk in chunked(rows, CHUNK_SIZE):
+        yield separator + b",".join(encode(item) for item in serialize(chunk))
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+async def iterate_in_thread(iterator):
+    # Rows are read with the sync ORM, so under ASGI each chunk is produced in the thread that
+    # holds the database connection. The ASGI handler would otherwise read the whole iterator
+    # into memory before sending it.
+    sentinel = object()
+    try:
+        while (chunk := await sync_to_async(next)(iterator, sentinel)) is not sentinel:
+            yield chunk
+    finally:
+        await sync_to_async(iterator.close)()
+
+
+def stream(request, rows, serialize, stream_format):
+    """Return a response that streams `rows`, e.g. `queryset.iterator(chunk_size=CHUNK_SIZE)`,
+    serialized by `serialize` in the given format. See `render`."""
+    content = render(rows, serialize, stream_format)
+    if isinstance(request._request, ASGIRequest):
+        content = iterate_in_thread(content)
+    response = StreamingHttpResponse(content, content_type=CONTENT_TYPES[stream_format])
+    patch_vary_headers(response, ["Accept"])
+    return response
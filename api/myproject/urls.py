@@ -19,7 +19,15 @@ from django.contrib import admin
 from django.urls import include, path, re_path
 from drf_yasg import openapi
 from drf_yasg.views import get_schema_view
-from post.views import CategoryDetailView, CategoryListView, TagDetailView, TagListView
+from post import feeds
+from post.views import (
+    CategoryDetailView,
+    CategoryListView,
+    FeedView,
+    SitemapView,
+    TagDetailView,
+    TagListView,
+)
 from rest_framework import permissions
 from rest_framework_simplejwt.views import TokenBlacklistView, TokenObtainPairView, TokenRefreshView
 
@@ -48,6 +56,28 @@ urlpatterns = [
     path("api/categories/<int:pk>/", CategoryDetailView.as_view(), name="category_detail"),
     path("api/tags/", TagListView.as_view(), name="tag_list"),
     path("api/tags/<int:pk>/", TagDetailView.as_view(), name="tag_detail"),
+    re_path(r"^api/feeds/(?P<feed_format>rss|atom)/$", FeedView.as_view(), name="feed"),
+    re_path(
+        r"^api/feeds/(?P<feed_format>rss|atom)/categories/(?P<pk>[0-9]+)/$",
+        FeedView.as_view(kind=feeds.CATEGORY),
+        name="category_feed",
+    ),
+    re_path(
+        r"^api/feeds/(?P<feed_format>rss|atom)/tags/(?P<pk>[0-9]+)/$",
+        FeedView.as_view(kind=feeds.TAG),
+        name="tag_feed",
+    ),
+    re_path(
+        r"^api/feeds/(?P<feed_format>rss|atom)/authors/(?P<pk>[0-9]+)/$",
+        FeedView.as_view(kind=feeds.AUTHOR),
+        name="author_feed",
+    ),
+    path("api/sitemap.xml", SitemapView.as_view(), name="sitemap"),
+    re_path(
+        r"^api/sitemap-(?P<section>posts|categories|tags|authors)-(?P<page>[1-9][0-9]*)\.xml$",
+        SitemapView.as_view(),
+        name="sitemap_section",
+    ),
     re_path(
         r"^api/swagger(?P<format>\.json|\.yaml)$",
         schema_view.without_ui(cache_timeout=0),
@@ -0,0 +1,81 @@
+"""
+Support for serving `APIView` handlers natively under ASGI.
+
+DRF dispatches requests synchronously, so under ASGI every request holds a thread for its whole
+lifetime. `AsyncAPIView` dispatches on the event loop instead: handlers written as coroutines
+use the async ORM, while authentication, permission checks and any sync handlers, such as
+writes, still run in a thread. Under WSGI, Django runs the same views through `async_to_sync`.
+"""
+
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from rest_framework.views import APIView
+
+
+class AsyncAPIView(APIView):
+    """An `APIView` whose handlers may be coroutines."""
+
+    # Django would refuse to mix sync and async handlers on one view. Sync handlers are run in
+    # a thread by `dispatch`, so they are allowed here.
+    view_is_async = True
+
+    async def dispatch(self, request, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+
+        try:
+            # Authenticating and checking permissions may query the database.
+            await sync_to_async(self.initial)(request, *args, **kwargs)
+
+            if request.method.lower() in self.http_method_names:
+                handler = getattr(self, request.method.lower(), self.http_method_not_allowed)
+            else:
+                handler = self.http_method_not_allowed
+
+            if iscoroutinefunction(handler):
+                response = await handler(request, *args, **kwargs)
+            else:
+                response = await sync_to_async(handler)(request, *args, **kwargs)
+        except Exception as exc:
+            response = self.handle_exception(exc)
+
+        self.response = self.finalize_response(request, response, *args, **kwargs)
+        return self.response
+
+
+def conditional(etag_func, last_modified_func=None):
+    """Django's `condition` decorator, for `APIView` handlers that may be coroutines.
+
+    The ETag and Last-Modified functions may query the database, so for coroutines they are
+    evaluated in a thread before the request is checked against them. Either may be `None`.
+    """
+
+    def decorator(method):
+        if not iscoroutinefunction(method):
+            return method_decorator(condition(etag_func, last_modified_func))(method)
+
+        @wraps(method)
+        async def wrapper(view, request, *args, **kwargs):
+            def get_validators():
+                return (
+                    etag_func and etag_func(request, *args, **kwargs),
+                    last_modified_func and last_modified_func(request, *args, **kwargs),
+                )
+
+            etag, last_modified = await sync_to_async(get_validators)()
+
+            @condition(lambda *args, **kwargs: etag, lambda *args, **kwargs: last_modified)
+            async def handler(request, *args, **kwargs):
+                return await method(view, request, *args, **kwargs)
+
+            return await handler(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,133 @@
+"""
+RSS and Atom feeds of the latest published posts of the blog, and of each category, tag and
+author.
+
+A feed is identified by its kind and the id of its category, tag or author, e.g. `("tag", 3)`,
+or `("all", None)` for the whole blog. Feeds are rendered in every format whenever the posts in
+them change, see `post.tasks.regenerate_feeds`, and stored in the cache along with their ETag,
+so that polling a feed does not query the database. A feed missing from the cache, e.g. after
+it was evicted, is rendered on request.
+"""
+
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed, Rss201rev2Feed
+from django.utils.text import Truncator
+
+from .models import Category, Post, Tag
+
+ALL = "all"
+CATEGORY = "category"
+TAG = "tag"
+AUTHOR = "author"
+
+FORMATS = {"rss": Rss201rev2Feed, "atom": Atom1Feed}
+FEED_SIZE = 20
+DESCRIPTION_WORDS = 50
+
+
+def get_feed_key(kind, pk, feed_format):
+    return f"post:feed:{kind}:{pk}:{feed_format}"
+
+
+def get_feed_url(kind, pk, feed_format):
+    if kind == ALL:
+        return reverse("feed", kwargs={"feed_format": feed_format})
+    return reverse(f"{kind}_feed", kwargs={"feed_format": feed_format, "pk": pk})
+
+
+def get_title_and_posts(kind, pk):
+    """Return the title of a feed and the posts it is made of, or `None` if its category, tag or
+    author does not exist."""
+    posts = Post.objects.published()
+    if kind == ALL:
+        return settings.FEED_TITLE, posts
+
+    if kind == CATEGORY:
+        name = Category.objects.filter(pk=pk).values_list("name", flat=True).first()
+        title, posts = f"{settings.FEED_TITLE}: {name}", posts.filter(category_id=pk)
+    elif kind == TAG:
+        name = Tag.objects.filter(pk=pk).values_list("name", flat=True).first()
+        title, posts = f"{settings.FEED_TITLE}: posts tagged {name}", posts.filter(tags=pk)
+    else:
+        name = User.objects.filter(pk=pk).values_list("username", flat=True).first()
+        title, posts = f"{settings.FEED_TITLE}: posts by {name}", posts.filter(author_id=pk)
+    if name is None:
+        return None
+    return title, posts
+
+
+def render(kind, pk):
+    """Render a feed in every format and store it. Returns the rendered feeds by format, or
+    `None` if the feed does not exist, in which case it is dropped from the cache."""
+    keys = {feed_format: get_feed_key(kind, pk, feed_format) for feed_format in FORMATS}
+    title_and_posts = get_title_and_posts(kind, pk)
+    if title_and_posts is None:
+        cache.delete_many(keys.values())
+        return None
+
+    title, posts = title_and_posts
+    posts = list(
+        posts.order_by("-publish_date", "-id").only(
+            "title", "subtitle", "body", "publish_date", "date_modified"
+        )[:FEED_SIZE]
+    )
+    last_modified = max((post.date_modified for post in posts), default=None)
+
+    feeds = {}
+    for feed_format, feed_class in FORMATS.items():
+        feed = feed_class(
+            title=title,
+            link=f"{settings.SITE_URL}/",
+            description=title,
+            feed_url=settings.SITE_URL + get_feed_url(kind, pk, feed_format),
+            language="en",
+        )
+        for post in posts:
+            url = settings.SITE_URL + reverse("post_detail", kwargs={"pk": post.pk})
+            feed.add_item(
+                title=post.title,
+                link=url,
+                unique_id=url,
+                description=post.subtitle or Truncator(post.body).words(DESCRIPTION_WORDS),
+                pubdate=post.publish_date,
+                updateddate=post.date_modified,
+            )
+        content = feed.writeString("utf-8")
+        feeds[feed_format] = {
+            "content": content,
+            "content_type": feed.content_type,
+            "etag": hashlib.sha256(content.encode()).hexdigest(),
+            "last_modified": last_modified,
+        }
+
+    # Feeds are replaced whenever they change, so they do not expire.
+    cache.set_many({keys[feed_format]: feed for feed_format, feed in feeds.items()}, timeout=None)
+    return feeds
+
+
+def get_feed(kind, pk, feed_format):
+    """Return a rendered feed, or `None` if it does not exist."""
+    feed = cache.get(get_feed_key(kind, pk, feed_format))
+    if feed is None:
+        feeds = render(kind, pk)
+        feed = feeds and feeds[feed_format]
+    return feed
+
+
+def get_post_feeds(post_ids):
+    """Return the feeds that the posts appear in when they are published."""
+    feeds = {(ALL, None)}
+    for category_id, author_id in Post.objects.filter(pk__in=post_ids).values_list(
+        "category_id", "author_id"
+    ):
+        feeds.update([(CATEGORY, category_id), (AUTHOR, author_id)])
+    tag_ids = Post.tags.through.objects.filter(post_id__in=post_ids).values_list(
+        "tag_id", flat=True
+    )
+    feeds.update((TAG, tag_id) for tag_id in tag_ids)
+    return feeds
@@ -0,0 +1,111 @@
+from datetime import datetime, time, timedelta
+
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Post
+
+
+class PostFilterBackend(BaseFilterBackend):
+    """Filter posts by the query parameters of the post list.
+
+    - `category`: comma-separated category ids.
+    - `tag`: comma-separated tag ids. Posts match if they have any of the tags, or all of them
+      when `tag_match=all`.
+    - `author`: username of the author.
+    - `published`: `true` or `false`.
+    - `publish_date_after` and `publish_date_before`: inclusive bounds, given as ISO 8601 dates
+      or datetimes.
+    """
+
+    TAG_MATCH_CHOICES = ("any", "all")
+
+    def filter_queryset(self, request, queryset, view):
+        params = request.query_params
+        errors = {}
+
+        def parse(name, parser):
+            value = params.get(name)
+            if value is None:
+                return None
+            try:
+                return parser(value)
+            except ValueError as e:
+                errors[name] = [str(e)]
+
+        category_ids = parse("category", self.parse_ids)
+        tag_ids = parse("tag", self.parse_ids)
+        tag_match = parse("tag_match", self.parse_tag_match) or "any"
+        author = params.get("author")
+        published = parse("published", self.parse_bool)
+        publish_date_after = parse("publish_date_after", self.parse_lower_bound)
+        publish_date_before = parse("publish_date_before", self.parse_upper_bound)
+
+        if errors:
+            raise ValidationError(errors)
+
+        if category_ids:
+            queryset = queryset.filter(category_id__in=category_ids)
+        if tag_ids:
+            queryset = self.filter_tags(queryset, tag_ids, tag_match)
+        if author:
+            queryset = queryset.filter(author__username=author)
+        if published is not None:
+            queryset = queryset.filter(published=published)
+        if publish_date_after:
+            queryset = queryset.filter(publish_date__gte=publish_date_after)
+        if publish_date_before:
+            queryset = queryset.filter(publish_date__lt=publish_date_before)
+        return queryset
+
+    def filter_tags(self, queryset, tag_ids, tag_match):
+        # Use EXISTS rather than joining the tags, so posts are not duplicated and no DISTINCT
+        # is needed.
+        post_tags = Post.tags.through.objects.filter(post_id=OuterRef("pk"))
+        if tag_match == "any":
+            return queryset.filter(Exists(post_tags.filter(tag_id__in=tag_ids)))
+        for tag_id in tag_ids:
+            queryset = queryset.filter(Exists(post_tags.filter(tag_id=tag_id)))
+        return queryset
+
+    def parse_ids(self, value):
+        try:
+            return [int(pk) for pk in value.split(",") if pk]
+        except ValueError:
+            raise ValueError("Expected a comma-separated list of ids.")
+
+    def parse_tag_match(self, value):
+        if value not in self.TAG_MATCH_CHOICES:
+            raise ValueError(f"Expected one of: {', '.join(self.TAG_MATCH_CHOICES)}.")
+        return value
+
+    def parse_bool(self, value):
+        if value.lower() not in ("true", "false"):
+            raise ValueError("Expected 'true' or 'false'.")
+        return value.lower() == "true"
+
+    def parse_lower_bound(self, value):
+        return self.parse_date(value, end_of_day=False)
+
+    def parse_upper_bound(self, value):
+        # Dates are inclusive, so the bound is the start of the following day.
+        return self.parse_date(value, end_of_day=True)
+
+    def parse_date(self, value, end_of_day):
+        value = value.replace(" ", "+")  # An unescaped "+" in a UTC offset decodes to a space.
+        parsed = parse_datetime(value)
+        if parsed is None:
+            day = parse_date(value)
+            if day is None:
+                raise ValueError("Expected an ISO 8601 date or datetime.")
+            if end_of_day:
+                day += timedelta(days=1)
+            parsed = datetime.combine(day, time.min)
+        elif end_of_day:
+            parsed += timedelta(microseconds=1)
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
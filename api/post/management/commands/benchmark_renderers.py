@@ -0,0 +1,116 @@
+import statistics
+import time
+from io import BytesIO
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from myproject.parsers import ORJSONParser
+from myproject.renderers import MessagePackRenderer, ORJSONRenderer
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from ...models import Category, Post, Tag
+from ...serializers import PostDetailSerializer
+
+DEFAULT_SIZES = [1000, 10_000]
+
+RENDERERS = {
+    "json": JSONRenderer,
+    "orjson": ORJSONRenderer,
+    "msgpack": MessagePackRenderer,
+}
+PARSERS = {
+    "json": JSONParser,
+    "orjson": ORJSONParser,
+}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = """Compares how long the renderers take to render the output of
+    `PostDetailSerializer`, and the JSON parsers to parse it back, for lists of posts of each
+    size. The posts are created in a transaction that is rolled back at the end."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-s",
+            "--size",
+            type=int,
+            action="append",
+            dest="sizes",
+            help=f"Number of posts; can be repeated. Defaults to "
+            f"{', '.join(map(str, DEFAULT_SIZES))}.",
+        )
+        parser.add_argument(
+            "-r", "--repeat", type=int, default=5, help="Number of runs per measurement."
+        )
+
+    def handle(self, *args, **options):
+        sizes = options["sizes"] or DEFAULT_SIZES
+        try:
+            with transaction.atomic():
+                data = get_serialized_posts(max(sizes))
+                raise Rollback
+        except Rollback:
+            pass
+
+        for size in sizes:
+            self.stdout.write(f"{size} posts:")
+            items = data[:size]
+            for name, renderer_class in RENDERERS.items():
+                content = renderer_class().render(items)
+                seconds = measure(lambda: renderer_class().render(items), options["repeat"])
+                self.report(f"render {name}", seconds, len(content))
+
+            content = JSONRenderer().render(items)
+            for name, parser_class in PARSERS.items():
+                seconds = measure(lambda: parser_class().parse(BytesIO(content)), options["repeat"])
+                self.report(f"parse {name}", seconds, len(content))
+
+    def report(self, label, seconds, num_bytes):
+        self.stdout.write(f"  {label}: {seconds * 1000:.1f} ms ({num_bytes} bytes)")
+
+
+def get_serialized_posts(num_posts):
+    """Create `num_posts` posts and return their representations, as returned by the post
+    detail endpoint."""
+    author = User.objects.create_user(username=f"benchmark-{time.time_ns()}")
+    category = Category.objects.create(name="Benchmark")
+    tags = [Tag.objects.create(name=f"Benchmark {i}") for i in range(3)]
+    now = timezone.now()
+    posts = Post.objects.bulk_create(
+        Post(
+            title=f"Post {i}",
+            subtitle="Subtitle",
+            body="Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 20,
+            author=author,
+            category=category,
+            published=True,
+            publish_date=now,
+        )
+        for i in range(num_posts)
+    )
+    Post.tags.through.objects.bulk_create(
+        Post.tags.through(post_id=post.pk, tag_id=tag.pk) for post in posts for tag in tags
+    )
+
+    serializer = PostDetailSerializer(many=True)
+    serializer.instance = serializer.child.prepare_queryset(
+        Post.objects.filter(author=author).order_by("pk")
+    )
+    return serializer.data
+
+
+def measure(func, repeat):
+    """Return the median time that `func` takes, in seconds."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
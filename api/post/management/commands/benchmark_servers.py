@@ -0,0 +1,132 @@
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+SERVERS = {
+    "wsgi": ["myproject.wsgi:application"],
+    "asgi": ["myproject.asgi:application", "--worker-class", "uvicorn.workers.UvicornWorker"],
+}
+
+DEFAULT_PATHS = ["/api/posts/", "/api/categories/", "/api/tags/"]
+
+
+class Command(BaseCommand):
+    help = """Compares the throughput and latency of the read endpoints when served by gunicorn
+    with sync workers under WSGI and with uvicorn workers under ASGI. Each server is started on
+    a free local port with the current settings and database, and the paths are requested in
+    turn by concurrent clients."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "-p",
+            "--path",
+            action="append",
+            dest="paths",
+            help=f"Path to request; can be repeated. Defaults to {', '.join(DEFAULT_PATHS)}.",
+        )
+        parser.add_argument(
+            "-n", "--requests", type=int, default=1000, help="Number of requests per server."
+        )
+        parser.add_argument(
+            "-c", "--concurrency", type=int, default=50, help="Number of concurrent clients."
+        )
+        parser.add_argument(
+            "-w", "--workers", type=int, default=2, help="Number of worker processes per server."
+        )
+        parser.add_argument(
+            "--token",
+            help="Access token to send with the requests. Authenticated requests bypass the "
+            "response cache.",
+        )
+        parser.add_argument(
+            "--mode",
+            choices=SERVERS,
+            action="append",
+            dest="modes",
+            help="Server to benchmark; can be repeated. Defaults to both.",
+        )
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or DEFAULT_PATHS
+        headers = {"Authorization": f"Bearer {options['token']}"} if options["token"] else {}
+
+        for mode in options["modes"] or SERVERS:
+            port = get_free_port()
+            server = self.start_server(mode, port, options["workers"])
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                self.wait_until_ready(server, base_url + paths[0])
+                results = run_load(
+                    base_url, paths, headers, options["requests"], options["concurrency"]
+                )
+            finally:
+                server.terminate()
+                server.wait()
+            self.report(mode, results)
+
+    def start_server(self, mode, port, workers):
+        command = [sys.executable, "-m", "gunicorn", *SERVERS[mode]]
+        command += ["--bind", f"127.0.0.1:{port}", "--workers", str(workers)]
+        command += ["--log-level", "warning"]
+        return subprocess.Popen(command, cwd=settings.BASE_DIR)
+
+    def wait_until_ready(self, server, url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f"The server exited with code {server.returncode}.")
+            try:
+                urlopen(url).close()
+                return
+            except (ConnectionError, URLError):
+                time.sleep(0.2)
+        raise CommandError(f"The server did not start within {timeout} seconds.")
+
+    def report(self, mode, results):
+        latencies, errors, elapsed = results
+        self.stdout.write(f"{mode}:")
+        self.stdout.write(f"  requests: {len(latencies)} ({errors} failed)")
+        self.stdout.write(f"  throughput: {len(latencies) / elapsed:.1f} requests/s")
+        if len(latencies) > 1:
+            percentiles = statistics.quantiles(latencies, n=100)
+            for percentile in (50, 95, 99):
+                latency = percentiles[percentile - 1] * 1000
+                self.stdout.write(f"  p{percentile} latency: {latency:.1f} ms")
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_load(base_url, paths, headers, num_requests, concurrency):
+    """Request `paths` in turn `num_requests` times. Returns the latency of every request in
+    seconds, the number of failed requests and the total time taken."""
+
+    def fetch(i):
+        request = Request(base_url + paths[i % len(paths)], headers=headers)
+        start = time.perf_counter()
+        try:
+            with urlopen(request) as response:
+                response.read()
+            failed = False
+        except (ConnectionError, URLError):
+            failed = True
+        return time.perf_counter() - start, failed
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(fetch, range(num_requests)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [latency for latency, failed in results]
+    return latencies, sum(failed for latency, failed in results), elapsed
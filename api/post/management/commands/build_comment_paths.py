@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from ...models import Comment
+
+
+class Command(BaseCommand):
+    help = """Rebuilds the materialized path and depth of every comment. Run this once after
+    adding the columns, or whenever the hierarchy index gets out of sync with `parent_comment`."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            "-b",
+            type=int,
+            default=1000,
+            dest="batch_size",
+            help="Number of comments to update per query.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+
+        # Only ids are loaded, so the whole hierarchy fits in memory even for large tables.
+        parents = dict(Comment.objects.values_list("pk", "parent_comment_id").iterator())
+        paths = {}
+        depths = {}
+
+        def resolve(pk):
+            # Walk up to the nearest ancestor with a known path, then fill in paths on the way
+            # back down. This avoids recursion limits on deep threads.
+            chain = []
+            while pk is not None and pk not in paths:
+                chain.append(pk)
+                pk = parents[pk]
+            parent_path = paths[pk] if pk is not None else ""
+            depth = depths[pk] + 1 if pk is not None else 0
+            for pk in reversed(chain):
+                paths[pk] = parent_path = Comment.build_path(pk, parent_path)
+                depths[pk] = depth
+                depth += 1
+
+        for pk in parents:
+            resolve(pk)
+
+        comments = [Comment(pk=pk, path=paths[pk], depth=depths[pk]) for pk in parents]
+        for start in range(0, len(comments), batch_size):
+            end = start + batch_size
+            with transaction.atomic():
+                Comment.objects.bulk_update(comments[start:end], ["path", "depth"])
+
+        self.stdout.write(f"Rebuilt paths for {len(comments)} comment(s).")
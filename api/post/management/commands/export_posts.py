@@ -0,0 +1,73 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+
+from ...models import Post, Tag
+
+
+class Command(BaseCommand):
+    help = """Exports every post as newline-delimited JSON, with its author, category and tags
+    given by name. Posts are streamed from the database in chunks, so memory use does not grow
+    with the number of posts. The output can be read back with `import_posts`."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path",
+            nargs="?",
+            default="-",
+            help="File to write the posts to. Defaults to standard output.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            "-b",
+            type=int,
+            default=1000,
+            dest="batch_size",
+            help="Number of posts to read per query.",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            file = (
+                self.stdout
+                if options["path"] == "-"
+                else open(options["path"], "w", encoding="utf-8")
+            )
+        except OSError as e:
+            raise CommandError(f"Cannot write the posts: {e}")
+
+        posts = (
+            Post.objects.select_related("author", "category")
+            .prefetch_related(Prefetch("tags", queryset=Tag.objects.only("name")))
+            .only(
+                "title",
+                "subtitle",
+                "body",
+                "published",
+                "publish_date",
+                "author__username",
+                "category__name",
+            )
+            .order_by("pk")
+        )
+
+        num_posts = 0
+        for post in posts.iterator(chunk_size=options["batch_size"]):
+            line = {
+                "title": post.title,
+                "subtitle": post.subtitle,
+                "body": post.body,
+                "author": post.author.username,
+                "category": post.category.name,
+                "tags": [tag.name for tag in post.tags.all()],
+                "published": post.published,
+                "publish_date": post.publish_date,
+            }
+            file.write(json.dumps(line, cls=DjangoJSONEncoder, ensure_ascii=False) + "\n")
+            num_posts += 1
+
+        if file is not self.stdout:
+            file.close()
+            self.stdout.write(f"{num_posts} post(s) exported.")
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from ... import reaction_buffer
+
+
+class Command(BaseCommand):
+    help = """Writes the reactions buffered in Redis to the database, in batches of comments,
+    every few seconds until interrupted. Pass `--once` to flush what is buffered and exit. Only
+    needed when the `REACTION_BUFFER` setting is enabled. Reactions claimed by a flush that was
+    interrupted are written by the next one."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            "-b",
+            type=int,
+            default=1000,
+            dest="batch_size",
+            help="Number of comments to flush the reactions of per transaction.",
+        )
+        parser.add_argument(
+            "--interval",
+            "-i",
+            type=float,
+            default=5,
+            dest="interval",
+            help="Seconds to wait between flushes.",
+        )
+        parser.add_argument(
+            "--once",
+            action="store_true",
+            dest="once",
+            help="Flush what is buffered and exit.",
+        )
+
+    def handle(self, *args, **options):
+        if options["once"]:
+            self.flush_all(options["batch_size"])
+            return
+
+        try:
+            while True:
+                self.flush_all(options["batch_size"])
+                time.sleep(options["interval"])
+        except KeyboardInterrupt:
+            pass
+
+    def flush_all(self, batch_size):
+        num_comments_flushed = 0
+        while True:
+            num_comments = reaction_buffer.flush(batch_size)
+            if num_comments is None:
+                self.stderr.write("Another flush is running.")
+                break
+            if num_comments == 0:
+                break
+            num_comments_flushed += num_comments
+
+        if num_comments_flushed:
+            self.stdout.write(f"Flushed the reactions to {num_comments_flushed} comment(s).")
@@ -0,0 +1,204 @@
+import json
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from ...feeds import get_post_feeds
+from ...models import Category, Post, Tag, invalidate_posts
+from ...tasks import enqueue, regenerate_post_feeds
+
+POST_FIELDS = ("subtitle", "body", "published", "publish_date", "author", "category")
+MAX_LENGTHS = {
+    "title": Post._meta.get_field("title").max_length,
+    "subtitle": Post._meta.get_field("subtitle").max_length,
+    "body": None,
+    "author": User._meta.get_field("username").max_length,
+    "category": Category._meta.get_field("name").max_length,
+    "tags": Tag._meta.get_field("name").max_length,
+}
+
+
+def parse_post(line):
+    """Parse one line of an export into the fields of a post, with its author, category and
+    tags given by name. Raises `ValueError` if the line is not a valid post."""
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("Expected a JSON object.")
+
+    missing = [field for field in ("title", "body", "author", "category") if not data.get(field)]
+    if missing:
+        raise ValueError(f"Missing required field(s): {', '.join(missing)}.")
+
+    tags = data.get("tags") or []
+    if not isinstance(tags, list):
+        raise ValueError("Expected tags to be a list of names.")
+    for field, max_length in MAX_LENGTHS.items():
+        values = tags if field == "tags" else [data.get(field) or ""]
+        for value in values:
+            if not isinstance(value, str):
+                raise ValueError(f"Expected {field} to be text.")
+            if max_length is not None and len(value) > max_length:
+                raise ValueError(f"Expected {field} to be at most {max_length} characters long.")
+
+    published = data.get("published", False)
+    if not isinstance(published, bool):
+        raise ValueError("Expected published to be true or false.")
+
+    publish_date = data.get("publish_date")
+    if publish_date:
+        publish_date = parse_datetime(publish_date)
+        if publish_date is None:
+            raise ValueError("Expected publish_date to be an ISO 8601 datetime.")
+        if timezone.is_naive(publish_date):
+            publish_date = timezone.make_aware(publish_date)
+
+    return {
+        "title": data["title"],
+        "subtitle": data.get("subtitle") or "",
+        "body": data["body"],
+        "published": published,
+        "publish_date": publish_date or None,
+        "author": data["author"],
+        "category": data["category"],
+        "tags": tags,
+    }
+
+
+def resolve_names(model, names):
+    """Return a mapping of each name to the id of the `model` instance with that name, creating
+    the missing instances in bulk."""
+    ids = dict(model.objects.filter(name__in=names).values_list("name", "id"))
+    missing = set(names) - ids.keys()
+    if missing:
+        # Another import may create the same names concurrently.
+        model.objects.bulk_create([model(name=name) for name in missing], ignore_conflicts=True)
+        ids.update(model.objects.filter(name__in=missing).values_list("name", "id"))
+    return ids
+
+
+class Command(BaseCommand):
+    help = """Imports posts from newline-delimited JSON, as written by `export_posts`. Posts
+    are matched by title: existing posts are updated and new ones created. Tags and categories
+    are created as needed, but authors must already exist. Posts are written in batches, each in
+    its own transaction."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "path", help="File to read the posts from, or '-' to read from standard input."
+        )
+        parser.add_argument(
+            "--batch-size",
+            "-b",
+            type=int,
+            default=1000,
+            dest="batch_size",
+            help="Number of posts to write per transaction.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        try:
+            file = sys.stdin if options["path"] == "-" else open(options["path"], encoding="utf-8")
+        except OSError as e:
+            raise CommandError(f"Cannot read the posts: {e}")
+
+        self.num_created = 0
+        self.num_updated = 0
+        self.num_skipped = 0
+        # Authors are looked up once per import.
+        self.author_ids = {}
+
+        with file:
+            batch = {}
+            for line_number, line in enumerate(file, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    post = parse_post(line)
+                except ValueError as e:
+                    self.skip(line_number, e)
+                    continue
+                # Within a batch, the last line for a title wins.
+                batch[post["title"]] = (line_number, post)
+                if len(batch) == batch_size:
+                    self.import_batch(batch.values())
+                    batch = {}
+            if batch:
+                self.import_batch(batch.values())
+
+        self.stdout.write(
+            f"{self.num_created} post(s) created, {self.num_updated} updated and "
+            f"{self.num_skipped} skipped."
+        )
+
+    def skip(self, line_number, reason):
+        self.stderr.write(f"Line {line_number}: {reason}")
+        self.num_skipped += 1
+
+    def import_batch(self, lines):
+        usernames = {post["author"] for _, post in lines} - self.author_ids.keys()
+        self.author_ids.update(
+            User.objects.filter(username__in=usernames).values_list("username", "id")
+        )
+
+        posts = []
+        for line_number, post in lines:
+            if post["author"] not in self.author_ids:
+                self.skip(line_number, f"The author '{post['author']}' does not exist.")
+                continue
+            posts.append(post)
+        if not posts:
+            return
+
+        with transaction.atomic():
+            category_ids = resolve_names(Category, {post["category"] for post in posts})
+            tag_ids = resolve_names(Tag, {name for post in posts for name in post["tags"]})
+
+            titles = [post["title"] for post in posts]
+            existing_ids = dict(Post.objects.filter(title__in=titles).values_list("title", "id"))
+            # The feeds that the updated posts are in before the import, as the import may move
+            # them to another category, author or tags.
+            previous_feed_ids = get_post_feeds(existing_ids.values())
+            Post.objects.bulk_create(
+                [
+                    Post(
+                        title=post["title"],
+                        subtitle=post["subtitle"],
+                        body=post["body"],
+                        published=post["published"],
+                        publish_date=post["publish_date"],
+                        author_id=self.author_ids[post["author"]],
+                        category_id=category_ids[post["category"]],
+                    )
+                    for post in posts
+                ],
+                update_conflicts=True,
+                unique_fields=["title"],
+                update_fields=[*POST_FIELDS, "date_modified"],
+            )
+            post_ids = dict(Post.objects.filter(title__in=titles).values_list("title", "id"))
+
+            # Replace the tags of the posts that were updated.
+            PostTag = Post.tags.through
+            PostTag.objects.filter(post_id__in=post_ids.values()).delete()
+            PostTag.objects.bulk_create(
+                [
+                    PostTag(post_id=post_ids[post["title"]], tag_id=tag_ids[name])
+                    for post in posts
+                    for name in set(post["tags"])
+                ]
+            )
+
+            transaction.on_commit(lambda: invalidate_posts(post_ids.values(), "categories", "tags"))
+            enqueue(regenerate_post_feeds, list(post_ids.values()), list(previous_feed_ids))
+
+        self.num_created += len(posts) - len(existing_ids)
+        self.num_updated += len(existing_ids)
+        self.stdout.write(f"{self.num_created + self.num_updated} post(s) imported...")
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Max
+
+from ...models import Comment
+from ...tasks import get_reaction_counters
+
+
+class Command(BaseCommand):
+    help = """Recomputes the like and dislike counters of every comment from the `Reaction`
+    table. Comments are updated in id ranges so that no statement locks the whole table."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            "-b",
+            type=int,
+            default=1000,
+            dest="batch_size",
+            help="Number of comment ids to update per query.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options["batch_size"]
+        max_pk = Comment.objects.aggregate(max_pk=Max("pk"))["max_pk"] or 0
+        counters = get_reaction_counters()
+
+        num_comments_updated = 0
+        for start in range(0, max_pk + 1, batch_size):
+            comments = Comment.objects.filter(pk__gte=start, pk__lt=start + batch_size)
+            num_comments_updated += comments.update(**counters)
+
+        self.stdout.write(f"Reconciled reaction counts for {num_comments_updated} comment(s).")
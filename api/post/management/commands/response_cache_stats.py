@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from myproject.cache import get_stats
+
+
+class Command(BaseCommand):
+    help = """Prints the hit, miss and invalidation counters of the response cache, which are
+    shared by all workers."""
+
+    def handle(self, *args, **options):
+        stats = get_stats()
+        lookups = stats["hits"] + stats["misses"]
+        hit_rate = stats["hits"] / lookups * 100 if lookups else 0
+
+        for stat, value in stats.items():
+            self.stdout.write(f"{stat}: {value}")
+        self.stdout.write(f"hit rate: {hit_rate:.1f}%")
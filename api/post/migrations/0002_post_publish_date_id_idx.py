@@ -0,0 +1,35 @@
+# Generated by Django 5.0 on 2026-10-18 03:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("post", "0001_initial"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="post",
+            options={"ordering": ["-publish_date", "-id"]},
+        ),
+        migrations.RemoveField(
+            model_name="comment",
+            name="is_deleted",
+        ),
+        migrations.RemoveField(
+            model_name="post",
+            name="meta_description",
+        ),
+        migrations.RemoveField(
+            model_name="post",
+            name="slug",
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["-publish_date", "-id"], name="post_publish_date_id_idx"),
+        ),
+    ]
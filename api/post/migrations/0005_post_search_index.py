@@ -0,0 +1,96 @@
+from django.db import migrations
+
+# The search index lives outside of the `Post` model, so that list queries never load it.
+# PostgreSQL keeps a weighted tsvector column up to date with a trigger and indexes it with GIN.
+# SQLite keeps an FTS5 external content table in sync with triggers.
+#
+# Note that on SQLite, migrations that have to rebuild the `post_post` table drop its triggers,
+# so they need to recreate them afterwards.
+
+POSTGRESQL_FORWARD = [
+    "ALTER TABLE post_post ADD COLUMN search_vector tsvector",
+    """
+    CREATE FUNCTION post_post_search_vector_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('pg_catalog.english', coalesce(NEW.title, '')), 'A') ||
+            setweight(to_tsvector('pg_catalog.english', coalesce(NEW.subtitle, '')), 'B') ||
+            setweight(to_tsvector('pg_catalog.english', coalesce(NEW.body, '')), 'C');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER post_post_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, subtitle, body ON post_post
+    FOR EACH ROW EXECUTE FUNCTION post_post_search_vector_update()
+    """,
+    # Fire the trigger for existing posts.
+    "UPDATE post_post SET title = title",
+    "CREATE INDEX post_post_search_vector_idx ON post_post USING gin (search_vector)",
+]
+
+POSTGRESQL_BACKWARD = [
+    "DROP TRIGGER post_post_search_vector_trigger ON post_post",
+    "DROP FUNCTION post_post_search_vector_update()",
+    "ALTER TABLE post_post DROP COLUMN search_vector",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE post_post_fts USING fts5(
+        title, subtitle, body, content='post_post', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    """
+    CREATE TRIGGER post_post_fts_insert AFTER INSERT ON post_post BEGIN
+        INSERT INTO post_post_fts(rowid, title, subtitle, body)
+        VALUES (new.id, new.title, new.subtitle, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER post_post_fts_delete AFTER DELETE ON post_post BEGIN
+        INSERT INTO post_post_fts(post_post_fts, rowid, title, subtitle, body)
+        VALUES ('delete', old.id, old.title, old.subtitle, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER post_post_fts_update AFTER UPDATE OF title, subtitle, body ON post_post BEGIN
+        INSERT INTO post_post_fts(post_post_fts, rowid, title, subtitle, body)
+        VALUES ('delete', old.id, old.title, old.subtitle, old.body);
+        INSERT INTO post_post_fts(rowid, title, subtitle, body)
+        VALUES (new.id, new.title, new.subtitle, new.body);
+    END
+    """,
+    # Index existing posts.
+    "INSERT INTO post_post_fts(post_post_fts) VALUES ('rebuild')",
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER post_post_fts_insert",
+    "DROP TRIGGER post_post_fts_delete",
+    "DROP TRIGGER post_post_fts_update",
+    "DROP TABLE post_post_fts",
+]
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("post", "0004_comment_reaction_counts"),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run_for_vendor({"postgresql": POSTGRESQL_FORWARD, "sqlite": SQLITE_FORWARD}),
+            run_for_vendor({"postgresql": POSTGRESQL_BACKWARD, "sqlite": SQLITE_BACKWARD}),
+        ),
+    ]
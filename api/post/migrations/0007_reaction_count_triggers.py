@@ -0,0 +1,145 @@
+from django.db import migrations
+from django.db.models import Count, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+# Triggers on `post_reaction` keep the reaction counters of `post_comment` in sync, so that a
+# reaction can be written with a single upsert that does not need to know the previous reaction.
+# They also cover reactions deleted along with their user. On other databases the counters are
+# only fixed by the `reconcile_reaction_counts` command.
+#
+# The counters are added by `0004_comment_reaction_counts` with a default of 0, so they are
+# backfilled from the existing reactions before the triggers start adjusting them.
+#
+# Note that on SQLite, migrations that have to rebuild the `post_reaction` table drop its
+# triggers, so they need to recreate them afterwards.
+
+POSTGRESQL_FORWARD = [
+    """
+    CREATE FUNCTION post_reaction_count_update() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            UPDATE post_comment SET
+                like_count = like_count - (OLD.reaction_type = 'LIKE')::int,
+                dislike_count = dislike_count - (OLD.reaction_type = 'DISLIKE')::int
+            WHERE id = OLD.comment_id;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            UPDATE post_comment SET
+                like_count = like_count + (NEW.reaction_type = 'LIKE')::int,
+                dislike_count = dislike_count + (NEW.reaction_type = 'DISLIKE')::int
+            WHERE id = NEW.comment_id;
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER post_reaction_count_insert_delete_trigger
+    AFTER INSERT OR DELETE ON post_reaction
+    FOR EACH ROW EXECUTE FUNCTION post_reaction_count_update()
+    """,
+    """
+    CREATE TRIGGER post_reaction_count_update_trigger
+    AFTER UPDATE OF reaction_type, comment_id ON post_reaction
+    FOR EACH ROW
+    WHEN (
+        OLD.reaction_type IS DISTINCT FROM NEW.reaction_type
+        OR OLD.comment_id IS DISTINCT FROM NEW.comment_id
+    )
+    EXECUTE FUNCTION post_reaction_count_update()
+    """,
+]
+
+POSTGRESQL_BACKWARD = [
+    "DROP TRIGGER post_reaction_count_update_trigger ON post_reaction",
+    "DROP TRIGGER post_reaction_count_insert_delete_trigger ON post_reaction",
+    "DROP FUNCTION post_reaction_count_update()",
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE TRIGGER post_reaction_count_insert AFTER INSERT ON post_reaction BEGIN
+        UPDATE post_comment SET
+            like_count = like_count + (new.reaction_type = 'LIKE'),
+            dislike_count = dislike_count + (new.reaction_type = 'DISLIKE')
+        WHERE id = new.comment_id;
+    END
+    """,
+    """
+    CREATE TRIGGER post_reaction_count_delete AFTER DELETE ON post_reaction BEGIN
+        UPDATE post_comment SET
+            like_count = like_count - (old.reaction_type = 'LIKE'),
+            dislike_count = dislike_count - (old.reaction_type = 'DISLIKE')
+        WHERE id = old.comment_id;
+    END
+    """,
+    """
+    CREATE TRIGGER post_reaction_count_update AFTER UPDATE OF reaction_type, comment_id
+    ON post_reaction
+    WHEN old.reaction_type IS NOT new.reaction_type OR old.comment_id IS NOT new.comment_id
+    BEGIN
+        UPDATE post_comment SET
+            like_count = like_count - (old.reaction_type = 'LIKE'),
+            dislike_count = dislike_count - (old.reaction_type = 'DISLIKE')
+        WHERE id = old.comment_id;
+        UPDATE post_comment SET
+            like_count = like_count + (new.reaction_type = 'LIKE'),
+            dislike_count = dislike_count + (new.reaction_type = 'DISLIKE')
+        WHERE id = new.comment_id;
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER post_reaction_count_insert",
+    "DROP TRIGGER post_reaction_count_delete",
+    "DROP TRIGGER post_reaction_count_update",
+]
+
+
+# Number of comment ids backfilled per query, as in `reconcile_reaction_counts`.
+BACKFILL_BATCH_SIZE = 1000
+
+
+def backfill_reaction_counts(apps, schema_editor):
+    Comment = apps.get_model("post", "Comment")
+    Reaction = apps.get_model("post", "Reaction")
+
+    def count_reactions(reaction_type):
+        reactions = (
+            Reaction.objects.filter(comment=OuterRef("pk"), reaction_type=reaction_type)
+            .order_by()
+            .values("comment")
+            .annotate(count=Count("pk"))
+            .values("count")
+        )
+        return Coalesce(Subquery(reactions), 0)
+
+    max_pk = Comment.objects.aggregate(max_pk=Max("pk"))["max_pk"] or 0
+    for start in range(0, max_pk + 1, BACKFILL_BATCH_SIZE):
+        Comment.objects.filter(pk__gte=start, pk__lt=start + BACKFILL_BATCH_SIZE).update(
+            like_count=count_reactions("LIKE"), dislike_count=count_reactions("DISLIKE")
+        )
+
+
+def run_for_vendor(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("post", "0006_post_timeline_indexes"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_reaction_counts, migrations.RunPython.noop),
+        migrations.RunPython(
+            run_for_vendor({"postgresql": POSTGRESQL_FORWARD, "sqlite": SQLITE_FORWARD}),
+            run_for_vendor({"postgresql": POSTGRESQL_BACKWARD, "sqlite": SQLITE_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0 on 2026-10-18 04:09
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("post", "0007_reaction_count_triggers"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("publish_date__isnull", False), ("published", False)),
+                fields=["publish_date"],
+                name="post_scheduled_idx",
+            ),
+        ),
+    ]
@@ -1,5 +1,10 @@
+from account.models import Profile
 from django.contrib.auth.models import User
 from django.db import models
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+from myproject import cache
 
 
 class Tag(models.Model):
@@ -19,6 +24,28 @@ class Category(models.Model):
         return self.name
 
 
+class PostQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(published=True)
+
+    def due(self, now):
+        """Return the scheduled posts whose publish date is not after `now`."""
+        return self.filter(published=False, publish_date__lte=now)
+
+    def visible_to(self, user, role=None):
+        """Return the posts `user` may read. Drafts are only visible to admins and their authors.
+
+        The role of the user is read from their profile unless given.
+        """
+        if not user.is_authenticated:
+            return self.published()
+        if role is None:
+            role = user.profile.role
+        if role == Profile.ADMIN:
+            return self
+        return self.filter(Q(published=True) | Q(author_id=user.pk))
+
+
 class Post(models.Model):
     title = models.CharField(max_length=255, unique=True)
     subtitle = models.CharField(max_length=255, blank=True)
@@ -32,14 +59,61 @@ class Post(models.Model):
     tags = models.ManyToManyField(Tag, blank=True)
     category = models.ForeignKey(Category, on_delete=models.PROTECT)
 
+    objects = PostQuerySet.as_manager()
+
     class Meta:
-        ordering = ["-publish_date"]
+        ordering = ["-publish_date", "-id"]
+        indexes = [
+            models.Index(fields=["-publish_date", "-id"], name="post_publish_date_id_idx"),
+            # Timelines of published posts, as read by anonymous users.
+            models.Index(
+                fields=["-publish_date", "-id"],
+                condition=Q(published=True),
+                name="post_published_date_id_idx",
+            ),
+            models.Index(
+                fields=["category", "-publish_date", "-id"],
+                condition=Q(published=True),
+                name="post_category_timeline_idx",
+            ),
+            models.Index(
+                fields=["author", "-publish_date", "-id"],
+                condition=Q(published=True),
+                name="post_author_timeline_idx",
+            ),
+            # Queue of the scheduled posts, as read by `post.tasks.publish_scheduled_posts`.
+            models.Index(
+                fields=["publish_date"],
+                condition=Q(published=False, publish_date__isnull=False),
+                name="post_scheduled_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        post = super().from_db(db, field_names, values)
+        # Remember the stored state, so that saving can tell which feeds the post left.
+        post._stored_feed_state = post.get_feed_state()
+        return post
+
+    def get_feed_state(self):
+        return {
+            "published": self.__dict__.get("published"),
+            "category_id": self.__dict__.get("category_id"),
+            "author_id": self.__dict__.get("author_id"),
+        }
+
 
 class Comment(models.Model):
+    # Each comment stores the materialized path of its position in the thread, made up of the
+    # zero-padded ids of its ancestors and itself, e.g. "0000000003/0000000017/". A subtree is
+    # then a single prefix range scan on `path`, and the ancestors are read off the path.
+    PATH_SEPARATOR = "/"
+    PATH_STEP_WIDTH = 10
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
     post = models.ForeignKey(Post, on_delete=models.CASCADE)
     parent_comment = models.ForeignKey(
@@ -48,6 +122,12 @@ class Comment(models.Model):
     text = models.TextField()
     date_created = models.DateTimeField(auto_now_add=True)
     date_modified = models.DateTimeField(auto_now=True)
+    # Room for 100 levels of replies.
+    path = models.CharField(max_length=1100, blank=True, db_index=True, editable=False)
+    depth = models.PositiveIntegerField(default=0, editable=False)
+    # Denormalized from `Reaction`, kept in sync by database triggers.
+    like_count = models.IntegerField(default=0, editable=False)
+    dislike_count = models.IntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ["-date_created"]
@@ -55,11 +135,58 @@ class Comment(models.Model):
     def __str__(self):
         return self.text
 
+    @classmethod
+    def build_path(cls, pk, parent_path=""):
+        return f"{parent_path}{pk:0{cls.PATH_STEP_WIDTH}d}{cls.PATH_SEPARATOR}"
+
+    def save(self, *args, **kwargs):
+        creating = not self.path
+        if creating:
+            parent = self.parent_comment
+            self.depth = parent.depth + 1 if parent else 0
+
+        if not self._state.adding and not args and kwargs.get("update_fields") is None:
+            # The reaction counters are only written by the triggers, and may have changed since
+            # the comment was loaded, so updates leave them alone.
+            skipped = {*Reaction.COUNTER_FIELDS.values(), *self.get_deferred_fields()}
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+
+        super().save(*args, **kwargs)
+
+        if creating:
+            # The path ends with this comment's own id, so it can only be set after the insert.
+            self.path = self.build_path(self.pk, parent.path if parent else "")
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+    def delete(self, *args, **kwargs):
+        # Delete the whole subtree at once rather than letting the cascade walk the replies
+        # one level at a time.
+        if not self.path:
+            return super().delete(*args, **kwargs)
+        return Comment.objects.filter(path__startswith=self.path).delete()
+
+    def get_descendants(self):
+        return Comment.objects.filter(path__startswith=self.path, depth__gt=self.depth)
+
+    def get_descendant_count(self):
+        return self.get_descendants().count()
+
+    def get_ancestor_ids(self):
+        return [int(step) for step in self.path.split(self.PATH_SEPARATOR)[:-2]]
+
+    def get_ancestors(self):
+        """Return the ancestors of this comment, starting from the top-level comment."""
+        return Comment.objects.filter(pk__in=self.get_ancestor_ids()).order_by("depth")
+
     def get_like_count(self):
-        return self.reactions.filter(reaction_type=Reaction.LIKE).count()
+        return self.like_count
 
     def get_dislike_count(self):
-        return self.reactions.filter(reaction_type=Reaction.DISLIKE).count()
+        return self.dislike_count
 
     def user_reaction(self, user):
         try:
@@ -78,8 +205,14 @@ class Reaction(models.Model):
         (DISLIKE, DISLIKE),
     )
 
+    # The `Comment` counter that tracks each reaction type.
+    COUNTER_FIELDS = {
+        LIKE: "like_count",
+        DISLIKE: "dislike_count",
+    }
+
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="reactions")
-    comment = models.ForeignKey(Comment, on_delete=models.CASCADE)
+    comment = models.ForeignKey(Comment, on_delete=models.CASCADE, related_name="reactions")
     reaction_type = models.CharField(max_length=7, choices=REACTION_CHOICES, default=NEUTRAL)
 
     class Meta:
@@ -87,11 +220,163 @@ class Reaction(models.Model):
 
     @classmethod
     def set_reaction(cls, user, comment, reaction_type):
-        # Update or create a new reaction for the user and comment.
-        cls.objects.update_or_create(
-            user=user,
-            comment=comment,
-            defaults={
-                "reaction_type": reaction_type,
-            },
+        cls.set_reactions(user, {comment: reaction_type})
+
+    @classmethod
+    def set_reactions(cls, user, reaction_types):
+        """Set the reactions of `user` to many comments at once, given a mapping of comments to
+        reaction types.
+
+        The reactions are written with a single upsert. The comment counters are kept in sync
+        by database triggers, see the `0007_reaction_count_triggers` migration.
+        """
+        if not reaction_types:
+            return
+        cls.objects.bulk_create(
+            [
+                cls(user_id=user.pk, comment_id=comment.pk, reaction_type=reaction_type)
+                for comment, reaction_type in reaction_types.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["user", "comment"],
+            update_fields=["reaction_type"],
         )
+        invalidate_comments({comment.post_id for comment in reaction_types})
+
+
+# Drop the cached responses that depend on a model whenever it changes. The tags match the
+# ones declared with `cache_response` in `post.views`. Writes in bulk do not send signals, so
+# they call `invalidate_posts` and `invalidate_comments` themselves.
+def invalidate_posts(post_ids, *tags):
+    """Drop the cached listings and the cached responses of the posts, along with `tags`."""
+    cache.invalidate("posts", *(f"post:{post_id}" for post_id in post_ids), *tags)
+
+
+def invalidate_comments(post_ids):
+    """Drop the cached comments of the posts."""
+    cache.invalidate(*(f"post:{post_id}:comments" for post_id in post_ids))
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_cache(sender, instance, **kwargs):
+    invalidate_posts([instance.pk])
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def invalidate_post_tags_cache(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith("post_"):
+        return
+    if reverse:
+        # The tag's posts changed, and we may not know which ones.
+        cache.invalidate("posts", "tags")
+    else:
+        invalidate_posts([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_cache(sender, instance, **kwargs):
+    invalidate_comments([instance.post_id])
+
+
+@receiver(post_save, sender=Reaction)
+@receiver(post_delete, sender=Reaction)
+def invalidate_reaction_cache(sender, instance, **kwargs):
+    if Reaction.comment.is_cached(instance):
+        invalidate_comments([instance.comment.post_id])
+    else:
+        # Looking up the post of the comment is left to a worker.
+        from .tasks import enqueue, invalidate_comment_cache
+
+        enqueue(invalidate_comment_cache, instance.comment_id)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, instance, **kwargs):
+    cache.invalidate("categories")
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_tag_cache(sender, instance, **kwargs):
+    cache.invalidate("tags")
+
+
+# Regenerate the feeds that a change affects, see `post.feeds`. Feeds only list published posts,
+# and their items only show the fields of the posts, so changes to drafts affect no feed.
+@receiver(post_save, sender=Post)
+def regenerate_feeds_on_post_save(sender, instance, **kwargs):
+    from .feeds import AUTHOR, CATEGORY
+    from .tasks import enqueue, regenerate_post_feeds
+
+    stored_state = getattr(instance, "_stored_feed_state", {})
+    instance._stored_feed_state = instance.get_feed_state()
+    if not (instance.published or stored_state.get("published")):
+        return
+
+    extra_feed_ids = [
+        (kind, stored_state[field])
+        for kind, field in ((CATEGORY, "category_id"), (AUTHOR, "author_id"))
+        if stored_state.get(field) not in (None, getattr(instance, field))
+    ]
+    enqueue(regenerate_post_feeds, [instance.pk], extra_feed_ids)
+
+
+@receiver(pre_delete, sender=Post)
+def remember_post_feeds(sender, instance, **kwargs):
+    from .feeds import get_post_feeds
+
+    # The tags of the post are gone once it is deleted.
+    if instance.published:
+        instance._feed_ids = get_post_feeds([instance.pk])
+
+
+@receiver(post_delete, sender=Post)
+def regenerate_feeds_on_post_delete(sender, instance, **kwargs):
+    from .tasks import enqueue, regenerate_feeds
+
+    feed_ids = getattr(instance, "_feed_ids", None)
+    if feed_ids:
+        enqueue(regenerate_feeds, list(feed_ids))
+
+
+@receiver(m2m_changed, sender=Post.tags.through)
+def regenerate_tag_feeds(sender, instance, action, reverse, pk_set, **kwargs):
+    from .feeds import TAG
+    from .tasks import enqueue, regenerate_feeds
+
+    if reverse:
+        # The posts of the tag changed.
+        if action.startswith("post_"):
+            enqueue(regenerate_feeds, [(TAG, instance.pk)])
+        return
+    if not instance.published:
+        return
+    if action == "pre_clear":
+        instance._cleared_tag_ids = list(instance.tags.values_list("pk", flat=True))
+    elif action.startswith("post_"):
+        tag_ids = getattr(instance, "_cleared_tag_ids", []) if action == "post_clear" else pk_set
+        enqueue(regenerate_feeds, [(TAG, tag_id) for tag_id in tag_ids])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def regenerate_named_feed(sender, instance, created=False, update_fields=None, **kwargs):
+    from .feeds import AUTHOR, CATEGORY, TAG
+    from .tasks import enqueue, regenerate_feeds
+
+    # The titles of these feeds show the name of their category, tag or author. New ones have no
+    # posts yet.
+    if created:
+        return
+    if sender is User and update_fields is not None and "username" not in update_fields:
+        # E.g. the last login of the user was recorded.
+        return
+    kind = {Category: CATEGORY, Tag: TAG, User: AUTHOR}[sender]
+    enqueue(regenerate_feeds, [(kind, instance.pk)])
@@ -0,0 +1,117 @@
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, PageNumberPagination
+
+from .models import Post
+
+
+class PostCursorPagination(CursorPagination):
+    """Keyset pagination over `Post.Meta.ordering`, i.e. `(-publish_date, -id)`.
+
+    Each cursor stores the `(publish_date, id)` of the row it starts after, so every page is
+    a range scan on the ordering index instead of an OFFSET that gets slower the deeper a
+    client pages.
+    """
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
+    ordering = Post._meta.ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        return self.set_page(list(self.get_page_queryset(queryset, request)))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Like `paginate_queryset`, but fetches the page with the async ORM."""
+        return self.set_page([post async for post in self.get_page_queryset(queryset, request)])
+
+    def get_page_queryset(self, queryset, request):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.cursor = self.decode_cursor(request)
+
+        reverse = self.cursor.reverse if self.cursor else False
+        queryset = queryset.order_by(*self.ordering)
+        if self.cursor:
+            position = self.decode_position(self.cursor.position)
+            queryset = queryset.filter(self.get_keyset_filter(queryset.db, position, reverse))
+        if reverse:
+            queryset = queryset.reverse()
+
+        # Fetch one extra row to find out if there is a page after this one.
+        return queryset[: self.page_size + 1]
+
+    def set_page(self, results):
+        reverse = self.cursor.reverse if self.cursor else False
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+
+        if reverse:
+            self.page.reverse()
+            self.has_next = True
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = self.cursor is not None
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self.encode_position(self.page[-1])
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self.encode_position(self.page[0])
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def encode_position(self, post):
+        publish_date = post.publish_date.isoformat() if post.publish_date else ""
+        return f"{post.pk}_{publish_date}"
+
+    def decode_position(self, position):
+        try:
+            pk, publish_date = position.split("_", 1)
+            pk = int(pk)
+            publish_date = parse_datetime(publish_date) if publish_date else None
+        except (AttributeError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        return publish_date, pk
+
+    def get_keyset_filter(self, using, position, reverse):
+        """Return the rows that come after `position`, or before it when `reverse` is set.
+
+        Unpublished posts have no `publish_date`, and backends disagree on where NULLs land in
+        a descending sort, so we ask the connection rather than assume.
+        """
+        publish_date, pk = position
+        nulls_first = connections[using].features.nulls_order_largest
+        id_lookup = "id__gt" if reverse else "id__lt"
+        date_lookup = "publish_date__gt" if reverse else "publish_date__lt"
+
+        if publish_date is None:
+            keyset = Q(publish_date__isnull=True, **{id_lookup: pk})
+            if nulls_first != reverse:
+                keyset |= Q(publish_date__isnull=False)
+        else:
+            keyset = Q(**{date_lookup: publish_date}) | Q(
+                publish_date=publish_date, **{id_lookup: pk}
+            )
+            if nulls_first == reverse:
+                keyset |= Q(publish_date__isnull=True)
+        return keyset
+
+
+class PostSearchPagination(PageNumberPagination):
+    """Page number pagination for search results, which are ordered by relevance rather than by
+    a stable key. Clients rarely page deep into search results."""
+
+    page_size = 20
+    page_size_query_param = "page_size"
+    max_page_size = 100
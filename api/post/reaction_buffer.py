@@ -0,0 +1,276 @@
+"""
+Write-behind buffer for reactions, enabled with the `REACTION_BUFFER` setting.
+
+Reactions are recorded in Redis instead of the database, so that reacting to a busy comment
+does not wait on a row lock. The `flush_reactions` command writes them to the database in
+batches every few seconds, and must be kept running while the buffer is enabled.
+
+Every comment reacted to has these keys, which expire `REACTION_BUFFER_TIMEOUT` seconds after
+its last reaction:
+
+- `users`: the current reaction of each user who reacted since the keys were created, seeded
+  from the database the first time a user reacts.
+- `counts`: the like and dislike counts, seeded from the counters of the comment. They are
+  served instead of the counters, which lag behind until the reactions are flushed.
+- `pending`: the reactions that have not been written to the database yet. Later reactions of a
+  user overwrite earlier ones, so each user is written at most once per flush.
+
+Comments with pending reactions are listed in the `dirty` set. To flush a comment, its
+`pending` hash is renamed to `flushing` and the comment is added to the `flushing` set. The
+`flushing` hash is only deleted once its reactions are committed, so reactions claimed by a
+flusher that crashed are written by the next flush. Writes are upserts, so writing them twice
+is harmless.
+"""
+
+import redis
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .models import Comment, Reaction, invalidate_comments
+from .tasks import enqueue_reaction_reconciliation
+
+KEY_PREFIX = "post:reactions"
+DIRTY_KEY = f"{KEY_PREFIX}:dirty"
+FLUSHING_KEY = f"{KEY_PREFIX}:flushing"
+FLUSH_LOCK_KEY = f"{KEY_PREFIX}:flush_lock"
+
+# Record the reaction of a user to a comment, and update the counts. Without changing anything,
+# returns 0 when the counts are not in Redis yet, and -1 when the user's previous reaction is
+# not, unless they are passed in to be seeded.
+# KEYS: users, counts, pending, dirty
+# ARGV: user id, reaction type, comment id, timeout[, previous type[, like count, dislike count]]
+SET_REACTION_SCRIPT = """
+if ARGV[7] and redis.call('EXISTS', KEYS[2]) == 0 then
+    redis.call('HSET', KEYS[2], 'LIKE', ARGV[6], 'DISLIKE', ARGV[7])
+end
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return 0
+end
+if ARGV[5] then
+    redis.call('HSETNX', KEYS[1], ARGV[1], ARGV[5])
+end
+local previous = redis.call('HGET', KEYS[1], ARGV[1])
+if not previous then
+    return -1
+end
+
+if previous ~= ARGV[2] then
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    if redis.call('HEXISTS', KEYS[2], previous) == 1 then
+        redis.call('HINCRBY', KEYS[2], previous, -1)
+    end
+    if redis.call('HEXISTS', KEYS[2], ARGV[2]) == 1 then
+        redis.call('HINCRBY', KEYS[2], ARGV[2], 1)
+    end
+    redis.call('HSET', KEYS[3], ARGV[1], ARGV[2])
+    redis.call('SADD', KEYS[4], ARGV[3])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return 1
+"""
+
+# Claim the pending reactions of a comment for flushing, unless a previous flush of the comment
+# did not finish, in which case its reactions are returned again.
+# KEYS: pending, flushing, dirty, flushing comments
+# ARGV: comment id
+CLAIM_SCRIPT = """
+if redis.call('EXISTS', KEYS[2]) == 0 and redis.call('EXISTS', KEYS[1]) == 1 then
+    redis.call('RENAME', KEYS[1], KEYS[2])
+end
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    redis.call('SREM', KEYS[3], ARGV[1])
+end
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    redis.call('SREM', KEYS[4], ARGV[1])
+    return {}
+end
+redis.call('SADD', KEYS[4], ARGV[1])
+return redis.call('HGETALL', KEYS[2])
+"""
+
+_client = None
+
+
+def get_client():
+    global _client
+    if _client is None:
+        _client = redis.Redis.from_url(settings.REACTION_BUFFER_URL, decode_responses=True)
+    return _client
+
+
+def get_key(comment_id, name):
+    return f"{KEY_PREFIX}:{comment_id}:{name}"
+
+
+def run_set_reaction_script(pipeline, user_id, comment_id, reaction_type, seed=()):
+    pipeline.eval(
+        SET_REACTION_SCRIPT,
+        4,
+        get_key(comment_id, "users"),
+        get_key(comment_id, "counts"),
+        get_key(comment_id, "pending"),
+        DIRTY_KEY,
+        user_id,
+        reaction_type,
+        comment_id,
+        settings.REACTION_BUFFER_TIMEOUT,
+        *seed,
+    )
+
+
+def set_reactions(user, reaction_types):
+    """Buffer the reactions of `user` to many comments at once, given a mapping of comments to
+    reaction types, as `Reaction.set_reactions` does.
+
+    Only Redis is written to. The database is only read the first time the user reacts to a
+    comment, and the first time a comment is reacted to after its state expired.
+    """
+    if not reaction_types:
+        return
+    comments = {comment.pk: comment for comment in reaction_types}
+    reaction_types = {
+        comment.pk: reaction_type for comment, reaction_type in reaction_types.items()
+    }
+
+    pipeline = get_client().pipeline(transaction=False)
+    for comment_id, reaction_type in reaction_types.items():
+        run_set_reaction_script(pipeline, user.pk, comment_id, reaction_type)
+    results = dict(zip(reaction_types, pipeline.execute()))
+
+    unseeded = [comment_id for comment_id, result in results.items() if result != 1]
+    if unseeded:
+        previous_types = dict(
+            Reaction.objects.filter(user_id=user.pk, comment_id__in=unseeded).values_list(
+                "comment_id", "reaction_type"
+            )
+        )
+        uncounted = [comment_id for comment_id in unseeded if results[comment_id] == 0]
+        counts = {}
+        if uncounted:
+            counts = Comment.objects.filter(pk__in=uncounted).values_list(
+                "pk", "like_count", "dislike_count"
+            )
+            counts = {comment_id: counters for comment_id, *counters in counts}
+        for comment_id in unseeded:
+            seed = [previous_types.get(comment_id, Reaction.NEUTRAL)]
+            if results[comment_id] == 0:
+                if comment_id not in counts:
+                    # The comment was deleted.
+                    continue
+                seed += counts[comment_id]
+            run_set_reaction_script(pipeline, user.pk, comment_id, reaction_types[comment_id], seed)
+        pipeline.execute()
+
+    invalidate_comments({comment.post_id for comment in comments.values()})
+
+
+def get_counts(comment_ids):
+    """Return the buffered like and dislike counts of the comments that have any, by id."""
+    pipeline = get_client().pipeline(transaction=False)
+    for comment_id in comment_ids:
+        pipeline.hmget(get_key(comment_id, "counts"), Reaction.LIKE, Reaction.DISLIKE)
+    return {
+        comment_id: (int(like_count), int(dislike_count))
+        for comment_id, (like_count, dislike_count) in zip(comment_ids, pipeline.execute())
+        if like_count is not None
+    }
+
+
+def get_user_reactions(user_id, comment_ids):
+    """Return the buffered reactions of the user to the comments, by comment id."""
+    pipeline = get_client().pipeline(transaction=False)
+    for comment_id in comment_ids:
+        pipeline.hget(get_key(comment_id, "users"), user_id)
+    return {
+        comment_id: reaction_type
+        for comment_id, reaction_type in zip(comment_ids, pipeline.execute())
+        if reaction_type is not None
+    }
+
+
+def apply_buffered_reactions(comments, user_id=None, user_reactions=None):
+    """Overwrite the counters of `comments`, and the reactions in `user_reactions` if given,
+    with the buffered ones."""
+    comment_ids = [comment.pk for comment in comments]
+    counts = get_counts(comment_ids)
+    for comment in comments:
+        if comment.pk in counts:
+            comment.like_count, comment.dislike_count = counts[comment.pk]
+    if user_reactions is not None:
+        user_reactions.update(get_user_reactions(user_id, list(counts)))
+
+
+def claim(comment_ids):
+    """Claim the reactions to be flushed for the comments, as a mapping of comment id to a
+    mapping of user id to reaction type."""
+    client = get_client()
+    pipeline = client.pipeline(transaction=False)
+    for comment_id in comment_ids:
+        pipeline.eval(
+            CLAIM_SCRIPT,
+            4,
+            get_key(comment_id, "pending"),
+            get_key(comment_id, "flushing"),
+            DIRTY_KEY,
+            FLUSHING_KEY,
+            comment_id,
+        )
+    claimed = {}
+    for comment_id, values in zip(comment_ids, pipeline.execute()):
+        if values:
+            # `HGETALL` replies with a flat list of fields and values.
+            claimed[int(comment_id)] = dict(zip(values[::2], values[1::2]))
+    return claimed
+
+
+def flush(batch_size=1000, lock_timeout=60):
+    """Write the reactions of up to `batch_size` comments to the database, starting with the
+    ones claimed by a flush that did not finish. Returns the number of comments claimed, which
+    counts comments that were deleted since, or `None` if another flush is running."""
+    client = get_client()
+    lock = client.lock(FLUSH_LOCK_KEY, timeout=lock_timeout, blocking=False)
+    if not lock.acquire():
+        return None
+    try:
+        comment_ids = list(client.smembers(FLUSHING_KEY))[:batch_size]
+        if len(comment_ids) < batch_size:
+            dirty_ids = client.srandmember(DIRTY_KEY, batch_size - len(comment_ids))
+            comment_ids += [comment_id for comment_id in dirty_ids if comment_id not in comment_ids]
+        claimed = claim(comment_ids)
+        if not claimed:
+            return 0
+
+        # Users and comments may have been deleted since they reacted.
+        user_ids = {int(user_id) for reactions in claimed.values() for user_id in reactions}
+        user_ids = set(User.objects.filter(pk__in=user_ids).values_list("pk", flat=True))
+        comment_ids = set(Comment.objects.filter(pk__in=claimed).values_list("pk", flat=True))
+        reactions = [
+            Reaction(user_id=int(user_id), comment_id=comment_id, reaction_type=reaction_type)
+            for comment_id, user_reactions in claimed.items()
+            if comment_id in comment_ids
+            for user_id, reaction_type in user_reactions.items()
+            if int(user_id) in user_ids
+        ]
+        with transaction.atomic():
+            Reaction.objects.bulk_create(
+                reactions,
+                update_conflicts=True,
+                unique_fields=["user", "comment"],
+                update_fields=["reaction_type"],
+            )
+            enqueue_reaction_reconciliation({reaction.comment_id for reaction in reactions})
+
+        pipeline = client.pipeline()
+        pipeline.delete(*(get_key(comment_id, "flushing") for comment_id in claimed))
+        pipeline.srem(FLUSHING_KEY, *claimed)
+        pipeline.execute()
+        return len(claimed)
+    finally:
+        try:
+            lock.release()
+        except redis.exceptions.LockNotOwnedError:
+            # The flush took longer than `lock_timeout`, so another flush may have run alongside
+            # it. That is harmless, as writes are upserts, and the reactions were written.
+            pass
@@ -0,0 +1,153 @@
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVectorField,
+)
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import F, Q
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Left
+from django.utils.html import escape
+
+from .models import Post
+
+HIGHLIGHT_START = "<mark>"
+HIGHLIGHT_STOP = "</mark>"
+# The database wraps matches in these private use characters, so that the highlighted text can
+# be HTML-escaped before they are replaced with the highlight tags.
+MATCH_START = "\ue000"
+MATCH_STOP = "\ue001"
+
+# Number of words around the matches to include in the body highlight.
+SNIPPET_WORDS = 32
+
+# FTS5 ranks title matches above subtitle matches, and both above body matches.
+SQLITE_SEARCH_SQL = """
+    SELECT post_post_fts.rowid,
+           highlight(post_post_fts, 0, %s, %s),
+           snippet(post_post_fts, 2, %s, %s, '…', %s)
+    FROM post_post_fts
+    JOIN post_post ON post_post.id = post_post_fts.rowid
+    WHERE post_post_fts MATCH %s AND post_post.published
+    ORDER BY bm25(post_post_fts, 10.0, 5.0, 1.0), post_post.id DESC
+    LIMIT %s OFFSET %s
+"""
+
+SQLITE_COUNT_SQL = """
+    SELECT COUNT(*)
+    FROM post_post_fts
+    JOIN post_post ON post_post.id = post_post_fts.rowid
+    WHERE post_post_fts MATCH %s AND post_post.published
+"""
+
+
+class PostSearch:
+    """Full-text search over published posts, best matches first.
+
+    Uses the search index created by the `0005_post_search_index` migration for the current
+    database: a GIN-indexed tsvector column on PostgreSQL, or an FTS5 table on SQLite. Other
+    databases fall back to unranked substring matching.
+
+    Instances can be counted and sliced like a queryset, so they can be handed straight to a
+    paginator. Each returned post has `title_highlight` and `body_highlight` attributes: HTML
+    with the text escaped and the matches wrapped in `<mark>` tags.
+    """
+
+    def __init__(self, query, using=DEFAULT_DB_ALIAS):
+        self.query = query
+        self.using = using
+        self.vendor = connections[using].vendor
+
+    def count(self):
+        if self.vendor == "sqlite":
+            with connections[self.using].cursor() as cursor:
+                cursor.execute(SQLITE_COUNT_SQL, [self.get_fts5_query()])
+                return cursor.fetchone()[0]
+        return self.get_queryset().count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("PostSearch only supports slicing without a step.")
+        start, stop = key.start or 0, key.stop
+        if stop is not None and stop <= start:
+            return []
+
+        if self.vendor == "sqlite":
+            posts = self.get_sqlite_results(start, stop)
+        else:
+            posts = list(self.get_queryset()[start:stop])
+        for post in posts:
+            post.title_highlight = highlight(post.title_highlight)
+            post.body_highlight = highlight(post.body_highlight)
+        return posts
+
+    def get_queryset(self):
+        posts = Post.objects.using(self.using).filter(published=True)
+
+        if self.vendor == "postgresql":
+            search_query = SearchQuery(self.query, config="english", search_type="websearch")
+            search_vector = RawSQL("post_post.search_vector", (), output_field=SearchVectorField())
+            highlight_options = {
+                "config": "english",
+                "start_sel": MATCH_START,
+                "stop_sel": MATCH_STOP,
+            }
+            return (
+                posts.annotate(search_vector=search_vector)
+                .filter(search_vector=search_query)
+                .annotate(
+                    rank=SearchRank(search_vector, search_query),
+                    title_highlight=SearchHeadline(
+                        "title", search_query, highlight_all=True, **highlight_options
+                    ),
+                    body_highlight=SearchHeadline(
+                        "body", search_query, max_words=SNIPPET_WORDS, **highlight_options
+                    ),
+                )
+                .order_by("-rank", "-id")
+            )
+
+        matches = Q()
+        for word in self.query.split():
+            matches &= (
+                Q(title__icontains=word) | Q(subtitle__icontains=word) | Q(body__icontains=word)
+            )
+        return posts.filter(matches).annotate(
+            title_highlight=F("title"), body_highlight=Left("body", SNIPPET_WORDS * 8)
+        )
+
+    def get_sqlite_results(self, start, stop):
+        limit = -1 if stop is None else stop - start
+        params = [
+            MATCH_START,
+            MATCH_STOP,
+            MATCH_START,
+            MATCH_STOP,
+            SNIPPET_WORDS,
+            self.get_fts5_query(),
+            limit,
+            start,
+        ]
+        with connections[self.using].cursor() as cursor:
+            cursor.execute(SQLITE_SEARCH_SQL, params)
+            rows = cursor.fetchall()
+
+        posts = Post.objects.using(self.using).in_bulk([row[0] for row in rows])
+        results = []
+        for pk, title_highlight, body_highlight in rows:
+            post = posts[pk]
+            post.title_highlight = title_highlight
+            post.body_highlight = body_highlight
+            results.append(post)
+        return results
+
+    def get_fts5_query(self):
+        # Quote every word so that user input is never parsed as FTS5 query syntax. The words
+        # are implicitly ANDed together.
+        return " ".join('"{}"'.format(word.replace('"', '""')) for word in self.query.split())
+
+
+def highlight(text):
+    """Return `text`, with its matches wrapped in `MATCH_START` and `MATCH_STOP`, as HTML."""
+    return escape(text).replace(MATCH_START, HIGHLIGHT_START).replace(MATCH_STOP, HIGHLIGHT_STOP)
@@ -1,7 +1,84 @@
+from collections import defaultdict
+
 from account.serializers import ProfileSerializer
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
 from rest_framework import serializers
 
-from .models import Category, Comment, Post, Tag
+from .models import Category, Comment, Post, Reaction, Tag
+
+
+def parse_field_list(value):
+    """Parse a comma-separated list of field names from a query parameter. Returns `None` if the
+    parameter is missing or names no fields."""
+    if value is None:
+        return None
+    return [name.strip() for name in value.split(",") if name.strip()] or None
+
+
+class DynamicFieldsMixin:
+    """Let a `ModelSerializer` render only some of its fields, and load only what they need.
+
+    Pass `fields` to keep only those fields, and `exclude` to drop fields. Both are usually read
+    from the `fields` and `exclude` query parameters with `parse_field_list`. Views then build
+    their queryset with `prepare_queryset`, which follows the relations that serializers declare
+    in `related_fields` and `prefetch_fields`.
+    """
+
+    # Maps field names to the columns of related objects they render, e.g.
+    # `{"category": ["category__name"]}`. The relations are joined with `select_related()`.
+    related_fields = {}
+    # Maps field names to the multi-valued relations they render, which are loaded with
+    # `prefetch_related()`.
+    prefetch_fields = {}
+    # Fields that this serializer leaves out, but that can still be named in `exclude`.
+    omitted_fields = ()
+
+    def __init__(self, *args, fields=None, exclude=None, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        known = {"fields": set(self.fields), "exclude": {*self.fields, *self.omitted_fields}}
+        for param, names in (("fields", fields), ("exclude", exclude)):
+            unknown = set(names or []) - known[param]
+            if unknown:
+                raise serializers.ValidationError(
+                    {param: [f"Unknown field(s): {', '.join(sorted(unknown))}."]}
+                )
+
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+        for name in exclude or []:
+            self.fields.pop(name, None)
+
+    def get_model_field_names(self):
+        """Return the concrete model fields read by the selected fields, to pass to `only()`."""
+        opts = self.Meta.model._meta
+        names = set()
+        for field in self.fields.values():
+            try:
+                model_field = opts.get_field(field.source.split(".")[0])
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and not model_field.many_to_many:
+                names.add(model_field.name)
+        return names
+
+    def prepare_queryset(self, queryset, extra_fields=()):
+        """Restrict `queryset` to the columns of the selected fields and `extra_fields`, and load
+        the related objects they render along with it."""
+        only = self.get_model_field_names() | set(extra_fields)
+        select_related = set()
+        prefetch_related = []
+        for name in self.fields:
+            for lookup in self.related_fields.get(name, []):
+                only.add(lookup)
+                select_related.add(lookup.rsplit("__", 1)[0])
+            prefetch_related.extend(self.prefetch_fields.get(name, []))
+
+        return (
+            queryset.only(*only).select_related(*select_related).prefetch_related(*prefetch_related)
+        )
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -16,37 +93,132 @@ class TagSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class CommentTreeSerializer(serializers.ModelSerializer):
-    replies = serializers.SerializerMethodField()
+def group_comments_by_parent(comments):
+    """Map each parent comment id to its replies, keeping the order of `comments`.
+
+    Top-level comments are stored under `None`.
+    """
+    replies = defaultdict(list)
+    for comment in comments:
+        replies[comment.parent_comment_id].append(comment)
+    return replies
+
+
+class CommentSerializer(serializers.ModelSerializer):
+    """Serialize comments without their replies.
+
+    When the context holds `user_reactions`, a mapping of comment id to the viewer's reaction
+    type, it is exposed as `user_reaction`.
+    """
+
+    user_reaction = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
-        fields = "__all__"
+        exclude = ["path"]
+
+    def get_user_reaction(self, obj):
+        return self.context.get("user_reactions", {}).get(obj.pk)
+
+
+class CommentTreeSerializer(CommentSerializer):
+    """Serialize comments along with their nested replies.
+
+    The context must hold `replies`, as built by `group_comments_by_parent`, so that a whole
+    thread is serialized from a single query.
+    """
+
+    replies = serializers.SerializerMethodField()
 
     def get_replies(self, obj):
         # Recursively serialize replies. `replies` represents the immediate children
         # of a particular comment.
-        replies = Comment.objects.filter(post=obj.post, parent_comment=obj)
-        serializer = CommentTreeSerializer(replies, many=True)
+        replies = self.context["replies"].get(obj.pk, [])
+        serializer = CommentTreeSerializer(replies, many=True, context=self.context)
         return serializer.data
 
 
-class PostDetailSerializer(serializers.ModelSerializer):
-    author = ProfileSerializer()
+class PostDetailSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
+    author = ProfileSerializer(source="author.profile")
     category = CategorySerializer()
     tags = TagSerializer(many=True)
 
+    related_fields = {
+        "author": [
+            "author__username",
+            "author__profile__user",
+            "author__profile__role",
+            "author__profile__bio",
+        ],
+        "category": ["category__name"],
+    }
+    prefetch_fields = {
+        "tags": ["tags"],
+    }
+
     class Meta:
         model = Post
         fields = "__all__"
 
 
+class PostListSerializer(PostDetailSerializer):
+    """A compact representation of posts for listings, which leaves out the body."""
+
+    omitted_fields = ("body",)
+
+    class Meta(PostDetailSerializer.Meta):
+        fields = [
+            "id",
+            "title",
+            "subtitle",
+            "author",
+            "category",
+            "tags",
+            "publish_date",
+            "published",
+        ]
+
+
+class PostSearchSerializer(serializers.ModelSerializer):
+    title_highlight = serializers.CharField(read_only=True)
+    body_highlight = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Post
+        fields = [
+            "id",
+            "title",
+            "subtitle",
+            "publish_date",
+            "title_highlight",
+            "body_highlight",
+        ]
+
+
 class PostWriteSerializer(serializers.ModelSerializer):
+    """Create or update a post. A future `publish_date` schedules the post to be published then,
+    and `null` unschedules it."""
+
     class Meta:
         model = Post
         exclude = [
             "date_created",
             "date_modified",
-            "publish_date",
             "published",
         ]
+
+    def validate_publish_date(self, value):
+        if self.instance is not None and self.instance.published:
+            raise serializers.ValidationError("The post is already published.")
+        if value is not None and value <= timezone.now():
+            raise serializers.ValidationError("The publish date must be in the future.")
+        return value
+
+
+class ReactionSerializer(serializers.Serializer):
+    comment = serializers.IntegerField()
+    reaction_type = serializers.ChoiceField(choices=Reaction.REACTION_CHOICES)
+
+
+class ReactionBatchSerializer(serializers.Serializer):
+    reactions = ReactionSerializer(many=True, allow_empty=False, max_length=100)
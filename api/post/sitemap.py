@@ -0,0 +1,160 @@
+"""
+Sitemaps of the published posts, the categories, the tags and the authors, and the sitemap
+index that links to them.
+
+Each section is split into files of at most `URLS_PER_FILE` URLs, the limit of the sitemap
+protocol. A file holds the rows of a range of `URLS_PER_FILE` primary keys, counted from the first
+row of its section, so that every file is read with a range scan on the primary key instead of
+an OFFSET scan that gets slower the later the file. Files are rendered while they are streamed,
+from rows read with a database cursor, so memory use does not grow with the number of URLs. They
+are cached chunk by chunk as they are streamed, and dropped whenever a post, category, tag or
+user changes.
+"""
+
+from urllib.parse import quote
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import DateTimeField, Exists, F, OuterRef, Value
+from django.urls import reverse
+from myproject.cache import get_timeout
+
+from .models import Category, Post, Tag
+
+URLS_PER_FILE = 50_000
+# Number of URLs rendered per chunk of a streamed file.
+CHUNK_SIZE = 1000
+
+# The cache tags that sitemaps depend on, see `myproject.cache`.
+CACHE_TAGS = ["posts", "categories", "tags", "profiles"]
+CACHE_KEY_PREFIX = "post:sitemap"
+
+# Categories, tags and authors have no modification date.
+NO_LAST_MODIFIED = Value(None, output_field=DateTimeField())
+
+
+def get_author_rows():
+    has_published_posts = Exists(Post.objects.published().filter(author=OuterRef("pk")))
+    return User.objects.filter(has_published_posts).values_list("username", NO_LAST_MODIFIED)
+
+
+# The rows of each section, as `(value, last modified)` pairs, and the URL they link to.
+SECTIONS = {
+    "posts": (
+        lambda: Post.objects.published().values_list("pk", "date_modified"),
+        ("post_detail", "pk"),
+    ),
+    "categories": (
+        lambda: Category.objects.values_list("pk", NO_LAST_MODIFIED),
+        ("category_detail", "pk"),
+    ),
+    "tags": (lambda: Tag.objects.values_list("pk", NO_LAST_MODIFIED), ("tag_detail", "pk")),
+    "authors": (get_author_rows, ("user", "username")),
+}
+
+
+def get_first_pk(section):
+    rows, _ = SECTIONS[section]
+    return rows().order_by("pk").values_list("pk", flat=True).first()
+
+
+def get_rows(section, page):
+    """Return the rows of a file of a section. Files have fewer than `URLS_PER_FILE` rows where
+    rows were deleted, or are filtered out, e.g. drafts."""
+    rows, _ = SECTIONS[section]
+    start = (get_first_pk(section) or 1) + (page - 1) * URLS_PER_FILE
+    return rows().filter(pk__gte=start, pk__lt=start + URLS_PER_FILE).order_by("pk")
+
+
+def get_pages(section):
+    """Return the numbers of the files of a section that have rows. The first file is always
+    listed, even when the section is empty."""
+    first_pk = get_first_pk(section)
+    if first_pk is None:
+        return [1]
+    rows, _ = SECTIONS[section]
+    return (
+        rows()
+        .annotate(sitemap_page=(F("pk") - first_pk) / URLS_PER_FILE + 1)
+        .values_list("sitemap_page", flat=True)
+        .order_by("sitemap_page")
+        .distinct()
+    )
+
+
+def get_location_template(section):
+    # Reversing the URL of every row would dominate the rendering time, so the URL is reversed
+    # once around a placeholder.
+    _, (url_name, kwarg) = SECTIONS[section]
+    prefix, suffix = reverse(url_name, kwargs={kwarg: 0}).rsplit("0", 1)
+    return settings.SITE_URL + prefix, suffix
+
+
+def page_exists(section, page):
+    return page == 1 or get_rows(section, page)[:1].exists()
+
+
+def render_section(section, page):
+    """Yield the sitemap of a page of a section in chunks."""
+    prefix, suffix = get_location_template(section)
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    )
+    chunk = []
+    for value, last_modified in get_rows(section, page).iterator(chunk_size=CHUNK_SIZE):
+        location = escape(prefix + quote(str(value), safe="~:@!$&'()*+,;=") + suffix)
+        if last_modified is None:
+            chunk.append(f"<url><loc>{location}</loc></url>\n")
+        else:
+            lastmod = last_modified.isoformat(timespec="seconds")
+            chunk.append(f"<url><loc>{location}</loc><lastmod>{lastmod}</lastmod></url>\n")
+        if len(chunk) == CHUNK_SIZE:
+            yield "".join(chunk)
+            chunk = []
+    yield "".join(chunk) + "</urlset>\n"
+
+
+def render_index():
+    """Yield the sitemap index, which links to every file of every section."""
+    yield (
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<sitemapindex xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">\n'
+    )
+    for section in SECTIONS:
+        for page in get_pages(section):
+            path = reverse("sitemap_section", kwargs={"section": section, "page": page})
+            yield f"<sitemap><loc>{escape(settings.SITE_URL + path)}</loc></sitemap>\n"
+    yield "</sitemapindex>\n"
+
+
+def get_cache_key(etag):
+    return f"{CACHE_KEY_PREFIX}:{etag}"
+
+
+def cache_chunks(chunks, key):
+    """Yield `chunks` while storing each of them in the cache, so that `get_cached_chunks` can
+    stream them back."""
+    timeout = get_timeout()
+    num_chunks = 0
+    for chunk in chunks:
+        cache.set(f"{key}:{num_chunks}", chunk, timeout=timeout)
+        num_chunks += 1
+        yield chunk
+    # Only files that were streamed to the end are served from the cache.
+    cache.set(key, num_chunks, timeout=timeout)
+
+
+def get_cached_chunks(key):
+    """Return the cached chunks of a file, or `None` if it is not cached."""
+    num_chunks = cache.get(key)
+    if num_chunks is None:
+        return None
+    # Chunks may have been evicted, or have expired before the count, which is stored last.
+    chunk_keys = [f"{key}:{i}" for i in range(num_chunks)]
+    chunks = cache.get_many(chunk_keys)
+    if len(chunks) < num_chunks:
+        return None
+    return [chunks[chunk_key] for chunk_key in chunk_keys]
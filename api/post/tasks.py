@@ -0,0 +1,145 @@
+"""
+Follow-ups of writes to posts, comments and reactions, run by a Celery worker.
+
+Writes bump the versions of the cache tags they affect inline, so that the next read of the
+writer is never stale, and enqueue everything else with `enqueue`.
+"""
+
+from urllib.parse import urlsplit
+
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from celery import shared_task
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.test import RequestFactory
+from django.urls import resolve, reverse
+from django.utils import timezone
+
+from . import feeds
+from .models import Comment, Post, Reaction, invalidate_comments, invalidate_posts
+
+# Most posts published by one run of `publish_scheduled_posts`. Later ones wait for the next run.
+PUBLISH_BATCH_SIZE = 1000
+
+# Databases on which the reaction counters are kept in sync by the triggers of the
+# `0007_reaction_count_triggers` migration.
+REACTION_TRIGGER_VENDORS = ("postgresql", "sqlite")
+
+
+def enqueue(task, *args):
+    """Run `task` on a worker once the current transaction is committed, so that it sees the
+    changes that enqueued it."""
+    transaction.on_commit(lambda: task.delay(*args))
+
+
+def warm(path):
+    """Render a public endpoint for an anonymous client of `SITE_URL`, so that its response gets
+    cached for the scheme and host that clients use."""
+    site_url = urlsplit(settings.SITE_URL)
+    request = RequestFactory().get(
+        path, secure=site_url.scheme == "https", HTTP_HOST=site_url.netloc
+    )
+    match = resolve(path)
+    view = match.func
+    if iscoroutinefunction(view):
+        view = async_to_sync(view)
+    return view(request, *match.args, **match.kwargs)
+
+
+@shared_task
+def warm_post_cache(post_id):
+    """Cache the responses that change along with a post: the first page of the listing, and
+    the post and its comments if it is published."""
+    warm_posts_cache([post_id])
+
+
+@shared_task
+def warm_posts_cache(post_ids):
+    """Like `warm_post_cache` for many posts, e.g. posts published together. The listing is only
+    rendered once."""
+    warm(reverse("post_list"))
+    for post_id in Post.objects.filter(pk__in=post_ids, published=True).values_list(
+        "pk", flat=True
+    ):
+        warm(reverse("post_detail", kwargs={"pk": post_id}))
+        warm(reverse("post_comments", kwargs={"pk": post_id}))
+
+
+@shared_task
+def publish_scheduled_posts():
+    """Publish the scheduled posts whose publish date has passed. Runs every
+    `PUBLISH_SCHEDULE_INTERVAL` seconds, see `CELERY_BEAT_SCHEDULE`.
+
+    Returns the number of posts published.
+    """
+    now = timezone.now()
+    due = Post.objects.due(now)
+    post_ids = list(due.order_by("publish_date").values_list("pk", flat=True)[:PUBLISH_BATCH_SIZE])
+    if not post_ids:
+        return 0
+
+    # The update repeats the conditions, so posts that were published or rescheduled since they
+    # were read are left alone.
+    num_published = due.filter(pk__in=post_ids).update(published=True, date_modified=now)
+    invalidate_posts(post_ids)
+    warm_posts_cache.delay(post_ids)
+    regenerate_post_feeds.delay(post_ids)
+    return num_published
+
+
+@shared_task
+def regenerate_feeds(feed_ids):
+    """Render the feeds, given as `(kind, pk)` pairs, see `post.feeds`."""
+    for kind, pk in feed_ids:
+        feeds.render(kind, pk)
+
+
+@shared_task
+def regenerate_post_feeds(post_ids, extra_feed_ids=()):
+    """Render the feeds that the posts appear in, along with `extra_feed_ids`, e.g. the feed of
+    the category that a post was moved out of."""
+    feed_ids = feeds.get_post_feeds(post_ids) | {tuple(feed_id) for feed_id in extra_feed_ids}
+    regenerate_feeds(feed_ids)
+
+
+@shared_task
+def invalidate_comment_cache(comment_id):
+    """Drop the cached comments of the post of a comment."""
+    post_id = Comment.objects.filter(pk=comment_id).values_list("post_id", flat=True).first()
+    if post_id is not None:
+        invalidate_comments([post_id])
+
+
+def count_reactions(reaction_type):
+    # Correlated subquery counting the reactions of one type on the outer comment.
+    reactions = (
+        Reaction.objects.filter(comment=OuterRef("pk"), reaction_type=reaction_type)
+        .order_by()
+        .values("comment")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    return Coalesce(Subquery(reactions), 0)
+
+
+def get_reaction_counters():
+    """Return the expressions that recompute the reaction counters of comments."""
+    return {
+        field: count_reactions(reaction_type)
+        for reaction_type, field in Reaction.COUNTER_FIELDS.items()
+    }
+
+
+@shared_task
+def reconcile_reaction_counts(comment_ids):
+    """Recompute the reaction counters of the comments from the `Reaction` table."""
+    Comment.objects.filter(pk__in=comment_ids).update(**get_reaction_counters())
+
+
+def enqueue_reaction_reconciliation(comment_ids):
+    """Recompute the counters of comments whose reactions were written in bulk, unless the
+    database keeps them in sync itself."""
+    if connection.vendor not in REACTION_TRIGGER_VENDORS:
+        enqueue(reconcile_reaction_counts, list(comment_ids))
@@ -1,9 +1,31 @@
 import json
+import tempfile
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+from uuid import uuid4
 
+import fakeredis
+import msgpack
+from account.models import Profile
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import http_date
+from django.utils.translation import gettext_lazy
+from myproject.cache import get_stats
+from myproject.renderers import ORJSONRenderer
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken
 
-from .models import Category, Tag
+from . import feeds, reaction_buffer, sitemap, tasks
+from .models import Category, Comment, Post, Reaction, Tag
 
 
 class CreatePost(TestCase):
@@ -75,3 +97,1821 @@ class CreatePost(TestCase):
 
     def test_get_specific_post(self):
         pass
+
+
+class PostListPaginationTest(TestCase):
+    def setUp(self):
+        self.url = "/api/posts/"
+        self.client = Client()
+
+        self.user = User.objects.create_user(username="author", password="@123tza..")
+        self.user.profile.role = Profile.ADMIN
+        self.user.profile.save()
+        self.category = Category.objects.create(name="Life")
+
+        # Create published posts, two of which share a publish date, and two drafts.
+        now = timezone.now()
+        publish_dates = [now, now, now - timedelta(days=1), now - timedelta(days=2), None, None]
+        for i, publish_date in enumerate(publish_dates):
+            Post.objects.create(
+                title=f"Post {i}",
+                body="Body",
+                author=self.user,
+                category=self.category,
+                publish_date=publish_date,
+                published=publish_date is not None,
+            )
+
+    def get_all_pages(self, url, **headers):
+        ids = []
+        while url:
+            response = self.client.get(url, **headers)
+            self.assertEqual(response.status_code, 200)
+            response_data = json.loads(response.content)
+            ids.extend(post["id"] for post in response_data["results"])
+            url = response_data["next"]
+        return ids
+
+    def test_pages_follow_post_ordering(self):
+        expected_ids = list(Post.objects.values_list("id", flat=True))
+        token = AccessToken.for_user(self.user)
+
+        ids = self.get_all_pages(f"{self.url}?page_size=2", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        self.assertEqual(ids, expected_ids)
+
+    def test_anonymous_pages_only_include_published_posts(self):
+        expected_ids = list(Post.objects.published().values_list("id", flat=True))
+
+        ids = self.get_all_pages(f"{self.url}?page_size=2")
+
+        self.assertEqual(ids, expected_ids)
+
+    def test_first_page_has_no_previous_link(self):
+        response = self.client.get(f"{self.url}?page_size=2")
+
+        response_data = json.loads(response.content)
+        self.assertEqual(len(response_data["results"]), 2)
+        self.assertIsNone(response_data["previous"])
+        self.assertIsNotNone(response_data["next"])
+
+    def test_previous_link_returns_previous_page(self):
+        first_page = json.loads(self.client.get(f"{self.url}?page_size=2").content)
+        second_page = json.loads(self.client.get(first_page["next"]).content)
+
+        response = self.client.get(second_page["previous"])
+
+        response_data = json.loads(response.content)
+        self.assertEqual(response_data["results"], first_page["results"])
+        self.assertIsNone(response_data["previous"])
+
+    def test_page_size_is_capped(self):
+        response = self.client.get(f"{self.url}?page_size=1000")
+
+        response_data = json.loads(response.content)
+        self.assertEqual(len(response_data["results"]), Post.objects.published().count())
+        self.assertIsNone(response_data["next"])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f"{self.url}?cursor=not-a-cursor")
+
+        self.assertEqual(response.status_code, 404)
+
+
+class PostCommentsTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+
+        self.user = User.objects.create_user(username="reader", password="@123tza..")
+        category = Category.objects.create(name="Life")
+        self.post = Post.objects.create(
+            title="Post",
+            body="Body",
+            author=self.user,
+            category=category,
+            published=True,
+            publish_date=timezone.now(),
+        )
+        self.url = f"/api/posts/{self.post.pk}/comments/"
+
+    def create_thread(self, num_top_level, depth):
+        # Create `num_top_level` comments, each followed by a chain of replies `depth` deep.
+        for i in range(num_top_level):
+            parent = None
+            for level in range(depth):
+                parent = Comment.objects.create(
+                    user=self.user, post=self.post, parent_comment=parent, text=f"{i}-{level}"
+                )
+
+    def test_comment_tree_shape(self):
+        self.create_thread(num_top_level=2, depth=3)
+
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        response_data = json.loads(response.content)
+        self.assertEqual([comment["text"] for comment in response_data], ["1-0", "0-0"])
+        self.assertEqual(response_data[0]["like_count"], 0)
+        reply = response_data[0]["replies"][0]
+        self.assertEqual(reply["text"], "1-1")
+        self.assertEqual(reply["parent_comment"], response_data[0]["id"])
+        self.assertEqual(reply["replies"][0]["text"], "1-2")
+        self.assertEqual(reply["replies"][0]["replies"], [])
+
+    def test_query_count_does_not_grow_with_thread_size(self):
+        # One query each for the post and the comments.
+        self.create_thread(num_top_level=2, depth=2)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+        self.create_thread(num_top_level=20, depth=10)
+        with self.assertNumQueries(2):
+            self.client.get(self.url)
+
+    def test_user_reactions_are_loaded_in_one_query(self):
+        self.create_thread(num_top_level=3, depth=3)
+        liked, disliked = Comment.objects.filter(parent_comment__isnull=True)[:2]
+        Reaction.set_reaction(self.user, liked, Reaction.LIKE)
+        Reaction.set_reaction(self.user, disliked, Reaction.DISLIKE)
+        token = AccessToken.for_user(self.user)
+
+        # One query each for the user, the post, the comments and the user's reactions.
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url, HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        response_data = json.loads(response.content)
+        user_reactions = {comment["id"]: comment["user_reaction"] for comment in response_data}
+        self.assertEqual(user_reactions[liked.pk], Reaction.LIKE)
+        self.assertEqual(user_reactions[disliked.pk], Reaction.DISLIKE)
+        self.assertIsNone(response_data[0]["replies"][0]["user_reaction"])
+
+    def test_anonymous_user_reactions_are_skipped(self):
+        self.create_thread(num_top_level=1, depth=1)
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+
+        response_data = json.loads(response.content)
+        self.assertIsNone(response_data[0]["user_reaction"])
+
+    def test_max_depth(self):
+        self.create_thread(num_top_level=1, depth=3)
+
+        response = self.client.get(f"{self.url}?max_depth=2")
+
+        response_data = json.loads(response.content)
+        reply = response_data[0]["replies"][0]
+        self.assertEqual(reply["text"], "0-1")
+        self.assertEqual(reply["replies"], [])
+
+    def test_invalid_max_depth(self):
+        response = self.client.get(f"{self.url}?max_depth=0")
+
+        self.assertEqual(response.status_code, 400)
+
+
+class CommentPathTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="@123tza..")
+        category = Category.objects.create(name="Life")
+        self.post = Post.objects.create(
+            title="Post", body="Body", author=self.user, category=category
+        )
+
+        # Create a thread that looks like: root -> reply -> nested_reply, root -> other_reply.
+        self.root = self.create_comment()
+        self.reply = self.create_comment(parent_comment=self.root)
+        self.nested_reply = self.create_comment(parent_comment=self.reply)
+        self.other_reply = self.create_comment(parent_comment=self.root)
+
+    def create_comment(self, parent_comment=None):
+        return Comment.objects.create(
+            user=self.user, post=self.post, parent_comment=parent_comment, text="Text"
+        )
+
+    def test_path_and_depth(self):
+        self.nested_reply.refresh_from_db()
+
+        self.assertEqual(self.nested_reply.depth, 2)
+        self.assertEqual(
+            self.nested_reply.path,
+            f"{self.root.pk:010d}/{self.reply.pk:010d}/{self.nested_reply.pk:010d}/",
+        )
+
+    def test_get_descendants(self):
+        descendants = self.root.get_descendants()
+
+        self.assertEqual(set(descendants), {self.reply, self.nested_reply, self.other_reply})
+        self.assertEqual(self.reply.get_descendant_count(), 1)
+        self.assertEqual(self.nested_reply.get_descendant_count(), 0)
+
+    def test_get_ancestors(self):
+        with self.assertNumQueries(1):
+            ancestors = list(self.nested_reply.get_ancestors())
+
+        self.assertEqual(ancestors, [self.root, self.reply])
+        self.assertEqual(list(self.root.get_ancestors()), [])
+
+    def test_delete_removes_subtree(self):
+        self.reply.delete()
+
+        self.assertEqual(set(Comment.objects.all()), {self.root, self.other_reply})
+
+    def test_build_comment_paths_command(self):
+        expected = dict(Comment.objects.values_list("pk", "path"))
+        Comment.objects.update(path="", depth=0)
+
+        call_command("build_comment_paths", batch_size=2, stdout=StringIO())
+
+        self.assertEqual(dict(Comment.objects.values_list("pk", "path")), expected)
+        self.nested_reply.refresh_from_db()
+        self.assertEqual(self.nested_reply.depth, 2)
+
+
+class ReactionCountTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="reader", password="@123tza..")
+        self.other_user = User.objects.create_user(username="other", password="@123tza..")
+        category = Category.objects.create(name="Life")
+        post = Post.objects.create(title="Post", body="Body", author=self.user, category=category)
+        self.comment = Comment.objects.create(user=self.user, post=post, text="Text")
+
+    def assertCounts(self, like_count, dislike_count):
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.like_count, like_count)
+        self.assertEqual(self.comment.dislike_count, dislike_count)
+
+    def test_set_reaction_transitions(self):
+        Reaction.set_reaction(self.user, self.comment, Reaction.LIKE)
+        self.assertCounts(1, 0)
+
+        Reaction.set_reaction(self.other_user, self.comment, Reaction.LIKE)
+        self.assertCounts(2, 0)
+
+        Reaction.set_reaction(self.user, self.comment, Reaction.LIKE)
+        self.assertCounts(2, 0)
+
+        Reaction.set_reaction(self.user, self.comment, Reaction.DISLIKE)
+        self.assertCounts(1, 1)
+
+        Reaction.set_reaction(self.user, self.comment, Reaction.NEUTRAL)
+        self.assertCounts(1, 0)
+
+        Reaction.set_reaction(self.other_user, self.comment, Reaction.NEUTRAL)
+        self.assertCounts(0, 0)
+
+    def test_neutral_reaction_does_not_count(self):
+        Reaction.set_reaction(self.user, self.comment, Reaction.NEUTRAL)
+
+        self.assertCounts(0, 0)
+
+    def test_saving_stale_comment_keeps_counts(self):
+        comment = Comment.objects.get(pk=self.comment.pk)
+        Reaction.set_reaction(self.user, self.comment, Reaction.LIKE)
+        Reaction.set_reaction(self.other_user, self.comment, Reaction.DISLIKE)
+
+        comment.text = "Edited"
+        comment.save()
+
+        self.assertCounts(1, 1)
+        self.assertEqual(self.comment.text, "Edited")
+
+    def test_set_reaction_is_one_query(self):
+        Reaction.set_reaction(self.user, self.comment, Reaction.LIKE)
+
+        with self.assertNumQueries(1):
+            Reaction.set_reaction(self.user, self.comment, Reaction.DISLIKE)
+        self.assertCounts(0, 1)
+
+    def test_deleted_reactions_are_uncounted(self):
+        Reaction.set_reaction(self.user, self.comment, Reaction.LIKE)
+        Reaction.set_reaction(self.other_user, self.comment, Reaction.DISLIKE)
+
+        self.other_user.delete()
+
+        self.assertCounts(1, 0)
+
+    def test_reconcile_reaction_counts_command(self):
+        Reaction.objects.create(user=self.user, comment=self.comment, reaction_type=Reaction.LIKE)
+        Reaction.objects.create(
+            user=self.other_user, comment=self.comment, reaction_type=Reaction.DISLIKE
+        )
+        # Let the counters drift.
+        Comment.objects.update(like_count=0, dislike_count=0)
+        self.assertCounts(0, 0)
+
+        call_command("reconcile_reaction_counts", batch_size=1, stdout=StringIO())
+
+        self.assertCounts(1, 1)
+
+
+class ResponseCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+        self.user = User.objects.create_user(username="reader", password="@123tza..")
+        self.category = Category.objects.create(name="Life")
+        self.post = Post.objects.create(
+            title="Post",
+            body="Body",
+            author=self.user,
+            category=self.category,
+            published=True,
+            publish_date=timezone.now(),
+        )
+        self.other_post = Post.objects.create(
+            title="Other Post",
+            body="Body",
+            author=self.user,
+            category=self.category,
+            published=True,
+            publish_date=timezone.now(),
+        )
+        self.comments_url = f"/api/posts/{self.post.pk}/comments/"
+
+    def test_repeated_anonymous_get_is_served_from_cache(self):
+        first_response = self.client.get(self.comments_url)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.comments_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, first_response.content)
+        self.assertEqual(get_stats()["hits"], 1)
+        self.assertEqual(get_stats()["misses"], 1)
+
+    @override_settings(ALLOWED_HOSTS=["testserver", "api.example.com"])
+    def test_responses_are_cached_per_scheme_and_host(self):
+        self.client.get("/api/posts/?page_size=1")
+
+        response = self.client.get(
+            "/api/posts/?page_size=1", secure=True, HTTP_HOST="api.example.com"
+        )
+
+        self.assertTrue(json.loads(response.content)["next"].startswith("https://api.example.com/"))
+        self.assertEqual(get_stats()["hits"], 0)
+
+    def test_authenticated_get_is_not_cached(self):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(self.user)}"}
+        self.client.get(self.comments_url, **headers)
+
+        response = self.client.get(self.comments_url, **headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_stats()["hits"], 0)
+
+    def test_new_comment_only_invalidates_its_post(self):
+        other_comments_url = f"/api/posts/{self.other_post.pk}/comments/"
+        self.client.get(self.comments_url)
+        self.client.get(other_comments_url)
+        self.client.get(f"/api/posts/{self.post.pk}/")
+
+        Comment.objects.create(user=self.user, post=self.post, text="Text")
+
+        response = self.client.get(self.comments_url)
+        self.assertEqual(len(json.loads(response.content)), 1)
+        with self.assertNumQueries(0):
+            self.client.get(other_comments_url)
+        with self.assertNumQueries(0):
+            self.client.get(f"/api/posts/{self.post.pk}/")
+
+    def test_reaction_invalidates_comments(self):
+        comment = Comment.objects.create(user=self.user, post=self.post, text="Text")
+        self.client.get(self.comments_url)
+
+        Reaction.set_reaction(self.user, comment, Reaction.LIKE)
+
+        response = self.client.get(self.comments_url)
+        self.assertEqual(json.loads(response.content)[0]["like_count"], 1)
+
+    def test_category_change_invalidates_posts_and_categories(self):
+        self.client.get("/api/categories/")
+        self.client.get(f"/api/posts/{self.post.pk}/")
+
+        self.category.name = "Technology"
+        self.category.save()
+
+        response = self.client.get("/api/categories/")
+        self.assertEqual(json.loads(response.content)[0]["name"], "Technology")
+        response = self.client.get(f"/api/posts/{self.post.pk}/")
+        self.assertEqual(json.loads(response.content)["category"]["name"], "Technology")
+        self.assertGreater(get_stats()["invalidations"], 0)
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+        self.user = User.objects.create_user(username="reader", password="@123tza..")
+        category = Category.objects.create(name="Life")
+        self.post = Post.objects.create(
+            title="Post",
+            body="Body",
+            author=self.user,
+            category=category,
+            published=True,
+            publish_date=timezone.now(),
+        )
+        self.comment = Comment.objects.create(user=self.user, post=self.post, text="Text")
+        self.post_url = f"/api/posts/{self.post.pk}/"
+        self.comments_url = f"/api/posts/{self.post.pk}/comments/"
+
+    def test_post_detail_not_modified(self):
+        response = self.client.get(self.post_url)
+        self.assertIn("ETag", response)
+
+        with self.assertNumQueries(0):
+            response = self.client.get(self.post_url, HTTP_IF_NONE_MATCH=response["ETag"])
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_no_last_modified(self):
+        # Reactions and changes to tags, categories and profiles do not change the modification
+        # dates, so only the ETag can tell whether a response is stale.
+        for url in [self.post_url, self.comments_url]:
+            response = self.client.get(url)
+            self.assertNotIn("Last-Modified", response)
+
+        Reaction.set_reaction(self.user, self.comment, Reaction.LIKE)
+        response = self.client.get(self.comments_url, HTTP_IF_MODIFIED_SINCE=http_date())
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_update_changes_etag(self):
+        etag = self.client.get(self.post_url)["ETag"]
+
+        self.post.body = "New body"
+        self.post.save()
+
+        response = self.client.get(self.post_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_comments_not_modified(self):
+        etag = self.client.get(self.comments_url)["ETag"]
+
+        response = self.client.get(self.comments_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_reaction_changes_comments_etag(self):
+        etag = self.client.get(self.comments_url)["ETag"]
+
+        Reaction.set_reaction(self.user, self.comment, Reaction.LIKE)
+
+        response = self.client.get(self.comments_url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_comments_etag_differs_per_user(self):
+        anonymous_etag = self.client.get(self.comments_url)["ETag"]
+
+        response = self.client.get(
+            self.comments_url,
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}",
+            HTTP_IF_NONE_MATCH=anonymous_etag,
+        )
+
+        self.assertEqual(response.status_code, 200)
+
+
+class PostSearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = "/api/posts/search/"
+        self.client = Client()
+
+        self.user = User.objects.create_user(username="author", password="@123tza..")
+        self.category = Category.objects.create(name="Technology")
+        self.django_post = self.create_post(
+            title="Getting started with Django", body="Models, views and templates."
+        )
+        self.body_post = self.create_post(
+            title="Web frameworks", body="We compare Flask and Django for small projects."
+        )
+        self.create_post(title="Gardening", body="Tomatoes need plenty of sun.")
+        self.create_post(title="Django drafts", body="Not ready yet.", published=False)
+
+    def create_post(self, title, body, published=True):
+        return Post.objects.create(
+            title=title,
+            body=body,
+            author=self.user,
+            category=self.category,
+            published=published,
+            publish_date=timezone.now() if published else None,
+        )
+
+    def test_search_ranks_title_matches_first(self):
+        response = self.client.get(f"{self.url}?q=django")
+
+        self.assertEqual(response.status_code, 200)
+        response_data = json.loads(response.content)
+        self.assertEqual(response_data["count"], 2)
+        ids = [post["id"] for post in response_data["results"]]
+        self.assertEqual(ids, [self.django_post.pk, self.body_post.pk])
+
+    def test_search_highlights_matches(self):
+        response = self.client.get(f"{self.url}?q=django")
+
+        result = json.loads(response.content)["results"][0]
+        self.assertEqual(result["title_highlight"], "Getting started with <mark>Django</mark>")
+        result = json.loads(response.content)["results"][1]
+        self.assertIn("<mark>Django</mark>", result["body_highlight"])
+
+    def test_search_highlights_are_escaped(self):
+        self.create_post(title="Scripts & <b>Django</b>", body="<script>alert(1)</script> Django")
+
+        response = self.client.get(f"{self.url}?q=script")
+
+        result = json.loads(response.content)["results"][0]
+        self.assertEqual(
+            result["title_highlight"], "<mark>Scripts</mark> &amp; &lt;b&gt;Django&lt;/b&gt;"
+        )
+        self.assertNotIn("<script>", result["body_highlight"])
+        self.assertIn("&lt;<mark>script</mark>&gt;", result["body_highlight"])
+
+    def test_search_matches_word_stems(self):
+        response = self.client.get(f"{self.url}?q=framework")
+
+        ids = [post["id"] for post in json.loads(response.content)["results"]]
+        self.assertEqual(ids, [self.body_post.pk])
+
+    def test_search_is_updated_on_save(self):
+        self.django_post.title = "Getting started with Flask"
+        self.django_post.save()
+
+        response = self.client.get(f"{self.url}?q=django")
+
+        ids = [post["id"] for post in json.loads(response.content)["results"]]
+        self.assertEqual(ids, [self.body_post.pk])
+
+    def test_search_query_syntax_is_escaped(self):
+        response = self.client.get(f'{self.url}?q="django OR NEAR(*')
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_search_is_paginated(self):
+        response = self.client.get(f"{self.url}?q=django&page_size=1&page=2")
+
+        response_data = json.loads(response.content)
+        self.assertEqual(len(response_data["results"]), 1)
+        self.assertIsNone(response_data["next"])
+        self.assertIsNotNone(response_data["previous"])
+
+    def test_search_without_query(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 400)
+
+
+class PostListFilterTest(TestCase):
+    def setUp(self):
+        self.url = "/api/posts/"
+        self.client = Client()
+
+        self.author = User.objects.create_user(username="author", password="@123tza..")
+        self.author.profile.role = Profile.AUTHOR
+        self.author.profile.save()
+        self.other_author = User.objects.create_user(username="other", password="@123tza..")
+        self.life = Category.objects.create(name="Life")
+        self.technology = Category.objects.create(name="Technology")
+        self.django = Tag.objects.create(name="Django")
+        self.grit = Tag.objects.create(name="Grit")
+
+        now = timezone.now()
+        self.django_post = self.create_post(
+            "Django", self.author, self.technology, [self.django], now - timedelta(days=10)
+        )
+        self.both_post = self.create_post(
+            "Both", self.author, self.life, [self.django, self.grit], now - timedelta(days=5)
+        )
+        self.grit_post = self.create_post("Grit", self.other_author, self.life, [self.grit], now)
+        self.draft = self.create_post("Draft", self.author, self.life, [], None)
+        self.other_draft = self.create_post("Other Draft", self.other_author, self.life, [], None)
+
+    def create_post(self, title, author, category, tags, publish_date):
+        post = Post.objects.create(
+            title=title,
+            body="Body",
+            author=author,
+            category=category,
+            publish_date=publish_date,
+            published=publish_date is not None,
+        )
+        post.tags.set(tags)
+        return post
+
+    def get_ids(self, query="", **headers):
+        response = self.client.get(f"{self.url}?{query}", **headers)
+        self.assertEqual(response.status_code, 200)
+        return {post["id"] for post in json.loads(response.content)["results"]}
+
+    def test_anonymous_users_do_not_see_drafts(self):
+        ids = self.get_ids()
+
+        self.assertEqual(ids, {self.django_post.pk, self.both_post.pk, self.grit_post.pk})
+
+    def test_authors_see_their_own_drafts(self):
+        token = AccessToken.for_user(self.author)
+
+        ids = self.get_ids("published=false", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+        self.assertEqual(ids, {self.draft.pk})
+
+    def test_drafts_are_hidden_from_detail_and_comments(self):
+        token = AccessToken.for_user(self.author)
+        scheduled = self.create_post("Scheduled", self.author, self.life, [], None)
+        Post.objects.filter(pk=scheduled.pk).update(publish_date=timezone.now() + timedelta(days=1))
+
+        for post in [self.draft, scheduled]:
+            for url in [f"{self.url}{post.pk}/", f"{self.url}{post.pk}/comments/"]:
+                with self.subTest(url=url):
+                    self.assertEqual(self.client.get(url).status_code, 404)
+                    response = self.client.get(url, HTTP_AUTHORIZATION=f"Bearer {token}")
+                    self.assertEqual(response.status_code, 200)
+
+        other_token = AccessToken.for_user(self.other_author)
+        response = self.client.get(
+            f"{self.url}{self.draft.pk}/", HTTP_AUTHORIZATION=f"Bearer {other_token}"
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_filter_by_category(self):
+        ids = self.get_ids(f"category={self.technology.pk}")
+
+        self.assertEqual(ids, {self.django_post.pk})
+
+    def test_filter_by_any_tag(self):
+        ids = self.get_ids(f"tag={self.django.pk},{self.grit.pk}")
+
+        self.assertEqual(ids, {self.django_post.pk, self.both_post.pk, self.grit_post.pk})
+
+    def test_filter_by_all_tags(self):
+        ids = self.get_ids(f"tag={self.django.pk},{self.grit.pk}&tag_match=all")
+
+        self.assertEqual(ids, {self.both_post.pk})
+
+    def test_filter_by_author(self):
+        ids = self.get_ids("author=other")
+
+        self.assertEqual(ids, {self.grit_post.pk})
+
+    def test_filter_by_publish_date_range(self):
+        after = (timezone.now() - timedelta(days=7)).date().isoformat()
+        before = (timezone.now() - timedelta(days=1)).isoformat()
+
+        ids = self.get_ids(f"publish_date_after={after}&publish_date_before={before}")
+
+        self.assertEqual(ids, {self.both_post.pk})
+
+    def test_invalid_filters(self):
+        response = self.client.get(f"{self.url}?tag=django&tag_match=some&published=yes")
+
+        self.assertEqual(response.status_code, 400)
+        response_data = json.loads(response.content)
+        self.assertEqual(set(response_data), {"tag", "tag_match", "published"})
+
+
+class PostFieldsTest(TestCase):
+    def setUp(self):
+        self.url = "/api/posts/"
+        self.client = Client()
+
+        user = User.objects.create_user(username="author", password="@123tza..")
+        category = Category.objects.create(name="Life")
+        self.post = Post.objects.create(
+            title="Post",
+            body="A very long body.",
+            author=user,
+            category=category,
+            publish_date=timezone.now(),
+            published=True,
+        )
+
+    def get_post_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return [query["sql"] for query in context if 'FROM "post_post"' in query["sql"]]
+
+    def test_list_leaves_out_body(self):
+        response = self.client.get(self.url)
+
+        post = json.loads(response.content)["results"][0]
+        self.assertNotIn("body", post)
+        self.assertEqual(post["title"], "Post")
+        self.assertEqual(post["author"]["username"], "author")
+
+    def test_list_does_not_load_body(self):
+        queries = self.get_post_queries(f"{self.url}?page_size=5")
+
+        self.assertTrue(queries)
+        for sql in queries:
+            self.assertNotIn('"post_post"."body"', sql)
+
+    def test_list_fields(self):
+        response = self.client.get(f"{self.url}?fields=id,body")
+
+        post = json.loads(response.content)["results"][0]
+        self.assertEqual(post, {"id": self.post.pk, "body": "A very long body."})
+
+    def test_list_exclude(self):
+        response = self.client.get(f"{self.url}?exclude=tags,author")
+
+        post = json.loads(response.content)["results"][0]
+        self.assertNotIn("tags", post)
+        self.assertNotIn("author", post)
+        self.assertIn("title", post)
+
+    def test_detail_fields(self):
+        response = self.client.get(f"{self.url}{self.post.pk}/?fields=title")
+
+        self.assertEqual(json.loads(response.content), {"title": "Post"})
+
+    def test_detail_includes_body_by_default(self):
+        response = self.client.get(f"{self.url}{self.post.pk}/")
+
+        self.assertEqual(json.loads(response.content)["body"], "A very long body.")
+
+    def test_unknown_field(self):
+        response = self.client.get(f"{self.url}?fields=id,password")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("fields", json.loads(response.content))
+
+    def test_unknown_excluded_field(self):
+        response = self.client.get(f"{self.url}{self.post.pk}/?exclude=title,password")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("exclude", json.loads(response.content))
+
+    def test_list_exclude_body(self):
+        response = self.client.get(f"{self.url}?exclude=body")
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_empty_fields(self):
+        response = self.client.get(f"{self.url}{self.post.pk}/?fields=")
+
+        self.assertEqual(json.loads(response.content)["title"], "Post")
+
+
+class PostQueryCountTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = "/api/posts/"
+        self.client = Client()
+
+        category = Category.objects.create(name="Life")
+        tags = [Tag.objects.create(name=f"Tag {i}") for i in range(3)]
+        self.create_posts(category, tags, 3)
+
+    def create_posts(self, category, tags, num_posts):
+        for i in range(num_posts):
+            author = User.objects.create_user(username=f"author-{uuid4().hex[:8]}")
+            post = Post.objects.create(
+                title=f"Post {uuid4()}",
+                body="Body",
+                author=author,
+                category=category,
+                publish_date=timezone.now(),
+                published=True,
+            )
+            post.tags.set(tags)
+
+    def test_list_query_count(self):
+        # One query for the posts with their authors and categories, and one for the tags.
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(json.loads(response.content)["results"]), 3)
+
+        self.create_posts(Category.objects.create(name="Technology"), [], 10)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url)
+        self.assertEqual(len(json.loads(response.content)["results"]), 13)
+
+    def test_list_with_body_query_count(self):
+        with self.assertNumQueries(2):
+            self.client.get(f"{self.url}?fields=id,body,author,tags")
+
+    def test_detail_query_count(self):
+        post = Post.objects.first()
+
+        # One query each for the post and its tags.
+        with self.assertNumQueries(2):
+            response = self.client.get(f"{self.url}{post.pk}/")
+
+        response_data = json.loads(response.content)
+        self.assertEqual(response_data["author"]["username"], post.author.username)
+        self.assertEqual(len(response_data["tags"]), 3)
+
+
+class AsyncReadPathTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.admin = User.objects.create_user(username="admin", password="@123tza..")
+        self.admin.profile.role = Profile.ADMIN
+        self.admin.profile.save()
+        self.token = AccessToken.for_user(self.admin)
+
+        self.category = Category.objects.create(name="Life")
+        self.tag = Tag.objects.create(name="Django")
+        self.post = Post.objects.create(
+            title="Post",
+            body="Body",
+            author=self.admin,
+            category=self.category,
+            publish_date=timezone.now(),
+            published=True,
+        )
+        self.post.tags.add(self.tag)
+        self.comment = Comment.objects.create(user=self.admin, post=self.post, text="Text")
+        Reaction.set_reaction(self.admin, self.comment, Reaction.LIKE)
+
+    async def test_read_endpoints(self):
+        for url in [
+            "/api/posts/",
+            f"/api/posts/{self.post.pk}/",
+            f"/api/posts/{self.post.pk}/comments/",
+            "/api/categories/",
+            f"/api/categories/{self.category.pk}/",
+            "/api/tags/",
+            f"/api/tags/{self.tag.pk}/",
+        ]:
+            with self.subTest(url=url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                expected = await sync_to_async(Client().get)(url)
+                self.assertEqual(response.json(), expected.json())
+
+    async def test_not_found(self):
+        response = await self.async_client.get("/api/posts/0/")
+
+        self.assertEqual(response.status_code, 404)
+
+    async def test_post_detail_not_modified(self):
+        url = f"/api/posts/{self.post.pk}/"
+        etag = (await self.async_client.get(url))["ETag"]
+
+        response = await self.async_client.get(url, headers={"If-None-Match": etag})
+
+        self.assertEqual(response.status_code, 304)
+
+    async def test_authenticated_comments(self):
+        response = await self.async_client.get(
+            f"/api/posts/{self.post.pk}/comments/",
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()[0]["user_reaction"], Reaction.LIKE)
+
+    async def test_sync_write_handler(self):
+        response = await self.async_client.post(
+            "/api/categories/",
+            {"name": "Technology"},
+            content_type="application/json",
+            headers={"Authorization": f"Bearer {self.token}"},
+        )
+
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(await Category.objects.filter(name="Technology").aexists())
+
+    async def test_unauthenticated_write(self):
+        response = await self.async_client.post(
+            "/api/categories/", {"name": "Technology"}, content_type="application/json"
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+
+class ImportExportPostsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", password="@123tza..")
+        self.category = Category.objects.create(name="Life")
+        self.tag = Tag.objects.create(name="Django")
+
+    def import_posts(self, lines, **options):
+        with tempfile.NamedTemporaryFile("w", suffix=".jsonl", encoding="utf-8") as file:
+            file.write("\n".join(json.dumps(line) for line in lines))
+            file.flush()
+            out, err = StringIO(), StringIO()
+            call_command("import_posts", file.name, stdout=out, stderr=err, **options)
+        return out.getvalue(), err.getvalue()
+
+    def export_posts(self):
+        out = StringIO()
+        call_command("export_posts", stdout=out)
+        return [json.loads(line) for line in out.getvalue().splitlines()]
+
+    def test_export_and_import(self):
+        publish_date = timezone.now().replace(microsecond=0)
+        post = Post.objects.create(
+            title="Post",
+            subtitle="Subtitle",
+            body="Body",
+            author=self.author,
+            category=self.category,
+            published=True,
+            publish_date=publish_date,
+        )
+        post.tags.add(self.tag)
+        Post.objects.create(title="Draft", body="Body", author=self.author, category=self.category)
+
+        lines = self.export_posts()
+        self.assertEqual(len(lines), 2)
+        self.assertEqual(lines[0]["tags"], ["Django"])
+
+        Post.objects.all().delete()
+        out, err = self.import_posts(lines, batch_size=1)
+
+        self.assertIn("2 post(s) created, 0 updated and 0 skipped.", out)
+        post = Post.objects.get(title="Post")
+        self.assertEqual(post.subtitle, "Subtitle")
+        self.assertEqual(post.publish_date, publish_date)
+        self.assertEqual(post.author, self.author)
+        self.assertEqual(list(post.tags.all()), [self.tag])
+        self.assertEqual(self.export_posts(), lines)
+
+    def test_import_creates_tags_and_categories(self):
+        lines = [
+            {
+                "title": f"Post {i}",
+                "body": "Body",
+                "author": "author",
+                "category": "Technology",
+                "tags": ["Django", "Python"],
+            }
+            for i in range(3)
+        ]
+
+        self.import_posts(lines)
+
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(Category.objects.filter(name="Technology").count(), 1)
+        self.assertEqual(Tag.objects.count(), 2)
+        self.assertEqual(Post.tags.through.objects.count(), 6)
+
+    def test_import_updates_posts_by_title(self):
+        post = Post.objects.create(
+            title="Post", body="Body", author=self.author, category=self.category
+        )
+        post.tags.add(self.tag)
+
+        line = {"title": "Post", "body": "New body", "author": "author", "category": "Life"}
+        out, err = self.import_posts([line, {**line, "tags": ["Python"]}])
+
+        self.assertIn("0 post(s) created, 1 updated and 0 skipped.", out)
+        post.refresh_from_db()
+        self.assertEqual(post.body, "New body")
+        self.assertEqual([tag.name for tag in post.tags.all()], ["Python"])
+
+    def test_import_skips_invalid_lines(self):
+        lines = [
+            {"title": "Post", "body": "Body", "author": "nobody", "category": "Life"},
+            {"title": "Post", "author": "author", "category": "Life"},
+            {"title": "Post", "body": "Body", "author": "author", "category": "x" * 21},
+            ["Post"],
+            {
+                "title": "Post",
+                "body": "Body",
+                "author": "author",
+                "category": "Life",
+                "published": "false",
+            },
+        ]
+
+        out, err = self.import_posts(lines)
+
+        self.assertIn("0 post(s) created, 0 updated and 5 skipped.", out)
+        self.assertIn("Line 1: The author 'nobody' does not exist.", err)
+        self.assertIn("Line 2: Missing required field(s): body.", err)
+        self.assertIn("Line 5: Expected published to be true or false.", err)
+        self.assertFalse(Post.objects.exists())
+
+    def test_import_regenerates_feeds_the_post_left(self):
+        cache.clear()
+        post = Post.objects.create(
+            title="Post",
+            body="Body",
+            author=self.author,
+            category=self.category,
+            published=True,
+            publish_date=timezone.now(),
+        )
+        post.tags.add(self.tag)
+        for kind, pk in [(feeds.CATEGORY, self.category.pk), (feeds.TAG, self.tag.pk)]:
+            feeds.render(kind, pk)
+
+        line = {
+            "title": "Post",
+            "body": "Body",
+            "author": "author",
+            "category": "Technology",
+            "published": True,
+        }
+        with self.captureOnCommitCallbacks(execute=True):
+            self.import_posts([line])
+
+        for kind, pk in [(feeds.CATEGORY, self.category.pk), (feeds.TAG, self.tag.pk)]:
+            self.assertNotIn("<title>Post</title>", feeds.get_feed(kind, pk, "rss")["content"])
+
+
+class ReactionBatchTest(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.user = User.objects.create_user(username="reader", password="@123tza..")
+        self.token = AccessToken.for_user(self.user)
+        category = Category.objects.create(name="Life")
+        self.post = Post.objects.create(
+            title="Post",
+            body="Body",
+            author=self.user,
+            category=category,
+            published=True,
+            publish_date=timezone.now(),
+        )
+        self.comments = [
+            Comment.objects.create(user=self.user, post=self.post, text=f"Text {i}")
+            for i in range(3)
+        ]
+        self.url = f"/api/posts/{self.post.pk}/comments/reactions/"
+
+    def post_reactions(self, reactions, **kwargs):
+        return self.client.post(
+            self.url,
+            data={"reactions": reactions},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {self.token}",
+            **kwargs,
+        )
+
+    def test_set_reactions(self):
+        Reaction.set_reaction(self.user, self.comments[2], Reaction.LIKE)
+        reactions = [
+            {"comment": self.comments[0].pk, "reaction_type": Reaction.LIKE},
+            {"comment": self.comments[1].pk, "reaction_type": Reaction.LIKE},
+            {"comment": self.comments[1].pk, "reaction_type": Reaction.DISLIKE},
+            {"comment": self.comments[2].pk, "reaction_type": Reaction.NEUTRAL},
+        ]
+
+        # One query each for the user, the post, the comments and the upsert.
+        with self.assertNumQueries(4):
+            response = self.post_reactions(reactions)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)["reactions"]), 3)
+        counts = Comment.objects.order_by("pk").values_list("like_count", "dislike_count")
+        self.assertEqual(list(counts), [(1, 0), (0, 1), (0, 0)])
+        self.assertEqual(Reaction.objects.count(), 3)
+
+    def test_comment_under_other_post(self):
+        other_post = Post.objects.create(
+            title="Other", body="Body", author=self.user, category=self.post.category
+        )
+        comment = Comment.objects.create(user=self.user, post=other_post, text="Text")
+
+        response = self.post_reactions([{"comment": comment.pk, "reaction_type": Reaction.LIKE}])
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Reaction.objects.exists())
+
+    def test_comment_under_draft(self):
+        author = User.objects.create_user(username="author", password="@123tza..")
+        draft = Post.objects.create(
+            title="Draft", body="Body", author=author, category=self.post.category
+        )
+        comment = Comment.objects.create(user=author, post=draft, text="Text")
+
+        response = self.client.post(
+            f"/api/posts/{draft.pk}/comments/reactions/",
+            data={"reactions": [{"comment": comment.pk, "reaction_type": Reaction.LIKE}]},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {self.token}",
+        )
+
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Reaction.objects.exists())
+
+    def test_invalid_reaction_type(self):
+        response = self.post_reactions([{"comment": self.comments[0].pk, "reaction_type": "LOVE"}])
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_unauthenticated(self):
+        response = self.client.post(
+            self.url,
+            data={"reactions": [{"comment": self.comments[0].pk, "reaction_type": Reaction.LIKE}]},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_reactions_invalidate_comments_cache(self):
+        cache.clear()
+        comments_url = f"/api/posts/{self.post.pk}/comments/"
+        self.client.get(comments_url)
+
+        self.post_reactions([{"comment": self.comments[0].pk, "reaction_type": Reaction.LIKE}])
+
+        response_data = json.loads(self.client.get(comments_url).content)
+        like_counts = {comment["id"]: comment["like_count"] for comment in response_data}
+        self.assertEqual(like_counts[self.comments[0].pk], 1)
+
+
+@override_settings(REACTION_BUFFER=True)
+class ReactionBufferTest(TestCase):
+    def setUp(self):
+        # fakeredis runs the Lua scripts with lupa. Each test gets an empty server.
+        server = fakeredis.FakeServer()
+        patcher = mock.patch.object(
+            reaction_buffer, "_client", fakeredis.FakeRedis(server=server, decode_responses=True)
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = Client()
+        self.user = User.objects.create_user(username="reader", password="@123tza..")
+        self.other_user = User.objects.create_user(username="other", password="@123tza..")
+        category = Category.objects.create(name="Life")
+        self.post = Post.objects.create(
+            title="Post", body="Body", author=self.user, category=category, published=True
+        )
+        self.comment = Comment.objects.create(user=self.user, post=self.post, text="Text")
+
+    def assertCounts(self, like_count, dislike_count):
+        self.comment.refresh_from_db()
+        self.assertEqual(
+            (self.comment.like_count, self.comment.dislike_count), (like_count, dislike_count)
+        )
+
+    def get_comment_data(self, user=None):
+        headers = {}
+        if user is not None:
+            headers["HTTP_AUTHORIZATION"] = f"Bearer {AccessToken.for_user(user)}"
+        response = self.client.get(f"/api/posts/{self.post.pk}/comments/", **headers)
+        return json.loads(response.content)[0]
+
+    def test_reactions_are_buffered(self):
+        # The first reaction to the comment loads its counts and the user's previous reaction.
+        with self.assertNumQueries(2):
+            reaction_buffer.set_reactions(self.user, {self.comment: Reaction.LIKE})
+        with self.assertNumQueries(1):
+            reaction_buffer.set_reactions(self.other_user, {self.comment: Reaction.LIKE})
+        # Once the comment and the user are in Redis, the database is not used.
+        with self.assertNumQueries(0):
+            reaction_buffer.set_reactions(self.user, {self.comment: Reaction.DISLIKE})
+
+        self.assertFalse(Reaction.objects.exists())
+        self.assertCounts(0, 0)
+        self.assertEqual(reaction_buffer.get_counts([self.comment.pk]), {self.comment.pk: (1, 1)})
+
+    def test_buffered_counts_are_served(self):
+        Reaction.set_reaction(self.other_user, self.comment, Reaction.LIKE)
+        self.client.post(
+            f"/api/posts/{self.post.pk}/comments/reactions/",
+            data={"reactions": [{"comment": self.comment.pk, "reaction_type": Reaction.DISLIKE}]},
+            content_type="application/json",
+            HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.user)}",
+        )
+
+        self.assertEqual(Reaction.objects.count(), 1)
+        data = self.get_comment_data()
+        self.assertEqual((data["like_count"], data["dislike_count"]), (1, 1))
+        self.assertEqual(self.get_comment_data(self.user)["user_reaction"], Reaction.DISLIKE)
+
+    def test_flush(self):
+        Reaction.set_reaction(self.user, self.comment, Reaction.LIKE)
+        reaction_buffer.set_reactions(self.user, {self.comment: Reaction.DISLIKE})
+        reaction_buffer.set_reactions(self.other_user, {self.comment: Reaction.LIKE})
+        reaction_buffer.set_reactions(self.other_user, {self.comment: Reaction.NEUTRAL})
+
+        self.assertEqual(reaction_buffer.flush(), 1)
+
+        self.assertCounts(0, 1)
+        reactions = Reaction.objects.values_list("user__username", "reaction_type")
+        self.assertEqual(
+            set(reactions), {("reader", Reaction.DISLIKE), ("other", Reaction.NEUTRAL)}
+        )
+        self.assertEqual(reaction_buffer.flush(), 0)
+
+    def test_interrupted_flush_is_replayed(self):
+        reaction_buffer.set_reactions(self.user, {self.comment: Reaction.LIKE})
+        # A flusher claims the reactions, then dies before writing them.
+        reaction_buffer.claim([self.comment.pk])
+        reaction_buffer.set_reactions(self.other_user, {self.comment: Reaction.DISLIKE})
+
+        # The claimed reactions are written first, then the ones buffered since.
+        self.assertEqual(reaction_buffer.flush(), 1)
+        self.assertCounts(1, 0)
+        self.assertEqual(reaction_buffer.flush(), 1)
+        self.assertCounts(1, 1)
+
+    def test_flush_outliving_its_lock(self):
+        reaction_buffer.set_reactions(self.user, {self.comment: Reaction.LIKE})
+        claim = reaction_buffer.claim
+
+        def claim_after_lock_expired(comment_ids):
+            reaction_buffer.get_client().delete(reaction_buffer.FLUSH_LOCK_KEY)
+            return claim(comment_ids)
+
+        with mock.patch.object(reaction_buffer, "claim", side_effect=claim_after_lock_expired):
+            self.assertEqual(reaction_buffer.flush(), 1)
+        self.assertCounts(1, 0)
+
+    def test_flush_skips_deleted_users(self):
+        reaction_buffer.set_reactions(self.user, {self.comment: Reaction.LIKE})
+        reaction_buffer.set_reactions(self.other_user, {self.comment: Reaction.LIKE})
+        self.other_user.delete()
+
+        self.assertEqual(reaction_buffer.flush(), 1)
+        self.assertCounts(1, 0)
+
+    def test_flush_continues_past_deleted_comments(self):
+        other_comment = Comment.objects.create(user=self.user, post=self.post, text="Text")
+        reaction_buffer.set_reactions(self.user, {self.comment: Reaction.LIKE})
+        reaction_buffer.set_reactions(self.user, {other_comment: Reaction.LIKE})
+        # Claimed reactions are flushed first, so the first batch only has the deleted comment.
+        reaction_buffer.claim([other_comment.pk])
+        other_comment.delete()
+        out = StringIO()
+
+        call_command("flush_reactions", "--once", "--batch-size", "1", stdout=out)
+
+        self.assertIn("Flushed the reactions to 2 comment(s).", out.getvalue())
+        self.assertCounts(1, 0)
+
+    def test_flush_reactions_command(self):
+        reaction_buffer.set_reactions(self.user, {self.comment: Reaction.LIKE})
+        out = StringIO()
+
+        call_command("flush_reactions", "--once", stdout=out)
+
+        self.assertIn("Flushed the reactions to 1 comment(s).", out.getvalue())
+        self.assertCounts(1, 0)
+
+
+@override_settings(SITE_URL="http://testserver")
+class PostTasksTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author = User.objects.create_user(username="author", password="@123tza..")
+        self.author.profile.role = Profile.AUTHOR
+        self.author.profile.save()
+        self.post = Post.objects.create(
+            title="Draft",
+            body="Body",
+            author=self.author,
+            category=Category.objects.create(name="Life"),
+        )
+        self.comment = Comment.objects.create(user=self.author, post=self.post, text="Text")
+
+    @override_settings(
+        SITE_URL="https://api.example.com", ALLOWED_HOSTS=["testserver", "api.example.com"]
+    )
+    def test_publish_warms_post_cache(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f"/api/posts/{self.post.pk}/publish/",
+                HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.author)}",
+            )
+        self.assertEqual(response.status_code, 200)
+
+        hits = get_stats()["hits"]
+        for url in [
+            "/api/posts/",
+            f"/api/posts/{self.post.pk}/",
+            f"/api/posts/{self.post.pk}/comments/",
+        ]:
+            response = self.client.get(url, secure=True, HTTP_HOST="api.example.com")
+            self.assertEqual(response.status_code, 200)
+        self.assertEqual(get_stats()["hits"], hits + 3)
+
+    def test_unpublished_post_is_not_warmed(self):
+        tasks.warm_post_cache.delay(self.post.pk)
+
+        misses = get_stats()["misses"]
+        self.client.get(f"/api/posts/{self.post.pk}/comments/")
+        self.assertEqual(get_stats()["misses"], misses + 1)
+
+    def test_reaction_invalidates_comments_cache_on_worker(self):
+        self.post.published = True
+        self.post.save()
+        url = f"/api/posts/{self.post.pk}/comments/"
+        self.client.get(url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Reaction.objects.create(
+                user=self.author, comment_id=self.comment.pk, reaction_type=Reaction.LIKE
+            )
+
+        self.assertEqual(json.loads(self.client.get(url).content)[0]["like_count"], 1)
+
+    def test_reconcile_reaction_counts_task(self):
+        Reaction.set_reaction(self.author, self.comment, Reaction.DISLIKE)
+        Comment.objects.update(like_count=3, dislike_count=0)
+
+        tasks.reconcile_reaction_counts.delay([self.comment.pk])
+
+        self.comment.refresh_from_db()
+        self.assertEqual((self.comment.like_count, self.comment.dislike_count), (0, 1))
+
+
+@override_settings(SITE_URL="http://testserver")
+class ScheduledPublishingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author = User.objects.create_user(username="author", password="@123tza..")
+        self.author.profile.role = Profile.AUTHOR
+        self.author.profile.save()
+        self.headers = {"HTTP_AUTHORIZATION": f"Bearer {AccessToken.for_user(self.author)}"}
+        self.category = Category.objects.create(name="Life")
+        now = timezone.now()
+        self.due = self.create_post("Due", now - timedelta(minutes=1))
+        self.scheduled = self.create_post("Scheduled", now + timedelta(days=1))
+        self.draft = self.create_post("Draft", None)
+
+    def create_post(self, title, publish_date):
+        return Post.objects.create(
+            title=title,
+            body="Body",
+            author=self.author,
+            category=self.category,
+            publish_date=publish_date,
+        )
+
+    def get_published_titles(self):
+        return set(Post.objects.published().values_list("title", flat=True))
+
+    def test_publish_scheduled_posts(self):
+        self.client.get("/api/posts/")
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(tasks.publish_scheduled_posts.delay().get(), 1)
+
+        updates = [query for query in queries if query["sql"].startswith("UPDATE")]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.get_published_titles(), {"Due"})
+        response_data = json.loads(self.client.get("/api/posts/").content)
+        self.assertEqual([post["title"] for post in response_data["results"]], ["Due"])
+        self.assertEqual(tasks.publish_scheduled_posts.delay().get(), 0)
+
+    def test_publish_scheduled_posts_warms_listing_once(self):
+        other_due = self.create_post("Other Due", timezone.now() - timedelta(minutes=2))
+
+        with mock.patch.object(tasks, "warm") as warm:
+            self.assertEqual(tasks.publish_scheduled_posts.delay().get(), 2)
+
+        paths = [call.args[0] for call in warm.call_args_list]
+        self.assertEqual(paths.count("/api/posts/"), 1)
+        for post in [self.due, other_due]:
+            self.assertIn(f"/api/posts/{post.pk}/", paths)
+            self.assertIn(f"/api/posts/{post.pk}/comments/", paths)
+
+    def test_publish_post_view(self):
+        url = f"/api/posts/{self.scheduled.pk}/publish/"
+
+        response = self.client.post(url, **self.headers)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(json.loads(response.content)["published"])
+        self.scheduled.refresh_from_db()
+        self.assertLess(self.scheduled.publish_date, timezone.now())
+        # The scheduler leaves the post alone.
+        tasks.publish_scheduled_posts.delay()
+        self.assertEqual(self.get_published_titles(), {"Due", "Scheduled"})
+
+        response = self.client.post(url, **self.headers)
+        self.assertEqual(response.status_code, 400)
+
+    def test_schedule_post(self):
+        url = f"/api/posts/{self.draft.pk}/"
+        publish_date = timezone.now() + timedelta(hours=1)
+
+        response = self.client.put(
+            url,
+            data={"publish_date": publish_date.isoformat()},
+            content_type="application/json",
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.draft.refresh_from_db()
+        self.assertEqual(self.draft.publish_date, publish_date)
+        self.assertFalse(self.draft.published)
+
+    def test_schedule_post_in_the_past(self):
+        response = self.client.put(
+            f"/api/posts/{self.draft.pk}/",
+            data={"publish_date": (timezone.now() - timedelta(hours=1)).isoformat()},
+            content_type="application/json",
+            **self.headers,
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+
+class FeedTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author = User.objects.create_user(username="author", password="@123tza..")
+        self.life = Category.objects.create(name="Life")
+        self.technology = Category.objects.create(name="Technology")
+        self.django = Tag.objects.create(name="Django")
+        self.post = self.create_post("Published", self.life, published=True)
+        self.post.tags.add(self.django)
+        self.other_post = self.create_post("Other", self.technology, published=True)
+        self.draft = self.create_post("Draft", self.life, published=False)
+
+    def create_post(self, title, category, published):
+        return Post.objects.create(
+            title=title,
+            body="Body",
+            author=self.author,
+            category=category,
+            published=published,
+            publish_date=timezone.now() if published else None,
+        )
+
+    def get_titles(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        content = response.content.decode()
+        return {title for title in ("Published", "Other", "Draft") if f">{title}<" in content}
+
+    def test_feeds(self):
+        self.assertEqual(self.get_titles("/api/feeds/rss/"), {"Published", "Other"})
+        self.assertEqual(self.get_titles("/api/feeds/atom/"), {"Published", "Other"})
+        self.assertEqual(
+            self.get_titles(f"/api/feeds/rss/categories/{self.life.pk}/"), {"Published"}
+        )
+        self.assertEqual(self.get_titles(f"/api/feeds/atom/tags/{self.django.pk}/"), {"Published"})
+        self.assertEqual(
+            self.get_titles(f"/api/feeds/rss/authors/{self.author.pk}/"), {"Published", "Other"}
+        )
+
+    def test_content_types(self):
+        response = self.client.get("/api/feeds/rss/")
+        self.assertTrue(response["Content-Type"].startswith("application/rss+xml"))
+        response = self.client.get("/api/feeds/atom/")
+        self.assertTrue(response["Content-Type"].startswith("application/atom+xml"))
+
+    def test_missing_feed(self):
+        response = self.client.get("/api/feeds/rss/categories/999/")
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_cached_feed_with_etag(self):
+        etag = self.client.get("/api/feeds/rss/")["ETag"]
+
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/feeds/rss/", HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+
+    def test_feeds_are_regenerated_on_publish(self):
+        etag = self.client.get("/api/feeds/rss/")["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.draft.published = True
+            self.draft.publish_date = timezone.now()
+            self.draft.save()
+
+        response = self.client.get("/api/feeds/rss/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Draft", self.get_titles("/api/feeds/rss/"))
+
+    def test_only_affected_feeds_are_regenerated(self):
+        life_feed_url = f"/api/feeds/rss/categories/{self.life.pk}/"
+        self.assertEqual(self.get_titles(life_feed_url), {"Published"})
+        self.post = Post.objects.get(pk=self.post.pk)
+        self.post.category = self.technology
+        self.post.title = "Moved"
+
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.post.save()
+            self.draft.save()
+
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(
+            feeds.get_post_feeds([self.post.pk]),
+            {
+                (feeds.ALL, None),
+                (feeds.CATEGORY, self.technology.pk),
+                (feeds.AUTHOR, self.author.pk),
+                (feeds.TAG, self.django.pk),
+            },
+        )
+        # The feed of the category the post left is regenerated as well.
+        callbacks[0]()
+        self.assertEqual(self.get_titles(life_feed_url), set())
+
+    def test_tag_feeds_are_regenerated(self):
+        self.assertEqual(self.get_titles(f"/api/feeds/rss/tags/{self.django.pk}/"), {"Published"})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_post.tags.add(self.django)
+        self.assertEqual(
+            self.get_titles(f"/api/feeds/rss/tags/{self.django.pk}/"), {"Published", "Other"}
+        )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.other_post.tags.clear()
+        self.assertEqual(self.get_titles(f"/api/feeds/rss/tags/{self.django.pk}/"), {"Published"})
+
+
+class SitemapTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author = User.objects.create_user(username="author", password="@123tza..")
+        self.reader = User.objects.create_user(username="reader", password="@123tza..")
+        self.category = Category.objects.create(name="Life")
+        self.tag = Tag.objects.create(name="Django")
+        self.posts = [self.create_post(f"Post {i}", published=True) for i in range(3)]
+        self.draft = self.create_post("Draft", published=False)
+
+    def create_post(self, title, published):
+        return Post.objects.create(
+            title=title,
+            body="Body",
+            author=self.author,
+            category=self.category,
+            published=published,
+            publish_date=timezone.now() if published else None,
+        )
+
+    def get_content(self, url, **kwargs):
+        response = self.client.get(url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/xml")
+        return b"".join(response.streaming_content).decode()
+
+    def test_index(self):
+        content = self.get_content("/api/sitemap.xml")
+
+        self.assertIn("<sitemapindex", content)
+        for section in ["posts", "categories", "tags", "authors"]:
+            self.assertIn(f"http://localhost/api/sitemap-{section}-1.xml", content)
+
+    def test_sections(self):
+        content = self.get_content("/api/sitemap-posts-1.xml")
+        self.assertEqual(content.count("<url>"), 3)
+        self.assertNotIn(f"/api/posts/{self.draft.pk}/", content)
+        self.assertIn(
+            f"<loc>http://localhost/api/posts/{self.posts[0].pk}/</loc><lastmod>", content
+        )
+
+        content = self.get_content("/api/sitemap-categories-1.xml")
+        self.assertIn(f"<loc>http://localhost/api/categories/{self.category.pk}/</loc>", content)
+        content = self.get_content("/api/sitemap-tags-1.xml")
+        self.assertIn(f"<loc>http://localhost/api/tags/{self.tag.pk}/</loc>", content)
+        content = self.get_content("/api/sitemap-authors-1.xml")
+        self.assertEqual(content.count("<url>"), 1)
+        self.assertIn("<loc>http://localhost/api/users/author/</loc>", content)
+
+    @mock.patch.object(sitemap, "URLS_PER_FILE", 2)
+    def test_sections_are_split(self):
+        content = self.get_content("/api/sitemap.xml")
+        self.assertIn("/api/sitemap-posts-2.xml", content)
+        self.assertNotIn("/api/sitemap-posts-3.xml", content)
+
+        self.assertEqual(self.get_content("/api/sitemap-posts-1.xml").count("<url>"), 2)
+        self.assertEqual(self.get_content("/api/sitemap-posts-2.xml").count("<url>"), 1)
+        self.assertEqual(self.client.get("/api/sitemap-posts-3.xml").status_code, 404)
+
+    def test_cached_until_publish(self):
+        url = "/api/sitemap-posts-1.xml"
+        etag = self.client.get(url)["ETag"]
+        content = self.get_content(url)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_content(url), content)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.draft.published = True
+        self.draft.publish_date = timezone.now()
+        self.draft.save()
+
+        self.assertEqual(self.get_content(url).count("<url>"), 4)
+
+    def test_evicted_chunk_is_rendered_again(self):
+        url = "/api/sitemap-posts-1.xml"
+        response = self.client.get(url)
+        content = b"".join(response.streaming_content).decode()
+
+        cache.delete(sitemap.get_cache_key(response["ETag"].strip('"')) + ":0")
+
+        self.assertEqual(self.get_content(url), content)
+
+
+@mock.patch("myproject.streaming.CHUNK_SIZE", 2)
+class StreamingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author = User.objects.create_user(username="author", password="@123tza..")
+        self.author.profile.role = Profile.AUTHOR
+        self.author.profile.save()
+        self.category = Category.objects.create(name="Life")
+        self.tags = [Tag.objects.create(name=name) for name in ["Django", "Python", "Redis"]]
+        self.posts = []
+        for i in range(5):
+            post = Post.objects.create(
+                title=f"Post {i}",
+                body="Body",
+                author=self.author,
+                category=self.category,
+                published=True,
+                publish_date=timezone.now() - timedelta(days=i),
+            )
+            post.tags.set(self.tags[:2])
+            self.posts.append(post)
+        self.draft = Post.objects.create(
+            title="Draft", body="Body", author=self.author, category=self.category
+        )
+
+    def get_stream(self, url, content_type="application/json", **kwargs):
+        response = self.client.get(url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], content_type)
+        return b"".join(response.streaming_content).decode()
+
+    def get_ndjson(self, url, **kwargs):
+        content = self.get_stream(url, content_type="application/x-ndjson", **kwargs)
+        self.assertTrue(content.endswith("\n"))
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_stream_posts(self):
+        posts = json.loads(self.get_stream("/api/posts/?stream=1"))
+
+        # Every published post, in the order of the pages.
+        self.assertEqual([post["id"] for post in posts], [post.pk for post in self.posts])
+        page = self.client.get("/api/posts/").json()["results"]
+        self.assertEqual(posts, page)
+
+    def test_stream_posts_as_ndjson(self):
+        token = AccessToken.for_user(self.author)
+        posts = self.get_ndjson(
+            "/api/posts/?stream=ndjson&fields=id,title,body&category=" + str(self.category.pk),
+            HTTP_AUTHORIZATION=f"Bearer {token}",
+        )
+
+        self.assertEqual(len(posts), 6)
+        self.assertEqual(set(posts[0]), {"id", "title", "body"})
+
+    def test_stream_when_ndjson_is_accepted(self):
+        tags = self.get_ndjson("/api/tags/", HTTP_ACCEPT="application/x-ndjson")
+        self.assertEqual([tag["name"] for tag in tags], ["Django", "Python", "Redis"])
+
+        categories = self.get_ndjson("/api/categories/?format=ndjson")
+        self.assertEqual(categories, [{"id": self.category.pk, "name": "Life"}])
+
+    def test_stream_empty_collection(self):
+        Tag.objects.all().delete()
+
+        self.assertEqual(self.get_stream("/api/tags/?stream=1"), "[]")
+        self.assertEqual(self.get_stream("/api/tags/?stream=ndjson", "application/x-ndjson"), "")
+
+    def test_streams_are_not_cached(self):
+        self.client.get("/api/tags/")
+
+        response = self.client.get("/api/tags/", HTTP_ACCEPT="application/x-ndjson")
+
+        self.assertTrue(response.streaming)
+        self.assertIn("Accept", response["Vary"])
+
+    def test_stream_comments(self):
+        post = self.posts[0]
+        first = Comment.objects.create(user=self.author, post=post, text="First")
+        second = Comment.objects.create(user=self.author, post=post, text="Second")
+        reply = Comment.objects.create(
+            user=self.author, post=post, parent_comment=first, text="Reply"
+        )
+        Reaction.set_reaction(self.author, reply, Reaction.LIKE)
+        token = AccessToken.for_user(self.author)
+        url = f"/api/posts/{post.pk}/comments/?stream=1"
+
+        comments = json.loads(self.get_stream(url, HTTP_AUTHORIZATION=f"Bearer {token}"))
+
+        # Comments are flat, each reply after its parent.
+        self.assertEqual([c["id"] for c in comments], [first.pk, reply.pk, second.pk])
+        self.assertEqual(comments[1]["parent_comment"], first.pk)
+        self.assertNotIn("replies", comments[0])
+        self.assertEqual(comments[1]["like_count"], 1)
+        self.assertEqual(comments[1]["user_reaction"], Reaction.LIKE)
+        self.assertIsNone(comments[0]["user_reaction"])
+
+        comments = json.loads(self.get_stream(f"{url}&max_depth=1"))
+        self.assertEqual([c["id"] for c in comments], [first.pk, second.pk])
+
+    def test_ndjson_error(self):
+        response = self.client.get(
+            f"/api/posts/{self.posts[0].pk}/comments/?max_depth=0",
+            HTTP_ACCEPT="application/x-ndjson",
+        )
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.content.count(b"\n"), 1)
+        self.assertIn("error", json.loads(response.content))
+
+    async def test_stream_under_asgi(self):
+        response = await self.async_client.get("/api/posts/?stream=1")
+
+        self.assertEqual(response.status_code, 200)
+        chunks = [chunk async for chunk in response.streaming_content]
+        # Five posts, written out two at a time, and the end of the array.
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(len(json.loads(b"".join(chunks))), 5)
+
+
+class RendererTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.author = User.objects.create_user(username="author", password="@123tza..")
+        self.author.profile.role = Profile.ADMIN
+        self.author.profile.save()
+        self.token = AccessToken.for_user(self.author)
+        self.category = Category.objects.create(name="Life")
+        self.post = Post.objects.create(
+            title="Post \u2028 ünïcode",
+            body="Body",
+            author=self.author,
+            category=self.category,
+            published=True,
+            publish_date=timezone.now(),
+        )
+        self.post.tags.add(Tag.objects.create(name="Django"))
+
+    def test_orjson_renders_like_json_renderer(self):
+        data = {
+            "datetime": timezone.now(),
+            "naive_datetime": datetime(2024, 1, 2, 3, 4, 5),
+            "date": date(2024, 1, 2),
+            "time": time(3, 4, 5, 6),
+            "timedelta": timedelta(hours=1),
+            "decimal": Decimal("1.10"),
+            "uuid": uuid4(),
+            "lazy": gettext_lazy("Text"),
+            "separators": "\u2028\u2029",
+            "unicode": "ünïcode",
+            "keys": {1: "one", None: "none"},
+            "nested": [(1, 2.5, True, None)],
+        }
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            ORJSONRenderer().render(data, "application/json; indent=4"),
+            JSONRenderer().render(data, "application/json; indent=4"),
+        )
+        self.assertEqual(ORJSONRenderer().render(None), b"")
+
+    def test_json_response(self):
+        response = self.client.get(f"/api/posts/{self.post.pk}/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/json")
+        self.assertEqual(response.content, JSONRenderer().render(json.loads(response.content)))
+
+    def test_msgpack_response(self):
+        url = f"/api/posts/{self.post.pk}/"
+        response = self.client.get(url, HTTP_ACCEPT="application/msgpack")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "application/msgpack")
+        self.assertEqual(msgpack.unpackb(response.content), self.client.get(url).json())
+        # Each media type is a different representation.
+        self.assertNotEqual(response["ETag"], self.client.get(url)["ETag"])
+
+    def test_parse_json(self):
+        headers = {"HTTP_AUTHORIZATION": f"Bearer {self.token}"}
+
+        response = self.client.post(
+            "/api/categories/", '{"name": "Technology"}', "application/json", **headers
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(Category.objects.filter(name="Technology").exists())
+
+        response = self.client.post("/api/categories/", '{"name": ', "application/json", **headers)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("JSON parse error", response.json()["detail"])
+
+    def test_benchmark_renderers_command(self):
+        out = StringIO()
+
+        call_command("benchmark_renderers", "--size", "2", "--repeat", "1", stdout=out)
+
+        output = out.getvalue()
+        self.assertIn("2 posts:", output)
+        for label in ["render json", "render orjson", "render msgpack", "parse orjson"]:
+            self.assertIn(label, output)
+        # The posts are rolled back.
+        self.assertEqual(Post.objects.count(), 1)
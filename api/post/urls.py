@@ -1,15 +1,23 @@
 from django.urls import path
 
 from .views import (
+    PostCommentReactionsView,
     PostCommentsView,
     PostDetailView,
     PostListView,
+    PostSearchView,
     PublishPostView,
 )
 
 urlpatterns = [
     path("", PostListView.as_view(), name="post_list"),
+    path("search/", PostSearchView.as_view(), name="post_search"),
     path("<int:pk>/", PostDetailView.as_view(), name="post_detail"),
     path("<int:pk>/comments/", PostCommentsView.as_view(), name="post_comments"),
+    path(
+        "<int:pk>/comments/reactions/",
+        PostCommentReactionsView.as_view(),
+        name="post_comment_reactions",
+    ),
     path("<int:pk>/publish/", PublishPostView.as_view(), name="publish_post"),
 ]
@@ -1,38 +1,204 @@
-from account.permissions import IsAdmin, IsAuthor, IsOwnerOfObject, ReadOnly
+from functools import partial
+
+from account.authentication import JWTAuthentication
+from account.permissions import IsAdmin, IsAuthor, IsOwnerOfObject, ReadOnly, get_role
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
 from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views import View
+from drf_yasg import openapi
 from drf_yasg.utils import swagger_auto_schema
+from myproject.cache import cache_response, get_etag
+from myproject.streaming import CHUNK_SIZE, RENDERER_CLASSES, get_stream_format, stream
+from myproject.views import AsyncAPIView, conditional
 from rest_framework import status
 from rest_framework.generics import get_object_or_404
 from rest_framework.permissions import IsAuthenticated, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.authentication import JWTAuthentication
 
-from .models import Category, Comment, Post, Tag
+from . import feeds, reaction_buffer, sitemap
+from .filters import PostFilterBackend
+from .models import Category, Comment, Post, Reaction, Tag, invalidate_posts
+from .pagination import PostCursorPagination, PostSearchPagination
+from .search import PostSearch
 from .serializers import (
     CategorySerializer,
+    CommentSerializer,
     CommentTreeSerializer,
     PostDetailSerializer,
+    PostListSerializer,
+    PostSearchSerializer,
     PostWriteSerializer,
+    ReactionBatchSerializer,
     TagSerializer,
+    group_comments_by_parent,
+    parse_field_list,
 )
+from .tasks import (
+    enqueue,
+    enqueue_reaction_reconciliation,
+    regenerate_post_feeds,
+    warm_post_cache,
+)
+
+
+FIELDS_PARAMETER = openapi.Parameter(
+    "fields",
+    openapi.IN_QUERY,
+    description="Comma-separated fields to include",
+    type=openapi.TYPE_STRING,
+)
+EXCLUDE_PARAMETER = openapi.Parameter(
+    "exclude",
+    openapi.IN_QUERY,
+    description="Comma-separated fields to leave out",
+    type=openapi.TYPE_STRING,
+)
+STREAM_PARAMETER = openapi.Parameter(
+    "stream",
+    openapi.IN_QUERY,
+    description="Stream the whole collection as a JSON array (`1`) or as NDJSON (`ndjson`)",
+    type=openapi.TYPE_STRING,
+    enum=["1", "ndjson"],
+)
+
+
+def get_post_etag(request, pk, *args, **kwargs):
+    # The query string can select fields, and the post can be rendered in any accepted media
+    # type, so both are part of the representation. Drafts are only visible to some users, so
+    # each of them gets a different ETag.
+    return get_etag(
+        [f"post:{pk}", "categories", "tags", "profiles"],
+        request.get_full_path(),
+        request.accepted_media_type,
+        request.user.pk,
+    )
+
+
+def get_post_comments_etag(request, pk, *args, **kwargs):
+    # Authenticated users see their own reactions, so each of them gets a different ETag. The
+    # comments are rendered in the accepted media type.
+    return get_etag(
+        [f"post:{pk}", f"post:{pk}:comments"],
+        request.get_full_path(),
+        request.user.pk,
+        request.accepted_media_type,
+    )
 
 
-class PostListView(APIView):
+def serialize_comments(comments, user_id=None):
+    """Serialize a chunk of a streamed thread, along with the reactions of the user, if any."""
+    context = {}
+    if user_id is not None:
+        reactions = Reaction.objects.filter(
+            user_id=user_id, comment_id__in=[comment.pk for comment in comments]
+        )
+        context["user_reactions"] = dict(reactions.values_list("comment_id", "reaction_type"))
+    if settings.REACTION_BUFFER:
+        reaction_buffer.apply_buffered_reactions(comments, user_id, context.get("user_reactions"))
+    return CommentSerializer(comments, many=True, context=context).data
+
+
+class PostListView(AsyncAPIView):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (ReadOnly | (IsAuthenticated & IsAuthor),)
+    renderer_classes = RENDERER_CLASSES
 
     @swagger_auto_schema(
         tags=["post"],
+        manual_parameters=[
+            openapi.Parameter(
+                "category",
+                openapi.IN_QUERY,
+                description="Comma-separated category ids",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "tag",
+                openapi.IN_QUERY,
+                description="Comma-separated tag ids",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "tag_match",
+                openapi.IN_QUERY,
+                description="Whether posts need any or all of the tags",
+                type=openapi.TYPE_STRING,
+                enum=PostFilterBackend.TAG_MATCH_CHOICES,
+            ),
+            openapi.Parameter(
+                "author", openapi.IN_QUERY, description="Username", type=openapi.TYPE_STRING
+            ),
+            openapi.Parameter("published", openapi.IN_QUERY, type=openapi.TYPE_BOOLEAN),
+            openapi.Parameter(
+                "publish_date_after",
+                openapi.IN_QUERY,
+                description="ISO 8601 date or datetime",
+                type=openapi.TYPE_STRING,
+            ),
+            openapi.Parameter(
+                "publish_date_before",
+                openapi.IN_QUERY,
+                description="ISO 8601 date or datetime",
+                type=openapi.TYPE_STRING,
+            ),
+            FIELDS_PARAMETER,
+            EXCLUDE_PARAMETER,
+            STREAM_PARAMETER,
+        ],
         responses={
-            200: PostDetailSerializer(many=True),
+            200: PostListSerializer(many=True),
+            400: "Bad Request",
         },
     )
-    def get(self, request, *args, **kwargs):
-        """Get all posts."""
-        posts = Post.objects.all()
-        serializer = PostDetailSerializer(posts, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
+    @cache_response("posts", "categories", "tags", "profiles")
+    async def get(self, request, *args, **kwargs):
+        """Get a page of posts.
+
+        Pages are ordered newest first. Follow the `next` and `previous` links to move between
+        pages, and pass `page_size` to change how many posts are returned. Drafts are only
+        included for admins and their authors.
+
+        Posts are listed without their body by default. Pass `fields` to choose any fields of
+        a post, including the body, or `exclude` to leave fields out.
+
+        Pass `stream` to get every matching post in a single response instead, streamed as a
+        JSON array or as NDJSON. NDJSON is also streamed when it is the accepted media type.
+        """
+        fields = parse_field_list(request.query_params.get("fields"))
+        exclude = parse_field_list(request.query_params.get("exclude"))
+        serializer_class = PostListSerializer if fields is None else PostDetailSerializer
+        serializer = serializer_class(many=True, fields=fields, exclude=exclude)
+
+        # Only load what is rendered, plus the columns the pagination cursor needs. The role
+        # of the user is loaded from their profile if their token does not carry it.
+        role = await sync_to_async(get_role)(request)
+        posts = serializer.child.prepare_queryset(
+            Post.objects.visible_to(request.user, role), extra_fields=["publish_date"]
+        )
+        posts = PostFilterBackend().filter_queryset(request, posts, self)
+
+        stream_format = get_stream_format(request)
+        if stream_format is not None:
+            # Stream the posts in the order of the pages.
+            posts = posts.order_by(*PostCursorPagination.ordering).iterator(chunk_size=CHUNK_SIZE)
+            return stream(
+                request,
+                posts,
+                lambda chunk: serializer_class(
+                    chunk, many=True, fields=fields, exclude=exclude
+                ).data,
+                stream_format,
+            )
+
+        paginator = PostCursorPagination()
+        serializer.instance = await paginator.apaginate_queryset(posts, request, view=self)
+        return paginator.get_paginated_response(serializer.data)
 
     @swagger_auto_schema(
         tags=["post"],
@@ -50,27 +216,41 @@ class PostListView(APIView):
         """
         serializer = PostWriteSerializer(data=request.data)
         if serializer.is_valid():
-            serializer.save()
+            post = serializer.save()
+            enqueue(warm_post_cache, post.pk)
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class PostDetailView(APIView):
+class PostDetailView(AsyncAPIView):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (ReadOnly | (IsAuthenticated & (IsAdmin | IsAuthor)),)
 
     @swagger_auto_schema(
         tags=["post"],
+        manual_parameters=[FIELDS_PARAMETER, EXCLUDE_PARAMETER],
         response={
             200: PostDetailSerializer,
+            400: "Bad Request",
             401: "Unauthorized Request",
             404: "Post Not Found",
         },
     )
-    def get(self, request, pk, *args, **kwargs):
-        """Get a specific post."""
-        post = get_object_or_404(Post, pk=pk)
-        serializer = PostDetailSerializer(post)
+    @conditional(get_post_etag)
+    @cache_response("post:{pk}", "categories", "tags", "profiles")
+    async def get(self, request, pk, *args, **kwargs):
+        """Get a specific post.
+
+        Drafts are only found by admins and their authors. Pass `fields` to only get some fields
+        of the post, or `exclude` to leave fields out.
+        """
+        serializer = PostDetailSerializer(
+            fields=parse_field_list(request.query_params.get("fields")),
+            exclude=parse_field_list(request.query_params.get("exclude")),
+        )
+        role = await sync_to_async(get_role)(request)
+        posts = serializer.prepare_queryset(Post.objects.visible_to(request.user, role))
+        serializer.instance = await aget_object_or_404(posts, pk=pk)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
@@ -93,6 +273,7 @@ class PostDetailView(APIView):
         serializer = PostWriteSerializer(post, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
+            enqueue(warm_post_cache, post.pk)
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -113,9 +294,46 @@ class PostDetailView(APIView):
         self.check_object_permissions(request, post)
 
         post.delete()
+        enqueue(warm_post_cache, pk)
         return Response({"detail": "Post deleted successfully."}, status=status.HTTP_200_OK)
 
 
+class PostSearchView(APIView):
+    authentication_classes = (JWTAuthentication,)
+    permission_classes = (ReadOnly,)
+
+    @swagger_auto_schema(
+        tags=["post"],
+        manual_parameters=[
+            openapi.Parameter(
+                "q", openapi.IN_QUERY, description="Search terms", type=openapi.TYPE_STRING
+            ),
+        ],
+        responses={
+            200: PostSearchSerializer(many=True),
+            400: "Bad Request",
+        },
+    )
+    @cache_response("posts")
+    def get(self, request, *args, **kwargs):
+        """Search published posts.
+
+        Matches the title, subtitle and body of posts against the words in `q`, best matches
+        first. Each result includes its title and an extract of its body with the matching words
+        highlighted.
+        """
+        query = request.query_params.get("q", "").strip()
+        if not query:
+            return Response(
+                {"error": "A search query is required."}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        paginator = PostSearchPagination()
+        posts = paginator.paginate_queryset(PostSearch(query), request, view=self)
+        serializer = PostSearchSerializer(posts, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+
 class PublishPostView(APIView):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (IsAuthenticated & (IsAdmin | IsAuthor),)
@@ -130,41 +348,114 @@ class PublishPostView(APIView):
         },
     )
     def post(self, request, pk, *args, **kwargs):
-        """Publish an existing post.
+        """Publish an existing post now, even if it is scheduled to be published later.
 
         The user must be authenticated and must be an admin or the author of the post.
         """
         post = get_object_or_404(Post, pk=pk)
         self.check_object_permissions(request, post)
 
-        if not post.published:
-            post.published = True
-            post.publish_date = timezone.now()
-            post.save()
-
-            serializer = PostDetailSerializer(post)
-            return Response(serializer.data, status=status.HTTP_200_OK)
-        else:
+        # A single conditional update, so that concurrent requests and the scheduler publish the
+        # post only once.
+        now = timezone.now()
+        num_published = Post.objects.filter(pk=pk, published=False).update(
+            published=True, publish_date=now, date_modified=now
+        )
+        if not num_published:
             return Response(
                 {"error": "The post is already published."}, status=status.HTTP_400_BAD_REQUEST
             )
 
+        post.published = True
+        post.publish_date = post.date_modified = now
+        invalidate_posts([pk])
+        enqueue(warm_post_cache, pk)
+        enqueue(regenerate_post_feeds, [pk])
+
+        serializer = PostDetailSerializer(post)
+        return Response(serializer.data, status=status.HTTP_200_OK)
+
 
-class PostCommentsView(APIView):
+class PostCommentsView(AsyncAPIView):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (IsAuthenticatedOrReadOnly,)
+    renderer_classes = RENDERER_CLASSES
 
     @swagger_auto_schema(
         tags=["comment"],
+        manual_parameters=[
+            openapi.Parameter(
+                "max_depth",
+                openapi.IN_QUERY,
+                description="Number of reply levels to include",
+                type=openapi.TYPE_INTEGER,
+            ),
+            STREAM_PARAMETER,
+        ],
         responses={
             200: CommentTreeSerializer(many=True),
+            400: "Bad Request",
+            404: "Post Not Found",
         },
     )
-    def get(self, request, pk, *args, **kwargs):
-        """Get all comments under a post."""
-        post = get_object_or_404(Post, pk=pk)
-        top_level_comments = Comment.objects.filter(post=post, parent_comment__isnull=True)
-        serializer = CommentTreeSerializer(top_level_comments, many=True)
+    @conditional(get_post_comments_etag)
+    @cache_response("post:{pk}", "post:{pk}:comments")
+    async def get(self, request, pk, *args, **kwargs):
+        """Get all comments under a post.
+
+        The whole thread is fetched in one query and assembled in memory. Pass `max_depth` to
+        limit how many levels of replies are returned. Authenticated users also get their own
+        reaction to each comment. The comments of drafts are only found by admins and the
+        authors of the drafts.
+
+        Pass `stream` to have the comments streamed as a JSON array or as NDJSON instead, or
+        accept NDJSON. Streamed comments are not nested: they come in thread order, each reply
+        after its parent, and refer to it with `parent_comment`.
+        """
+        max_depth = request.query_params.get("max_depth")
+        if max_depth is not None:
+            if not max_depth.isdigit() or int(max_depth) < 1:
+                return Response(
+                    {"error": "max_depth must be a positive integer."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            max_depth = int(max_depth)
+
+        role = await sync_to_async(get_role)(request)
+        post = await aget_object_or_404(Post.objects.visible_to(request.user, role), pk=pk)
+        comments = Comment.objects.filter(post=post)
+        if max_depth is not None:
+            comments = comments.filter(depth__lt=max_depth)
+
+        stream_format = get_stream_format(request)
+        if stream_format is not None:
+            # Paths sort each comment after its parent and the earlier replies of the parent.
+            comments = comments.order_by("path").iterator(chunk_size=CHUNK_SIZE)
+            return stream(
+                request,
+                comments,
+                partial(serialize_comments, user_id=request.user.pk),
+                stream_format,
+            )
+
+        comments = [comment async for comment in comments]
+        context = {"replies": group_comments_by_parent(comments)}
+        if request.user.is_authenticated:
+            # Load the user's reactions for the whole thread at once.
+            reactions = Reaction.objects.filter(user_id=request.user.pk, comment__post=post)
+            context["user_reactions"] = {
+                comment_id: reaction_type
+                async for comment_id, reaction_type in reactions.values_list(
+                    "comment_id", "reaction_type"
+                )
+            }
+        if settings.REACTION_BUFFER:
+            # Reactions that are not flushed yet are only counted in Redis.
+            await sync_to_async(reaction_buffer.apply_buffered_reactions)(
+                comments, request.user.pk, context.get("user_reactions")
+            )
+
+        serializer = CommentTreeSerializer(context["replies"][None], many=True, context=context)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @swagger_auto_schema(
@@ -181,6 +472,63 @@ class PostCommentsView(APIView):
         pass
 
 
+class PostCommentReactionsView(APIView):
+    authentication_classes = (JWTAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    @swagger_auto_schema(
+        tags=["comment"],
+        request_body=ReactionBatchSerializer,
+        responses={
+            200: ReactionBatchSerializer,
+            400: "Bad Request",
+            401: "Unauthorized Request",
+            404: "Not Found",
+        },
+    )
+    def post(self, request, pk, *args, **kwargs):
+        """Set the user's reactions to comments under a post.
+
+        All the reactions are applied at once. Set the reaction to a comment to `NEUTRAL` to take
+        it back. The user must be authenticated, and able to read the post.
+        """
+        if not Post.objects.visible_to(request.user, get_role(request)).filter(pk=pk).exists():
+            raise Http404
+
+        serializer = ReactionBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        # When a comment appears more than once, the last reaction wins.
+        reaction_types = {
+            reaction["comment"]: reaction["reaction_type"]
+            for reaction in serializer.validated_data["reactions"]
+        }
+        comments = Comment.objects.filter(post_id=pk, pk__in=reaction_types).only("post_id")
+        comments = {comment.pk: comment for comment in comments}
+        missing = sorted(reaction_types.keys() - comments.keys())
+        if missing:
+            return Response(
+                {"reactions": [f"No comments with ids {missing} under this post."]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        comment_reactions = {
+            comments[comment_id]: reaction_type
+            for comment_id, reaction_type in reaction_types.items()
+        }
+        if settings.REACTION_BUFFER:
+            reaction_buffer.set_reactions(request.user, comment_reactions)
+        else:
+            Reaction.set_reactions(request.user, comment_reactions)
+            enqueue_reaction_reconciliation(reaction_types)
+        reactions = [
+            {"comment": comment_id, "reaction_type": reaction_type}
+            for comment_id, reaction_type in reaction_types.items()
+        ]
+        return Response({"reactions": reactions}, status=status.HTTP_200_OK)
+
+
 class CommentDetailView(APIView):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (ReadOnly | (IsAuthenticated & IsOwnerOfObject),)
@@ -213,19 +561,34 @@ class CommentDetailView(APIView):
             comment.delete()
 
 
-class CategoryListView(APIView):
+class CategoryListView(AsyncAPIView):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (ReadOnly | (IsAuthenticated & IsAdmin),)
+    renderer_classes = RENDERER_CLASSES
 
     @swagger_auto_schema(
         tags=["category"],
+        manual_parameters=[STREAM_PARAMETER],
         responses={
             200: CategorySerializer(many=True),
         },
     )
-    def get(self, request, *args, **kwargs):
-        """Get all categories."""
-        categories = Category.objects.all()
+    @cache_response("categories")
+    async def get(self, request, *args, **kwargs):
+        """Get all categories.
+
+        Pass `stream` to have them streamed as a JSON array or as NDJSON, or accept NDJSON.
+        """
+        stream_format = get_stream_format(request)
+        if stream_format is not None:
+            return stream(
+                request,
+                Category.objects.iterator(chunk_size=CHUNK_SIZE),
+                lambda chunk: CategorySerializer(chunk, many=True).data,
+                stream_format,
+            )
+
+        categories = [category async for category in Category.objects.all()]
         serializer = CategorySerializer(categories, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -249,7 +612,7 @@ class CategoryListView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class CategoryDetailView(APIView):
+class CategoryDetailView(AsyncAPIView):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (ReadOnly | (IsAuthenticated & IsAdmin),)
 
@@ -261,9 +624,9 @@ class CategoryDetailView(APIView):
             404: "Category Not Found",
         },
     )
-    def get(self, request, pk, *args, **kwargs):
+    async def get(self, request, pk, *args, **kwargs):
         """Get a category."""
-        category = get_object_or_404(Category, pk=pk)
+        category = await aget_object_or_404(Category, pk=pk)
         serializer = CategorySerializer(category)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -306,19 +669,34 @@ class CategoryDetailView(APIView):
         return Response({"detail": "Category deleted successfully."}, status=status.HTTP_200_OK)
 
 
-class TagListView(APIView):
+class TagListView(AsyncAPIView):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (ReadOnly | (IsAuthenticated & IsAdmin),)
+    renderer_classes = RENDERER_CLASSES
 
     @swagger_auto_schema(
         tags=["tag"],
+        manual_parameters=[STREAM_PARAMETER],
         responses={
             200: TagSerializer(many=True),
         },
     )
-    def get(self, request, *args, **kwargs):
-        """Get all tags."""
-        tags = Tag.objects.all()
+    @cache_response("tags")
+    async def get(self, request, *args, **kwargs):
+        """Get all tags.
+
+        Pass `stream` to have them streamed as a JSON array or as NDJSON, or accept NDJSON.
+        """
+        stream_format = get_stream_format(request)
+        if stream_format is not None:
+            return stream(
+                request,
+                Tag.objects.iterator(chunk_size=CHUNK_SIZE),
+                lambda chunk: TagSerializer(chunk, many=True).data,
+                stream_format,
+            )
+
+        tags = [tag async for tag in Tag.objects.all()]
         serializer = TagSerializer(tags, many=True)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -342,7 +720,7 @@ class TagListView(APIView):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class TagDetailView(APIView):
+class TagDetailView(AsyncAPIView):
     authentication_classes = (JWTAuthentication,)
     permission_classes = (ReadOnly | (IsAuthenticated & IsAdmin),)
 
@@ -354,9 +732,9 @@ class TagDetailView(APIView):
             404: "Tag Not Found",
         },
     )
-    def get(self, request, pk, *args, **kwargs):
+    async def get(self, request, pk, *args, **kwargs):
         """Get a tag."""
-        tag = get_object_or_404(Tag, pk=pk)
+        tag = await aget_object_or_404(Tag, pk=pk)
         serializer = TagSerializer(tag)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
@@ -397,3 +775,48 @@ class TagDetailView(APIView):
         tag = get_object_or_404(Tag, pk=pk)
         tag.delete()
         return Response({"detail": "Tag deleted successfully."}, status=status.HTTP_200_OK)
+
+
+class FeedView(View):
+    """Serve a feed in RSS or Atom, as rendered by `post.feeds`. `kind` selects the feed of the
+    whole blog, or of the category, tag or author given by `pk`."""
+
+    kind = feeds.ALL
+
+    def get(self, request, feed_format, pk=None):
+        feed = feeds.get_feed(self.kind, pk and int(pk), feed_format)
+        if feed is None:
+            raise Http404
+
+        etag = quote_etag(feed["etag"])
+        last_modified = feed["last_modified"] and int(feed["last_modified"].timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = HttpResponse(feed["content"], content_type=feed["content_type"])
+        response.headers["ETag"] = etag
+        if last_modified:
+            response.headers["Last-Modified"] = http_date(last_modified)
+        return response
+
+
+class SitemapView(View):
+    """Serve the sitemap index, or the file of a section of the sitemap given by `section` and
+    `page`, as rendered by `post.sitemap`."""
+
+    def get(self, request, section=None, page=None):
+        etag = get_etag(sitemap.CACHE_TAGS, request.path)
+        response = get_conditional_response(request, etag=quote_etag(etag))
+        if response is None:
+            key = sitemap.get_cache_key(etag)
+            chunks = sitemap.get_cached_chunks(key)
+            if chunks is None:
+                if section is None:
+                    chunks = sitemap.render_index()
+                elif sitemap.page_exists(section, int(page)):
+                    chunks = sitemap.render_section(section, int(page))
+                else:
+                    raise Http404
+                chunks = sitemap.cache_chunks(chunks, key)
+            response = StreamingHttpResponse(chunks, content_type="application/xml")
+        response.headers["ETag"] = quote_etag(etag)
+        return response